@@ -6,10 +6,13 @@ Note that adding code to CommonServerUserPython can override functions in Common
 # If you change this section, make sure you update the line offset magic number
 from __future__ import print_function
 
+import atexit
 import base64
+import codecs
 import gc
 import json
 import logging
+import marshal
 import os
 import re
 import socket
@@ -18,16 +21,18 @@ import time
 import traceback
 import types
 import urllib
-import gzip
+import hashlib
 import ssl
-from random import randint
+import zlib
+from random import randint, uniform
 import xml.etree.cElementTree as ET
-from collections import OrderedDict
+from collections import OrderedDict, deque
 from datetime import datetime, timedelta
-from abc import abstractmethod
+from abc import ABCMeta, abstractmethod
 from distutils.version import LooseVersion
-from threading import Lock
+from threading import BoundedSemaphore, Event, Lock, Thread
 from functools import wraps
+from itertools import chain
 from inspect import currentframe
 
 import demistomock as demisto
@@ -39,13 +44,21 @@ def __line__():
     return cf.f_back.f_lineno  # type: ignore[union-attr]
 
 
-# 43 - The line offset from the beginning of the file.
+# 48 - The line offset from the beginning of the file.
 _MODULES_LINE_MAPPING = {
-    'CommonServerPython': {'start': __line__() - 44, 'end': float('inf')},
+    'CommonServerPython': {'start': __line__() - 49, 'end': float('inf')},
 }
 
 XSIAM_EVENT_CHUNK_SIZE = 2 ** 20  # 1 Mib
 XSIAM_EVENT_CHUNK_SIZE_LIMIT = 4 * (10 ** 6)  # 4 MB
+XSIAM_STREAM_MAX_CHUNKS_IN_MEMORY = 2
+XSIAM_MAX_REQUESTS_PER_SECOND = 20
+XSIAM_MAX_BACKOFF_TIME = 60  # seconds
+XSIAM_SPILL_QUEUE_MAX_SIZE = 100 * (2 ** 20)  # 100 MiB
+XSIAM_COMPRESSION_LEVEL = 9
+XSIAM_CONNECTION_POOL_SIZE = 10
+HTTP_STREAM_CHUNK_SIZE = 2 ** 16  # 64 KiB
+LATENCY_ENDPOINT_ID_REGEX = re.compile(r'/(?:\d+|[0-9a-fA-F]{8}-(?:[0-9a-fA-F]{4}-){3}[0-9a-fA-F]{12}|[0-9a-fA-F]{16,})(?=/|$)')
 ASSETS = "assets"
 EVENTS = "events"
 DATA_TYPES = [EVENTS, ASSETS]
@@ -214,6 +227,26 @@ except Exception:
         # for more info see https://cosmicpercolator.com/2016/01/13/exception-leaks-in-python-2-and-3/
         sys.exc_clear()
 
+try:
+    import queue
+except ImportError:  # python 2
+    import Queue as queue  # type: ignore[no-redef]
+
+try:
+    from concurrent.futures import ThreadPoolExecutor
+except ImportError:  # python 2
+    pass
+
+# faster JSON libraries that might be missing from the docker image, see serialize_json
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+try:
+    import ujson  # type: ignore
+except ImportError:
+    ujson = None
+
 CONTENT_RELEASE_VERSION = '0.0.0'
 CONTENT_BRANCH_NAME = 'master'
 IS_PY3 = sys.version_info[0] == 3
@@ -706,6 +739,28 @@ def is_debug_mode():
     return hasattr(demisto, 'is_debug') and demisto.is_debug
 
 
+def lazy_debug(message, *args):
+    """
+    Logs a debug message only when the command runs with debug-mode=true, and only then formats it,
+    so expensive debug details cost nothing otherwise. Arguments which are callables are called to
+    get the value to format, so building the value is deferred as well.
+
+    >>> lazy_debug('Fetched incidents: {}', lambda: [incident['id'] for incident in incidents])
+
+    :type message: ``str``
+    :param message: The message, formatted with ``str.format``.
+
+    :type args: ``Any``
+    :param args: The values to format the message with, or callables returning them.
+
+    :return: No data returned
+    :rtype: ``None``
+    """
+    if not is_debug_mode():
+        return
+    demisto.debug(message.format(*[arg() if callable(arg) else arg for arg in args]))
+
+
 def get_schedule_metadata(context):
     """
         Get the entry schedule metadata if available
@@ -1460,6 +1515,228 @@ def safe_load_json(json_object):    # pragma: no cover
     return safe_json
 
 
+if orjson is not None:
+    JSON_SERIALIZER = 'orjson'
+elif ujson is not None:
+    JSON_SERIALIZER = 'ujson'
+else:
+    JSON_SERIALIZER = 'json'
+
+
+# orjson parses integers out of the 64 bits range into floats, losing their precision
+JSON_LONG_INTEGER_REGEX = re.compile(r'\d{19}')
+# a float in marshal format 2 is b'g' followed by its 8 bytes little-endian, NaN and Infinity have all the exponent bits set
+MARSHAL_NON_FINITE_FLOAT_REGEX = re.compile(b'g[\x00-\xff]{6}[\xf0-\xff][\x7f\xff]', re.DOTALL)
+
+
+def _may_contain_non_finite_float(obj):
+    """
+    Checks whether an object may contain NaN or Infinity, without walking it in Python: its marshal serialization
+    is searched for the bytes of such floats. May return True for bytes of strings or for types marshal
+    does not support, but never returns False for an object holding a non-finite float.
+
+    :type obj: ``Any``
+    :param obj: The object to check.
+
+    :return: False if the object holds no NaN or Infinity.
+    :rtype: ``bool``
+    """
+    try:
+        return MARSHAL_NON_FINITE_FLOAT_REGEX.search(marshal.dumps(obj, 2)) is not None
+    except ValueError:
+        return True
+
+
+def serialize_json_to_bytes(obj):
+    """
+    Serializes an object to compact UTF-8 encoded JSON, using orjson or ujson when they are available and
+    the standard json library otherwise. The output is the same as ``json.dumps(obj, ensure_ascii=False,
+    separators=(',', ':'))`` whatever the library (orjson may only format float exponents differently, e.g. 1e16):
+    objects the faster libraries handle differently, e.g. huge integers, NaN or datetimes, are serialized with
+    the standard json library.
+
+    :type obj: ``Any``
+    :param obj: The object to serialize.
+
+    :return: The JSON representation of the object.
+    :rtype: ``bytes``
+    """
+    try:
+        if JSON_SERIALIZER == 'orjson':
+            serialized = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+                                      | orjson.OPT_PASSTHROUGH_DATACLASS)
+            # orjson writes NaN and Infinity as null
+            if b'null' not in serialized or not _may_contain_non_finite_float(obj):
+                return serialized
+        elif JSON_SERIALIZER == 'ujson':
+            return ujson.dumps(obj, ensure_ascii=False, escape_forward_slashes=False).encode('utf-8')
+    except (TypeError, ValueError, OverflowError):
+        pass
+    return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def serialize_json(obj):
+    """
+    Serializes an object to a compact JSON string, see ``serialize_json_to_bytes``.
+
+    :type obj: ``Any``
+    :param obj: The object to serialize.
+
+    :return: The JSON representation of the object.
+    :rtype: ``str``
+    """
+    if JSON_SERIALIZER == 'json':
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':'))
+    return serialize_json_to_bytes(obj).decode('utf-8')
+
+
+def deserialize_json(data):
+    """
+    Deserializes a JSON string or UTF-8 encoded bytes, using orjson or ujson when they are available.
+    Returns the same object as ``json.loads``: JSON the faster libraries reject or parse differently, e.g. NaN,
+    Infinity or integers out of the 64 bits range, is deserialized with the standard json library.
+
+    :type data: ``str`` or ``bytes``
+    :param data: The JSON to deserialize.
+
+    :return: The deserialized object.
+    :rtype: ``Any``
+    """
+    try:
+        if JSON_SERIALIZER == 'orjson':
+            if isinstance(data, bytes) and not isinstance(data, str):
+                data = data.decode('utf-8')
+            if not JSON_LONG_INTEGER_REGEX.search(data):
+                return orjson.loads(data)
+        elif JSON_SERIALIZER == 'ujson':
+            return ujson.loads(data)
+    except ValueError:
+        pass
+    if isinstance(data, bytes) and not isinstance(data, str):
+        data = data.decode('utf-8')
+    return json.loads(data)
+
+
+def _iter_text_chunks(source, chunk_size=HTTP_STREAM_CHUNK_SIZE):
+    """
+    Iterates over the text of a streamed response, a file object or an iterable of chunks, decoding UTF-8 bytes
+    incrementally so multi-byte characters split between chunks are decoded correctly.
+
+    :return: The text chunks.
+    :rtype: ``collections.Iterable[str]``
+    """
+    if hasattr(source, 'iter_content'):
+        source = source.iter_content(chunk_size=chunk_size)
+    elif hasattr(source, 'read'):
+        file_object = source
+        source = iter(lambda: file_object.read(chunk_size), file_object.read(0))
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    for chunk in source:
+        if isinstance(chunk, bytes) and not isinstance(chunk, str):
+            chunk = decoder.decode(chunk)
+        if chunk:
+            yield chunk
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def iter_json_items(source, items_path=None, chunk_size=HTTP_STREAM_CHUNK_SIZE):
+    """
+    Incrementally parses a JSON array, yielding its items one by one without loading the whole document,
+    for example the items of a huge response streamed with ``resp_type='stream'``.
+    Only the item that is currently parsed is held in memory, along with the values that precede the array.
+
+    >>> res = client._http_request('GET', '/export', resp_type='stream')
+    >>> for alert in iter_json_items(res, 'data.alerts'):
+    >>>     ...
+
+    :type source: ``requests.Response`` or ``file`` or ``Iterable[Union[str, bytes]]``
+    :param source: The JSON document: a streamed response, a file object or an iterable of chunks.
+
+    :type items_path: ``str``
+    :param items_path: The dot separated path of the array in the document, for example: 'data.alerts'.
+        The default is the document itself.
+
+    :type chunk_size: ``int``
+    :param chunk_size: The size in bytes of the chunks read from a response or a file.
+
+    :return: The items of the array, in order.
+    :rtype: ``collections.Iterable``
+    """
+    chunks = _iter_text_chunks(source, chunk_size)
+    decoder = json.JSONDecoder()
+    state = {'buffer': '', 'position': 0, 'eof': False}
+
+    def read_more():
+        for chunk in chunks:
+            # dropping the parsed text before appending the new chunk
+            state['buffer'] = state['buffer'][state['position']:] + chunk
+            state['position'] = 0
+            return True
+        state['eof'] = True
+        return False
+
+    def next_char():
+        while True:
+            buffer, position = state['buffer'], state['position']
+            while position < len(buffer) and buffer[position] in ' \t\n\r':
+                position += 1
+            state['position'] = position
+            if position < len(buffer):
+                return buffer[position]
+            if not read_more():
+                raise ValueError('Unexpected end of JSON document while looking for the items.')
+
+    def expect(chars):
+        char = next_char()
+        if char not in chars:
+            raise ValueError('Expected one of {!r} at position {} of the JSON document, found {!r}.'.format(
+                chars, state['position'], char))
+        state['position'] += 1
+        return char
+
+    def decode_value():
+        while True:
+            next_char()
+            try:
+                value, end = decoder.raw_decode(state['buffer'], state['position'])
+                # a number at the end of the buffer might continue in the next chunk, e.g. 1.5 split after the 1.
+                if state['eof'] or (end < len(state['buffer']) and state['buffer'][end] in ' \t\n\r,:]}'):
+                    state['position'] = end
+                    return value
+            except ValueError:
+                if state['eof']:
+                    raise
+            read_more()
+
+    def find_key(key):
+        expect('{')
+        if next_char() == '}':
+            return False
+        while True:
+            found_key = decode_value()
+            expect(':')
+            if found_key == key:
+                return True
+            # skipping the values of the other keys
+            decode_value()
+            if expect(',}') == '}':
+                return False
+
+    for key in (items_path.split('.') if items_path else []):
+        if not find_key(key):
+            raise ValueError('The key {!r} of the items path {!r} was not found.'.format(key, items_path))
+
+    expect('[')
+    if next_char() == ']':
+        return
+    while True:
+        yield decode_value()
+        if expect(',]') == ']':
+            return
+
+
 def datetime_to_string(datetime_obj):
     """
     Converts a datetime object into a string. When used with `json.dumps()` for the `default` parameter,
@@ -2449,8 +2726,9 @@ def fileResult(filename, data, file_type=None):
        :type filename: ``str``
        :param filename: The name of the file to be created (required)
 
-       :type data: ``str`` or ``bytes``
-       :param data: The file data (required)
+       :type data: ``str`` or ``bytes`` or ``Iterable[bytes]`` or ``requests.Response``
+       :param data: The file data (required). Can be given in chunks, or as a response
+        requested with ``resp_type='stream'``, which is written to the file as it is downloaded.
 
        :type file_type: ``str``
        :param file_type: one of the entryTypes file or entryInfoFile (optional)
@@ -2466,7 +2744,19 @@ def fileResult(filename, data, file_type=None):
         data = data.encode('utf-8')
     # pylint: enable=undefined-variable
     with open(demisto.investigation()['id'] + '_' + temp, 'wb') as f:
-        f.write(data)
+        if isinstance(data, bytes):
+            f.write(data)
+        else:
+            response = data if hasattr(data, 'iter_content') else None
+            try:
+                if response is not None:
+                    data = response.iter_content(chunk_size=HTTP_STREAM_CHUNK_SIZE)
+                for chunk in data:
+                    f.write(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8'))
+            finally:
+                # releases the connection of the response, also when the download failed
+                if response is not None:
+                    response.close()
 
     # when there is ../ in the filename, xsoar thinks that path of the file is in the previous folder(s) and because of that
     # xsoar returns empty files to war-rooms
@@ -6423,6 +6713,156 @@ def arg_to_number(arg, arg_name=None, required=False):
         raise ValueError('"{}" is not a valid number'.format(arg))
 
 
+ISO_8601_TIMESTAMP_REGEX = re.compile(r'^(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,6}))?'
+                                      r'(Z|[+-]\d{2}:\d{2})?$')
+EPOCH_TIMESTAMP_REGEX = re.compile(r'^(\d{10})(\d{3})?(\d{3})?$')
+DATE_FORMAT_DIRECTIVE_REGEXES = {
+    'Y': r'(?P<Y>\d{4})',
+    'm': r'(?P<m>\d{1,2})',
+    'd': r'(?P<d>\d{1,2})',
+    'H': r'(?P<H>\d{1,2})',
+    'M': r'(?P<M>\d{1,2})',
+    'S': r'(?P<S>\d{1,2})',
+    'f': r'(?P<f>\d{1,6})',
+}
+_DATE_FORMAT_PARSERS = {}  # type: Dict[str, Any]
+_DATE_FORMAT_PARSERS_MAX_SIZE = 100
+
+
+def _get_utc_timezone():
+    try:
+        import pytz
+        return pytz.UTC
+    except ImportError:
+        return timezone.utc
+
+
+def _compile_date_format(date_format):
+    """
+    Compiles a strptime date format made of numeric directives (%Y, %m, %d, %H, %M, %S, %f) and literals
+    to a regex. Returns None if the format has other directives, or if its numeric directives are not separated,
+    so their values might be split differently than by strptime.
+    """
+    pattern = ''
+    previous_directive = None
+    index = 0
+    while index < len(date_format):
+        char = date_format[index]
+        if char == '%' and index + 1 == len(date_format):
+            return None
+        if char == '%' and date_format[index + 1] != '%':
+            directive = date_format[index + 1]
+            if directive not in DATE_FORMAT_DIRECTIVE_REGEXES or '(?P<{}>'.format(directive) in pattern or \
+                    (previous_directive is not None and previous_directive != 'Y' and directive != 'Y'):
+                return None
+            pattern += DATE_FORMAT_DIRECTIVE_REGEXES[directive]
+            previous_directive = directive
+            index += 2
+            continue
+        if char == '%':
+            index += 1
+        pattern += r'\s+' if char.isspace() else re.escape(char)
+        previous_directive = None
+        index += 1
+    return re.compile(pattern + '$', re.IGNORECASE)
+
+
+def parse_date_with_format(date_string, date_format):
+    """
+    Parses a date string with a known format, like ``datetime.strptime`` and with the same result and errors,
+    but faster for the formats of numeric fields: the format is compiled once to a regex, which is then used to
+    parse all the dates of that format. Other formats, and dates which do not match, are parsed with strptime.
+
+    >>> parse_date_with_format('2019-09-17T06:16:39.22Z', '%Y-%m-%dT%H:%M:%S.%fZ')
+    datetime.datetime(2019, 9, 17, 6, 16, 39, 220000)
+
+    :type date_string: ``str``
+    :param date_string: The date string to parse.
+
+    :type date_format: ``str``
+    :param date_format: The strptime format of the date string.
+
+    :return: The parsed datetime.
+    :rtype: ``datetime.datetime``
+    """
+    parser = _DATE_FORMAT_PARSERS.get(date_format, False)
+    if parser is False:
+        if len(_DATE_FORMAT_PARSERS) >= _DATE_FORMAT_PARSERS_MAX_SIZE:
+            _DATE_FORMAT_PARSERS.clear()
+        parser = _DATE_FORMAT_PARSERS[date_format] = _compile_date_format(date_format)
+    match = parser.match(date_string) if parser is not None and isinstance(date_string, STRING_TYPES) else None
+    if match:
+        fields = match.groupdict()
+        try:
+            return datetime(int(fields.get('Y') or 1900), int(fields.get('m') or 1), int(fields.get('d') or 1),
+                            int(fields.get('H') or 0), int(fields.get('M') or 0), int(fields.get('S') or 0),
+                            int((fields.get('f') or '0').ljust(6, '0')))
+        except ValueError:
+            # an invalid date, strptime raises the error
+            pass
+    return datetime.strptime(date_string, date_format)
+
+
+def _parse_common_timestamp(date_string):
+    """
+    Parses an ISO 8601 timestamp with seconds, or an epoch timestamp of 10 digits with up to 6 more digits of
+    milliseconds and microseconds, the way dateparser parses them with the UTC timezone setting.
+
+    :return: The parsed datetime, in UTC if the timestamp has a timezone, or None if it has another shape.
+    :rtype: ``datetime.datetime`` or ``None``
+    """
+    match = ISO_8601_TIMESTAMP_REGEX.match(date_string)
+    try:
+        if match:
+            year, month, day, hour, minute, second, fraction, time_zone = match.groups()
+            date = datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                            int((fraction or '0').ljust(6, '0')))
+            if time_zone is None:
+                return date
+            if time_zone != 'Z':
+                offset = timedelta(hours=int(time_zone[1:3]), minutes=int(time_zone[4:6]))
+                date = date - offset if time_zone[0] == '+' else date + offset
+            return date.replace(tzinfo=_get_utc_timezone())
+        match = EPOCH_TIMESTAMP_REGEX.match(date_string)
+        if match:
+            seconds, milliseconds, microseconds = match.groups()
+            return datetime.utcfromtimestamp(int(seconds)).replace(
+                microsecond=int(milliseconds or 0) * 1000 + int(microseconds or 0))
+    except (ValueError, OverflowError):
+        pass
+    return None
+
+
+def parse_date(date_string, settings=None):
+    """
+    Parses a date string like ``dateparser.parse``, recognizing the common timestamps without dateparser:
+    ISO 8601 timestamps with seconds, such as '2019-10-23T00:00:00Z' or '2019-10-23 00:00:00.123+02:00',
+    and epoch timestamps of 10 to 16 digits. Free text, such as '3 days ago', is parsed with dateparser.
+    The common timestamps are parsed this way only with the settings of the UTC timezone, optionally with
+    'RETURN_AS_TIMEZONE_AWARE', so the result is the same as dateparser's, other settings are passed to dateparser.
+
+    >>> parse_date('2019-10-23T05:00:00+05:00', settings={'TIMEZONE': 'UTC'})
+    datetime.datetime(2019, 10, 23, 0, 0, tzinfo=<UTC>)
+
+    :type date_string: ``str``
+    :param date_string: The date string to parse.
+
+    :type settings: ``dict``
+    :param settings: The dateparser settings.
+
+    :return: The parsed datetime, or None if it could not be parsed.
+    :rtype: ``datetime.datetime`` or ``None``
+    """
+    if isinstance(date_string, STRING_TYPES) and settings and str(settings.get('TIMEZONE')).upper() == 'UTC' and \
+            set(settings) <= {'TIMEZONE', 'RETURN_AS_TIMEZONE_AWARE'} and settings.get('RETURN_AS_TIMEZONE_AWARE', True):
+        date = _parse_common_timestamp(date_string.strip())
+        if date is not None:
+            if settings.get('RETURN_AS_TIMEZONE_AWARE') and date.tzinfo is None:
+                date = date.replace(tzinfo=_get_utc_timezone())
+            return date
+    return dateparser.parse(date_string, settings=settings)
+
+
 def arg_to_datetime(arg, arg_name=None, is_utc=True, required=False, settings=None):
     # type: (Any, Optional[str], bool, bool, dict) -> Optional[datetime]
     """Converts an XSOAR argument to a datetime
@@ -6479,9 +6919,9 @@ def arg_to_datetime(arg, arg_name=None, is_utc=True, required=False, settings=No
         # relative time stamps.
         # For example: format 2019-10-23T00:00:00 or "3 days", etc
         if settings:
-            date = dateparser.parse(arg, settings=settings)  # type: ignore[arg-type]
+            date = parse_date(arg, settings=settings)  # type: ignore[arg-type]
         else:
-            date = dateparser.parse(arg, settings={'TIMEZONE': 'UTC'})
+            date = parse_date(arg, settings={'TIMEZONE': 'UTC'})
 
         if date is None:
             # if d is None it means dateparser failed to parse it
@@ -6938,6 +7378,10 @@ class CommandResults:
     :type execution_metrics: ``ExecutionMetrics``
     :param execution_metrics: contains metric data about a command's execution
 
+    :type latency_metrics: ``list``
+    :param latency_metrics: latency histograms of the API calls per endpoint, reported with the execution_metrics,
+        see ``ExecutionMetrics.get_latency_metrics``
+
     :type replace_existing: ``bool``
     :param replace_existing: Replace the context value at outputs_prefix if it exists.
             Works only if outputs_prefix is a path to a nested value i.e., contains a period.
@@ -6969,8 +7413,9 @@ class CommandResults:
                  entry_type=None,
                  content_format=None,
                  execution_metrics=None,
-                 replace_existing=False):
-        # type: (str, object, object, list, str, object, IndicatorsTimeline, Common.Indicator, bool, bool, List[str], ScheduledCommand, list, int, str, List[Any], bool) -> None  # noqa: E501
+                 replace_existing=False,
+                 latency_metrics=None):
+        # type: (str, object, object, list, str, object, IndicatorsTimeline, Common.Indicator, bool, bool, List[str], ScheduledCommand, list, int, str, List[Any], bool, List[Any]) -> None  # noqa: E501
         if raw_response is None:
             raw_response = outputs
         if outputs is not None:
@@ -7013,6 +7458,7 @@ class CommandResults:
         self.relationships = relationships
         self.execution_metrics = execution_metrics
         self.replace_existing = replace_existing
+        self.latency_metrics = latency_metrics
 
         if content_format is not None and not EntryFormat.is_valid_type(content_format):
             raise TypeError('content_format {} is invalid, see CommonServerPython.EntryFormat'.format(content_format))
@@ -7114,6 +7560,8 @@ class CommandResults:
 
         if exec_metrics:
             return_entry.update({'APIExecutionMetrics': exec_metrics})
+            if self.latency_metrics:
+                return_entry.update({'APILatencyMetrics': self.latency_metrics})
 
         return return_entry
 
@@ -7354,6 +7802,95 @@ def return_warning(message, exit=False, warning='', outputs=None, ignore_auto_ex
         sys.exit(0)
 
 
+class LatencyHistogram(object):
+    """
+        A histogram of latencies or sizes with fixed buckets, used by ``ExecutionMetrics`` to record the timing of
+        the API calls per endpoint. Only the count of each bucket is kept, so the percentiles are approximated by
+        the upper bound of the bucket they fall in.
+
+        :type bounds: ``tuple``
+        :param bounds: The upper bounds of the buckets, in ascending order. Larger values are counted in an
+            additional unbounded bucket.
+
+        :return: None
+        :rtype: ``None``
+    """
+
+    TIME_BUCKETS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000)
+    SIZE_BUCKETS_BYTES = (1024, 10 * 1024, 100 * 1024, 1024 ** 2, 10 * 1024 ** 2, 100 * 1024 ** 2)
+
+    def __init__(self, bounds=TIME_BUCKETS_MS):
+        self.bounds = tuple(bounds)
+        self.buckets = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0
+        self.min = None  # type: Any
+        self.max = None  # type: Any
+
+    def record(self, value):
+        """
+        Records a value in the histogram.
+
+        :type value: ``float``
+        :param value: The value to record.
+
+        :return: None
+        :rtype: ``None``
+        """
+        index = 0
+        while index < len(self.bounds) and value > self.bounds[index]:
+            index += 1
+        self.buckets[index] += 1
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.sum / float(self.count) if self.count else 0
+
+    def percentile(self, percent):
+        """
+        Approximates a percentile of the recorded values.
+
+        :type percent: ``float``
+        :param percent: The percentile to approximate, between 0 and 100.
+
+        :return: The upper bound of the bucket of the percentile, but no more than the largest value recorded.
+            None if no value was recorded.
+        :rtype: ``float``
+        """
+        if not self.count:
+            return None
+        rank = max(1, percent / 100.0 * self.count)
+        accumulated = 0
+        for index, bucket_count in enumerate(self.buckets):
+            accumulated += bucket_count
+            if accumulated >= rank:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def to_dict(self):
+        """
+        Returns the histogram as a dict, with the bucket counts keyed by the upper bound of each bucket.
+
+        :return: The histogram.
+        :rtype: ``dict``
+        """
+        bucket_names = ['<={}'.format(bound) for bound in self.bounds] + ['>{}'.format(self.bounds[-1])]
+        return {
+            'Count': self.count,
+            'Mean': round(self.mean, 2),
+            'Min': self.min,
+            'Max': self.max,
+            'P50': self.percentile(50),
+            'P90': self.percentile(90),
+            'P99': self.percentile(99),
+            'Buckets': dict(zip(bucket_names, self.buckets)),
+        }
+
+
 class ExecutionMetrics(object):
     """
         ExecutionMetrics is used to collect and format metric data to be reported to the XSOAR server.
@@ -7376,6 +7913,12 @@ class ExecutionMetrics(object):
         self.ssl_error = ssl_error
         self.timeout_error = timeout_error
         self.retry_error = retry_error
+        self.throttled_time = 0.0
+        self.retries_per_chunk = []  # type: List[int]
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.latency = {}  # type: Dict[str, Dict[str, LatencyHistogram]]
+        self._counters_lock = Lock()
         """
             Initializes an ExecutionMetrics object. Once initialized, you may increment each metric type according to the
             metric you'd like to report. Afterwards, pass the `metrics` value to CommandResults.
@@ -7410,6 +7953,24 @@ class ExecutionMetrics(object):
             :type retry_error: ``int``
             :param retry_error: Quantity of Retry Error metrics
 
+            :type throttled_time: ``float``
+            :param throttled_time: Seconds spent waiting due to rate limits, see ``record_retries``.
+
+            :type retries_per_chunk: ``list``
+            :param retries_per_chunk: The number of retries made for each chunk of data sent, see ``record_retries``.
+
+            :type cache_hits: ``int``
+            :param cache_hits: Quantity of requests answered from the response cache of the client, without
+                downloading the response. Not reported to the server.
+
+            :type cache_misses: ``int``
+            :param cache_misses: Quantity of cacheable requests that were not found in the response cache of the client.
+                Not reported to the server.
+
+            :type latency: ``dict``
+            :param latency: The histograms of the time to first byte, total time and response size of the API calls,
+                per endpoint, see ``record_latency``. Reported to the server only if requested, see ``append_metrics``.
+
             :type metrics: ``CommandResults``
             :param metrics: Append this value to your CommandResults list to report the metrics to your server.
         """
@@ -7526,8 +8087,94 @@ class ExecutionMetrics(object):
                     self._metrics.append({'Type': metric_type, 'APICallsCount': metric_value})
             self.metrics = CommandResults(execution_metrics=self._metrics)
 
+    def record_retries(self, retries, throttled_time=0.0):
+        """
+        Records the retries made to send one chunk of data and the time spent waiting due to rate limits.
+        These counters are not reported to the server as API call metrics. Safe to call from multiple threads.
+
+        :type retries: ``int``
+        :param retries: The number of retries made for the chunk.
+
+        :type throttled_time: ``float``
+        :param throttled_time: The seconds spent waiting due to rate limits.
+
+        :return: None
+        :rtype: ``None``
+        """
+        with self._counters_lock:
+            self.retries_per_chunk.append(retries)
+            self.throttled_time += throttled_time
+
+    def record_latency(self, endpoint, time_to_first_byte=None, total_time=None, response_size=None):
+        """
+        Records the timing and response size of one API call to an endpoint. Safe to call from multiple threads.
+
+        :type endpoint: ``str``
+        :param endpoint: The endpoint called, for example: 'GET /alerts/{id}'.
+
+        :type time_to_first_byte: ``float``
+        :param time_to_first_byte: The seconds from sending the request until the response headers were received,
+            including connecting to the server if a new connection was opened.
+
+        :type total_time: ``float``
+        :param total_time: The seconds from sending the request until the response was received.
+
+        :type response_size: ``int``
+        :param response_size: The size of the response content in bytes.
+
+        :return: None
+        :rtype: ``None``
+        """
+        with self._counters_lock:
+            histograms = self.latency.get(endpoint)
+            if histograms is None:
+                histograms = self.latency[endpoint] = {
+                    'TimeToFirstByte': LatencyHistogram(),
+                    'TotalTime': LatencyHistogram(),
+                    'ResponseSize': LatencyHistogram(LatencyHistogram.SIZE_BUCKETS_BYTES),
+                }
+            if time_to_first_byte is not None:
+                histograms['TimeToFirstByte'].record(time_to_first_byte * 1000)
+            if total_time is not None:
+                histograms['TotalTime'].record(total_time * 1000)
+            if response_size is not None:
+                histograms['ResponseSize'].record(response_size)
+
+    def get_latency_metrics(self):
+        """
+        Returns the latency histograms recorded per endpoint, times in milliseconds and sizes in bytes.
+
+        :return: A list of dicts with the endpoint and its histograms.
+        :rtype: ``list``
+        """
+        with self._counters_lock:
+            return [dict({'Endpoint': endpoint}, **{name: histogram.to_dict() for name, histogram in histograms.items()})
+                    for endpoint, histograms in sorted(self.latency.items())]
+
+    def get_latency_summary(self):
+        """
+        Returns a summary of the latency recorded per endpoint, slowest first, to log.
 
-def append_metrics(execution_metrics, results):
+        :return: The summary, or an empty string if no latency was recorded.
+        :rtype: ``str``
+        """
+        with self._counters_lock:
+            endpoints = sorted(self.latency.items(), key=lambda item: -item[1]['TotalTime'].sum)
+            lines = []
+            for endpoint, histograms in endpoints:
+                total_time, time_to_first_byte, size = (histograms['TotalTime'], histograms['TimeToFirstByte'],
+                                                        histograms['ResponseSize'])
+                lines.append('{}: {} calls, total {:.0f}ms (mean {:.0f}ms, p90 {:.0f}ms, max {:.0f}ms), time to first '
+                             'byte p90 {:.0f}ms, mean size {:.0f} bytes'.format(endpoint, total_time.count, total_time.sum,
+                                                                                total_time.mean,
+                                                                                total_time.percentile(90) or 0,
+                                                                                total_time.max or 0,
+                                                                                time_to_first_byte.percentile(90) or 0,
+                                                                                size.mean))
+        return '\n'.join(lines)
+
+
+def append_metrics(execution_metrics, results, include_latency=False):
     """
     Returns a 'CommandResults' list appended with metrics.
 
@@ -7537,10 +8184,16 @@ def append_metrics(execution_metrics, results):
     :type results: ``list``
     :param results: 'CommandResults' list to append metrics to (required).
 
+    :type include_latency: ``bool``
+    :param include_latency: Whether to report the latency histograms of the metrics as well, see
+        ``ExecutionMetrics.record_latency``.
+
     :return: results appended with the metrics if the server version is supported.
     :rtype: ``list``
     """
     if execution_metrics.metrics is not None and execution_metrics.is_supported():
+        if include_latency and execution_metrics.latency:
+            execution_metrics.metrics.latency_metrics = execution_metrics.get_latency_metrics()
         results.append(execution_metrics.metrics)
     return results
 
@@ -8600,7 +9253,7 @@ def parse_date_string(date_string, date_format='%Y-%m-%dT%H:%M:%S'):
         :rtype: ``(datetime.datetime, datetime.datetime)``
     """
     try:
-        return datetime.strptime(date_string, date_format)
+        return parse_date_with_format(date_string, date_format)
     except ValueError as e:
         error_message = str(e)
 
@@ -8647,7 +9300,7 @@ def parse_date_string(date_string, date_format='%Y-%m-%dT%H:%M:%S'):
         #      '2022-01-23T12:34:56.123456789' to '2022-01-23T12:34:56.123456'
         date_string = re.sub(r'([0-9]+\.[0-9]{6})[0-9]*([Zz]|[+-]\S+?)?', '\\1\\2', date_string)
 
-        return datetime.strptime(date_string, date_format)
+        return parse_date_with_format(date_string, date_format)
 
 
 def build_dbot_entry(indicator, indicator_type, vendor, score, description=None, build_malicious=True):
@@ -8767,67 +9420,760 @@ H || val.SSDeep && val.SSDeep == obj.SSDeep)': {'Malicious': {'Vendor': 'Vendor'
                                .format(indicator_type, INDICATOR_TYPE_TO_CONTEXT_KEY.keys()))
 
 
-# Will add only if 'requests' module imported
-if 'requests' in sys.modules:
-    if IS_PY3 and PY_VER_MINOR >= 10:
-        from requests.packages.urllib3.util.ssl_ import create_urllib3_context
+class ResponseCache(object):
+    """
+    An LRU cache of HTTP responses with a time to live, used by ``BaseClient`` when it is given one.
+    Responses that expired but have an ETag are kept, so they can be revalidated with If-None-Match
+    instead of being downloaded again.
+    The cache can be persisted across runs in the integration context or in a file on the local disk,
+    it is loaded on first use and written back by ``save`` (called by ``BaseClient.save_state``).
+    Safe to use from multiple threads.
 
-        # The ciphers string used to replace default cipher string
+    :type max_size: ``int``
+    :param max_size: The maximal number of responses to keep.
 
-        CIPHERS_STRING = '@SECLEVEL=1:ECDHE+AESGCM:ECDHE+CHACHA20:DHE+AESGCM:DHE+CHACHA20:ECDH+AESGCM:DH+AESGCM:' \
-                         'ECDH+AES:DH+AES:RSA+ANESGCM:RSA+AES:!aNULL:!eNULL:!MD5:!DSS'
+    :type ttl: ``int``
+    :param ttl: The number of seconds a response is used without revalidating it.
 
-        class SSLAdapter(HTTPAdapter):
-            """
-                A wrapper used for https communication to enable ciphers that are commonly used
-                and are not enabled by default
-                :return: No data returned
-                :rtype: ``None``
-            """
-            context = create_urllib3_context(ciphers=CIPHERS_STRING)
+    :type integration_context_key: ``str``
+    :param integration_context_key: If given, the cache is persisted in the integration context under this key.
 
-            def __init__(self, verify=True, **kwargs):
-                # type: (bool, dict) -> None
-                if not verify and IS_PY3:
-                    self.context.check_hostname = False
-                if not verify and ssl.OPENSSL_VERSION_INFO >= (3, 0, 0, 0):
-                    self.context.options |= 0x4
-                super().__init__(**kwargs)  # type: ignore[arg-type]
+    :type path: ``str``
+    :param path: If given, the cache is persisted in a file at this path.
 
-            def init_poolmanager(self, *args, **kwargs):
-                kwargs['ssl_context'] = self.context
-                return super(SSLAdapter, self).init_poolmanager(*args, **kwargs)
+    :return: None
+    :rtype: ``None``
+    """
 
-            def proxy_manager_for(self, *args, **kwargs):
-                kwargs['ssl_context'] = self.context
-                return super(SSLAdapter, self).proxy_manager_for(*args, **kwargs)
+    def __init__(self, max_size=1000, ttl=300, integration_context_key=None, path=None):
+        if integration_context_key and path:
+            raise DemistoException('The response cache can be persisted in the integration context or in a file, not both.')
+        self.max_size = max_size
+        self.ttl = ttl
+        self.integration_context_key = integration_context_key
+        self.path = path
+        self._entries = OrderedDict()  # type: OrderedDict
+        self._loaded = not (integration_context_key or path)
+        self._changed = False
+        self._lock = Lock()
 
-    class BaseClient(object):
-        """Client to use in integrations with powerful _http_request
-        :type base_url: ``str``
-        :param base_url: Base server address with suffix, for example: https://example.com/api/v2/.
+    # response headers which are not cached, as they hold credentials of the caller
+    SENSITIVE_HEADER_REGEX = re.compile(r'cookie|authenticat|authoriz|token', re.IGNORECASE)
 
-        :type verify: ``bool``
-        :param verify: Whether the request should verify the SSL certificate.
+    @staticmethod
+    def make_key(method, url, params=None, data=None, json_data=None, headers=None, auth=None):
+        """
+        Makes the cache key of a request from its method, URL, params, a hash of its body and a hash of its headers
+        and auth, so a response is only served to requests sent with the same credentials.
 
-        :type proxy: ``bool``
-        :param proxy: Whether to run the integration using the system proxy.
+        :return: The cache key.
+        :rtype: ``str``
+        """
+        body = data if isinstance(data, bytes) else serialize_json_to_bytes(data if json_data is None else json_data)
+        if auth is not None and not isinstance(auth, (tuple, list)) and hasattr(auth, '__dict__'):
+            # the state of a requests.auth.AuthBase, e.g. the username and password of HTTPBasicAuth
+            auth = sorted(vars(auth).items())
+        credentials = repr([sorted((str(key).lower(), str(value)) for key, value in (headers or {}).items()), auth])
+        key_parts = [method.upper(), url, serialize_json(params), hashlib.sha256(body).hexdigest(),
+                     hashlib.sha256(credentials.encode('utf-8')).hexdigest()]
+        return hashlib.sha256('\n'.join(key_parts).encode('utf-8')).hexdigest()
+
+    def _load(self):
+        self._loaded = True
+        try:
+            if self.integration_context_key:
+                entries = get_integration_context().get(self.integration_context_key) or {}
+                if isinstance(entries, STRING_OBJ_TYPES):
+                    entries = deserialize_json(entries)
+            elif os.path.exists(self.path):  # type: ignore[arg-type]
+                with open(self.path, 'rb') as cache_file:  # type: ignore[arg-type]
+                    entries = deserialize_json(cache_file.read())
+            else:
+                entries = {}
+        except Exception as error:  # noqa: disable=broad-except
+            demisto.debug('Failed loading the response cache, starting with an empty cache: {}'.format(error))
+            entries = {}
+        for key, entry in sorted(entries.items(), key=lambda item: item[1].get('expires', 0)):
+            entry['content'] = base64.b64decode(entry.get('content', ''))
+            self._entries[key] = entry
+        self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def get(self, key):
+        """
+        Gets a cached response.
 
-        :type ok_codes: ``tuple`` or ``None``
-        :param ok_codes:
-            The request codes to accept as OK, for example: (200, 201, 204).
-            Will use requests.Response.ok if set to None.
+        :type key: ``str``
+        :param key: The cache key of the request, see ``make_key``.
 
-        :type headers: ``dict`` or ``None``
-        :param headers:
-            The request headers, for example: {'Accept`: `application/json`}.
-            Can be None.
+        :return: The cached response and whether it is still fresh, or None if the response should be downloaded.
+            A response that is not fresh should be revalidated with its 'etag'.
+        :rtype: ``tuple``
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry['expires'] > time.time():
+                # moving the entry to the end, as the most recently used
+                self._entries[key] = self._entries.pop(key)
+                return entry, True
+            if entry.get('etag'):
+                return entry, False
+            del self._entries[key]
+            self._changed = True
+            return None
 
-        :type auth: ``dict`` or ``tuple`` or ``None``
+    def set(self, key, entry):
+        """
+        Caches a response.
+
+        :type key: ``str``
+        :param key: The cache key of the request, see ``make_key``.
+
+        :type entry: ``dict``
+        :param entry: The response, with its 'status_code', 'reason', 'headers', 'content', 'encoding', 'url'
+            and 'etag'. Headers which may hold credentials, e.g. Set-Cookie, are not cached.
+
+        :return: None
+        :rtype: ``None``
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            entry['expires'] = time.time() + self.ttl
+            entry['headers'] = {name: value for name, value in (entry.get('headers') or {}).items()
+                                if not self.SENSITIVE_HEADER_REGEX.search(name)}
+            self._entries.pop(key, None)
+            self._entries[key] = entry
+            self._evict()
+            self._changed = True
+
+    def refresh(self, key):
+        """
+        Marks a cached response as fresh again, after it was revalidated.
+
+        :type key: ``str``
+        :param key: The cache key of the request, see ``make_key``.
+
+        :return: None
+        :rtype: ``None``
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                entry['expires'] = time.time() + self.ttl
+                self._entries[key] = entry
+                self._changed = True
+
+    def clear(self):
+        """
+        Removes all the cached responses.
+
+        :return: None
+        :rtype: ``None``
+        """
+        with self._lock:
+            self._entries.clear()
+            self._loaded = True
+            self._changed = True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def save(self):
+        """
+        Writes the cache to the integration context or to its file, if it is persisted and was changed.
+
+        :return: None
+        :rtype: ``None``
+        """
+        if not (self.integration_context_key or self.path):
+            return
+        with self._lock:
+            if not self._changed:
+                return
+            entries = {}
+            for key, entry in self._entries.items():
+                if entry['expires'] > time.time() or entry.get('etag'):
+                    entries[key] = dict(entry, content=base64.b64encode(entry['content']).decode('ascii'))
+            self._changed = False
+        if self.integration_context_key:
+            set_to_integration_context_with_retries({self.integration_context_key: entries})
+        else:
+            with open(self.path + '.tmp', 'wb') as cache_file:  # type: ignore[operator]
+                cache_file.write(serialize_json_to_bytes(entries))
+            os.rename(self.path + '.tmp', self.path)  # type: ignore[operator]
+
+
+# A py2/py3 compatible abc.ABC, instantiating a subclass that does not implement all its abstract methods fails.
+_ABC = ABCMeta(str('_ABC'), (object,), {'__slots__': ()})
+
+
+class Pagination(_ABC):
+    """
+    A pagination strategy of ``BaseClient.paginate``. Given the request of a page and its response,
+    a strategy makes the request of the next page.
+
+    :type items_path: ``str``
+    :param items_path: The dot separated path of the items in the JSON response, for example: 'data.items'.
+        The default is the response itself.
+
+    :return: None
+    :rtype: ``None``
+    """
+
+    def __init__(self, items_path=None):
+        self.items_path = items_path
+
+    def get_items(self, body):
+        """
+        :return: The items of a page.
+        :rtype: ``list``
+        """
+        if self.items_path:
+            return dict_safe_get(body, self.items_path.split('.'), [], list, raise_return_type=False) or []
+        return body if isinstance(body, list) else []
+
+    @staticmethod
+    def with_params(request_kwargs, params):
+        """
+        :return: The request arguments, with the given params added to its params.
+        :rtype: ``dict``
+        """
+        return dict(request_kwargs, params=dict(request_kwargs.get('params') or {}, **params))
+
+    def first_request(self, request_kwargs):
+        """
+        :return: The request arguments of the first page.
+        :rtype: ``dict``
+        """
+        return request_kwargs
+
+    @abstractmethod
+    def next_request(self, request_kwargs, res, body, items):
+        """
+        :type request_kwargs: ``dict``
+        :param request_kwargs: The ``_http_request`` arguments of the current page.
+
+        :type res: ``requests.Response``
+        :param res: The response of the current page.
+
+        :type body: ``Any``
+        :param body: The parsed JSON response of the current page.
+
+        :type items: ``list``
+        :param items: The items of the current page.
+
+        :return: The ``_http_request`` arguments of the next page, or None if this is the last page.
+        :rtype: ``dict``
+        """
+
+
+class OffsetPagination(Pagination):
+    """
+    Pages by an offset param and a page size param, for example: ?offset=200&limit=100.
+    The last page is the first one holding fewer items than the page size.
+
+    :type page_size: ``int``
+    :param page_size: The number of items to request in each page.
+
+    :type offset_param: ``str``
+    :param offset_param: The name of the offset param.
+
+    :type limit_param: ``str``
+    :param limit_param: The name of the page size param.
+
+    :type start: ``int``
+    :param start: The offset of the first page.
+
+    :type items_path: ``str``
+    :param items_path: See ``Pagination``.
+
+    :return: None
+    :rtype: ``None``
+    """
+
+    def __init__(self, page_size=100, offset_param='offset', limit_param='limit', start=0, items_path=None):
+        super(OffsetPagination, self).__init__(items_path)
+        self.page_size = page_size
+        self.offset_param = offset_param
+        self.limit_param = limit_param
+        self.start = start
+
+    def first_request(self, request_kwargs):
+        return self.with_params(request_kwargs, {self.offset_param: self.start, self.limit_param: self.page_size})
+
+    def next_request(self, request_kwargs, res, body, items):
+        if len(items) < self.page_size:
+            return None
+        offset = request_kwargs['params'][self.offset_param] + len(items)
+        return self.with_params(request_kwargs, {self.offset_param: offset})
+
+
+class PageNumberPagination(OffsetPagination):
+    """
+    Pages by a page number param, for example: ?page=3&page_size=100.
+    The last page is the first one holding fewer items than the page size.
+
+    :type page_size: ``int``
+    :param page_size: The number of items to request in each page.
+
+    :type page_param: ``str``
+    :param page_param: The name of the page number param.
+
+    :type page_size_param: ``str``
+    :param page_size_param: The name of the page size param.
+
+    :type start: ``int``
+    :param start: The number of the first page.
+
+    :type items_path: ``str``
+    :param items_path: See ``Pagination``.
+
+    :return: None
+    :rtype: ``None``
+    """
+
+    def __init__(self, page_size=100, page_param='page', page_size_param='page_size', start=1, items_path=None):
+        super(PageNumberPagination, self).__init__(page_size, page_param, page_size_param, start, items_path)
+
+    def next_request(self, request_kwargs, res, body, items):
+        if len(items) < self.page_size:
+            return None
+        return self.with_params(request_kwargs, {self.offset_param: request_kwargs['params'][self.offset_param] + 1})
+
+
+class CursorPagination(Pagination):
+    """
+    Pages by a cursor returned with each page and sent as a param of the next one, for example: ?cursor=abc.
+    The last page is the one without a cursor.
+
+    :type cursor_path: ``str``
+    :param cursor_path: The dot separated path of the next cursor in the JSON response.
+
+    :type cursor_param: ``str``
+    :param cursor_param: The name of the cursor param.
+
+    :type cursor_header: ``str``
+    :param cursor_header: The name of the header holding the next cursor, instead of the JSON response.
+
+    :type items_path: ``str``
+    :param items_path: See ``Pagination``.
+
+    :return: None
+    :rtype: ``None``
+    """
+
+    def __init__(self, cursor_path='next_cursor', cursor_param='cursor', cursor_header=None, items_path=None):
+        super(CursorPagination, self).__init__(items_path)
+        self.cursor_path = cursor_path
+        self.cursor_param = cursor_param
+        self.cursor_header = cursor_header
+
+    def next_request(self, request_kwargs, res, body, items):
+        if self.cursor_header:
+            cursor = res.headers.get(self.cursor_header)
+        else:
+            cursor = dict_safe_get(body, self.cursor_path.split('.')) if isinstance(body, dict) else None
+        if not cursor or not items:
+            return None
+        return self.with_params(request_kwargs, {self.cursor_param: cursor})
+
+
+class NextUrlPagination(Pagination):
+    """
+    Pages by the URL of the next page returned with each page, for example: {"next": "https://example.com/api?page=2"}.
+    The last page is the one without a next URL.
+
+    :type next_url_path: ``str``
+    :param next_url_path: The dot separated path of the next URL in the JSON response.
+
+    :type items_path: ``str``
+    :param items_path: See ``Pagination``.
+
+    :return: None
+    :rtype: ``None``
+    """
+
+    def __init__(self, next_url_path='next', items_path=None):
+        super(NextUrlPagination, self).__init__(items_path)
+        self.next_url_path = next_url_path
+
+    def next_request(self, request_kwargs, res, body, items):
+        next_url = dict_safe_get(body, self.next_url_path.split('.')) if isinstance(body, dict) else None
+        if not next_url:
+            return None
+        # the next URL already holds the query of the next page
+        return dict(request_kwargs, full_url=requests.compat.urljoin(res.url, next_url), params=None)
+
+
+class LinkHeaderPagination(Pagination):
+    """
+    Pages by the next page link of the Link header, as defined in RFC 5988, for example:
+    Link: <https://example.com/api?page=2>; rel="next".
+    The last page is the one without a next link.
+
+    :type rel: ``str``
+    :param rel: The relation type of the link to the next page.
+
+    :type items_path: ``str``
+    :param items_path: See ``Pagination``.
+
+    :return: None
+    :rtype: ``None``
+    """
+
+    def __init__(self, rel='next', items_path=None):
+        super(LinkHeaderPagination, self).__init__(items_path)
+        self.rel = rel
+
+    def next_request(self, request_kwargs, res, body, items):
+        next_url = res.links.get(self.rel, {}).get('url')
+        if not next_url:
+            return None
+        return dict(request_kwargs, full_url=next_url, params=None)
+
+
+# Will add only if 'requests' module imported
+if 'requests' in sys.modules:
+    if IS_PY3 and PY_VER_MINOR >= 10:
+        from requests.packages.urllib3.util.ssl_ import create_urllib3_context
+
+        # The ciphers string used to replace default cipher string
+
+        CIPHERS_STRING = '@SECLEVEL=1:ECDHE+AESGCM:ECDHE+CHACHA20:DHE+AESGCM:DHE+CHACHA20:ECDH+AESGCM:DH+AESGCM:' \
+                         'ECDH+AES:DH+AES:RSA+ANESGCM:RSA+AES:!aNULL:!eNULL:!MD5:!DSS'
+
+        class SSLAdapter(HTTPAdapter):
+            """
+                A wrapper used for https communication to enable ciphers that are commonly used
+                and are not enabled by default
+                :return: No data returned
+                :rtype: ``None``
+            """
+            context = create_urllib3_context(ciphers=CIPHERS_STRING)
+
+            def __init__(self, verify=True, **kwargs):
+                # type: (bool, dict) -> None
+                if not verify and IS_PY3:
+                    self.context.check_hostname = False
+                if not verify and ssl.OPENSSL_VERSION_INFO >= (3, 0, 0, 0):
+                    self.context.options |= 0x4
+                super().__init__(**kwargs)  # type: ignore[arg-type]
+
+            def init_poolmanager(self, *args, **kwargs):
+                kwargs['ssl_context'] = self.context
+                return super(SSLAdapter, self).init_poolmanager(*args, **kwargs)
+
+            def proxy_manager_for(self, *args, **kwargs):
+                kwargs['ssl_context'] = self.context
+                return super(SSLAdapter, self).proxy_manager_for(*args, **kwargs)
+
+    def _httpx_to_requests_response(httpx_response, stream=False):
+        """
+        Converts an httpx response to a ``requests.Response``, so it is handled by the same code as the responses
+        of requests, including the error handlers of the integrations.
+
+        :type httpx_response: ``httpx.Response``
+        :param httpx_response: The response.
+
+        :type stream: ``bool``
+        :param stream: Whether the content of the response was not read yet, and should be read from it in chunks.
+
+        :return: The response.
+        :rtype: ``requests.Response``
+        """
+        res = requests.Response()
+        res.status_code = httpx_response.status_code
+        res.reason = httpx_response.reason_phrase
+        res.headers = requests.structures.CaseInsensitiveDict(httpx_response.headers.multi_items())
+        res.url = str(httpx_response.url)
+        res.encoding = httpx_response.encoding
+        if stream:
+            res.raw = _HttpxStreamReader(httpx_response)
+        else:
+            res._content = httpx_response.content
+            res.elapsed = httpx_response.elapsed
+        return res
+
+    def _get_httpx_error_type(httpx, exception):
+        """
+        Gets the type of an error raised by httpx, as the same error raised by requests is translated
+        in ``BaseClient._http_request``.
+
+        :type httpx: ``module``
+        :param httpx: The httpx module.
+
+        :type exception: ``Exception``
+        :param exception: The exception raised by httpx.
+
+        :return: The error type, or None if the exception is not translated.
+        :rtype: ``str``
+        """
+        if isinstance(exception, httpx.ConnectTimeout):
+            return ErrorTypes.TIMEOUT_ERROR
+        if isinstance(exception, httpx.ProxyError):
+            return ErrorTypes.PROXY_ERROR
+        if isinstance(exception, (httpx.ConnectError, httpx.NetworkError)):
+            cause = exception
+            while cause is not None:
+                if isinstance(cause, ssl.SSLError):
+                    return ErrorTypes.SSL_ERROR
+                cause = cause.__cause__ or cause.__context__
+            return ErrorTypes.CONNECTION_ERROR
+        return None
+
+    def _httpx_to_requests_exception(httpx, error_type, exception):
+        """
+        Converts an error raised by httpx to the exception requests raises for the same error,
+        so it is handled by the same code as the errors of requests.
+
+        :type httpx: ``module``
+        :param httpx: The httpx module.
+
+        :type error_type: ``str``
+        :param error_type: The type of the error, see ``_get_httpx_error_type``.
+
+        :type exception: ``Exception``
+        :param exception: The exception raised by httpx.
+
+        :return: The exception of requests.
+        :rtype: ``requests.exceptions.RequestException``
+        """
+        if error_type is None and isinstance(exception, httpx.TimeoutException):
+            return requests.exceptions.ReadTimeout(str(exception))
+        exception_type = {
+            ErrorTypes.TIMEOUT_ERROR: requests.exceptions.ConnectTimeout,
+            ErrorTypes.PROXY_ERROR: requests.exceptions.ProxyError,
+            ErrorTypes.SSL_ERROR: requests.exceptions.SSLError,
+            ErrorTypes.CONNECTION_ERROR: requests.exceptions.ConnectionError,
+        }.get(error_type, requests.exceptions.RequestException)  # type: ignore[arg-type]
+        return exception_type(str(exception))
+
+    def _requests_auth_to_httpx(httpx, auth):
+        """
+        Converts the auth argument of requests to the auth of httpx, which does not accept the ``requests.auth``
+        objects. A custom ``requests.auth.AuthBase`` is applied to a copy of each request made with requests,
+        and the headers and URL it sets are copied to the httpx request.
+
+        :type httpx: ``module``
+        :param httpx: The httpx module.
+
+        :type auth: ``tuple`` or ``requests.auth.AuthBase`` or ``httpx.Auth``
+        :param auth: The auth of the request.
+
+        :return: The auth for httpx.
+        :rtype: ``httpx.Auth``
+        """
+        if auth is None or isinstance(auth, httpx.Auth):
+            return auth
+        if isinstance(auth, (tuple, list)) and len(auth) == 2:
+            return httpx.BasicAuth(*auth)
+        if type(auth) is requests.auth.HTTPBasicAuth:
+            return httpx.BasicAuth(auth.username, auth.password)
+        if type(auth) is requests.auth.HTTPDigestAuth:
+            return httpx.DigestAuth(auth.username, auth.password)
+        if not callable(auth):
+            raise DemistoException('The auth of type {} is not supported with httpx.'.format(type(auth).__name__))
+
+        class RequestsAuth(httpx.Auth):
+            requires_request_body = True
+
+            def auth_flow(self, request):
+                prepared_request = auth(requests.Request(request.method, str(request.url), headers=dict(request.headers),
+                                                         data=request.content).prepare())
+                for name, value in prepared_request.headers.items():
+                    if request.headers.get(name) != value:
+                        request.headers[name] = value
+                if prepared_request.url != str(request.url):
+                    request.url = httpx.URL(prepared_request.url)
+                yield request
+
+        return RequestsAuth()
+
+    class _HttpxStreamReader(object):
+        """
+        A file-like object reading the decoded content of a streamed httpx response, used as the raw content
+        of the converted ``requests.Response``.
+        """
+
+        def __init__(self, httpx_response):
+            self._response = httpx_response
+            self._chunks = httpx_response.iter_bytes()
+            self._buffer = b''
+
+        def read(self, amt=None, *args, **kwargs):
+            while amt is None or len(self._buffer) < amt:
+                chunk = next(self._chunks, None)
+                if chunk is None:
+                    break
+                self._buffer += chunk
+            data, self._buffer = (self._buffer, b'') if amt is None else (self._buffer[:amt], self._buffer[amt:])
+            return data
+
+        def close(self):
+            self._response.close()
+
+    class HttpxSession(object):
+        """
+        A transport for ``BaseClient`` with the interface of ``requests.Session`` used by it, sending the requests
+        with httpx over HTTP/2, so concurrent requests to the same host are multiplexed over a single connection.
+        The responses are converted to ``requests.Response`` and the errors to the exceptions of requests,
+        so the requests are handled exactly the same. Selected with the http2 argument of ``BaseClient``.
+        Falls back to HTTP/1.1 if the h2 package is not installed.
+
+        The retry configuration of the mounted adapters (see ``BaseClient._implement_retry``) is applied
+        to the connection errors and the status codes to retry.
+
+        :type verify: ``bool``
+        :param verify: Whether the request should verify the SSL certificate.
+
+        :type http2: ``bool``
+        :param http2: Whether to use HTTP/2.
+
+        :return: None
+        :rtype: ``None``
+        """
+
+        def __init__(self, verify=True, http2=True):
+            import httpx  # type: ignore
+            self._httpx = httpx
+            self.verify = verify
+            self.http2 = http2
+            self.headers = requests.structures.CaseInsensitiveDict()
+            self.adapters = OrderedDict()  # type: OrderedDict
+            self._client = None  # type: Any
+            self._lock = Lock()
+
+        def _get_client(self):
+            # created on first use, so the proxy environment variables set by BaseClient are taken into account
+            with self._lock:
+                if self._client is None:
+                    try:
+                        self._client = self._httpx.Client(http2=self.http2, verify=self.verify)
+                    except ImportError:
+                        demisto.debug('The h2 package is not installed, using HTTP/1.1.')
+                        self._client = self._httpx.Client(verify=self.verify)
+                return self._client
+
+        def mount(self, prefix, adapter):
+            self.adapters[prefix] = adapter
+
+        def _get_retry(self, url):
+            for prefix, adapter in self.adapters.items():
+                if url.lower().startswith(prefix.lower()):
+                    retry = getattr(adapter, 'max_retries', None)
+                    return retry if retry and retry.total else None
+            return None
+
+        def request(self, method, url, params=None, data=None, headers=None, files=None, auth=None, timeout=None,
+                    json=None, stream=False, allow_redirects=True, verify=None, **kwargs):
+            if isinstance(timeout, tuple):
+                timeout = self._httpx.Timeout(timeout[1], connect=timeout[0])
+            content = None
+            if isinstance(data, (bytes, str)):
+                # httpx sends raw bodies as content, the data argument is only for form fields
+                content, data = data, None
+            request_headers = requests.structures.CaseInsensitiveDict(self.headers)
+            request_headers.update(headers or {})
+            request = self._get_client().build_request(
+                method, url, params=params, data=data, content=content, files=files, json=json, timeout=timeout,
+                headers=dict(request_headers)
+            )
+            auth = _requests_auth_to_httpx(self._httpx, auth)
+            retry = self._get_retry(url)
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    response = self._get_client().send(request, auth=auth, stream=stream,
+                                                       follow_redirects=allow_redirects)
+                except self._httpx.HTTPError as exception:
+                    error_type = _get_httpx_error_type(self._httpx, exception)
+                    if retry and error_type == ErrorTypes.CONNECTION_ERROR and attempt <= retry.total:
+                        time.sleep(self._get_backoff_time(retry, attempt))  # pylint: disable=sleep-exists
+                        continue
+                    raise _httpx_to_requests_exception(self._httpx, error_type, exception)
+                if retry and response.status_code in (retry.status_forcelist or ()) and method.upper() in \
+                        (getattr(retry, 'allowed_methods', None) or getattr(retry, 'method_whitelist', None) or ()):
+                    if attempt <= retry.total:
+                        response.close()
+                        time.sleep(self._get_backoff_time(retry, attempt))  # pylint: disable=sleep-exists
+                        continue
+                    if retry.raise_on_status:
+                        response.close()
+                        raise requests.exceptions.RetryError(
+                            'Max retries exceeded with url: {} (too many {} error responses)'.format(
+                                url, response.status_code))
+                return _httpx_to_requests_response(response, stream)
+
+        @staticmethod
+        def _get_backoff_time(retry, attempt):
+            # same as urllib3, the first retry is immediate
+            if attempt <= 1:
+                return 0
+            return min(retry.backoff_factor * (2 ** (attempt - 1)), getattr(retry, 'DEFAULT_BACKOFF_MAX', 120))
+
+        def close(self):
+            if self._client is not None:
+                self._client.close()
+
+    class BaseClient(object):
+        """Client to use in integrations with powerful _http_request
+        :type base_url: ``str``
+        :param base_url: Base server address with suffix, for example: https://example.com/api/v2/.
+
+        :type verify: ``bool``
+        :param verify: Whether the request should verify the SSL certificate.
+
+        :type proxy: ``bool``
+        :param proxy: Whether to run the integration using the system proxy.
+
+        :type ok_codes: ``tuple`` or ``None``
+        :param ok_codes:
+            The request codes to accept as OK, for example: (200, 201, 204).
+            Will use requests.Response.ok if set to None.
+
+        :type headers: ``dict`` or ``None``
+        :param headers:
+            The request headers, for example: {'Accept`: `application/json`}.
+            Can be None.
+
+        :type auth: ``dict`` or ``tuple`` or ``None``
         :param auth:
             The request authorization, for example: (username, password).
             Can be None.
 
+        :type response_cache: ``ResponseCache`` or ``None``
+        :param response_cache:
+            If given, the responses of GET requests are cached in it, see the use_cache argument of _http_request.
+            Can be None.
+
+        :type rate_limiter: ``ClientRateLimiter`` or ``None``
+        :param rate_limiter:
+            If given, the requests are limited by it before they are sent, per host or per the rate_limit_bucket
+            argument of _http_request. Can be None.
+
+        :type http2: ``bool``
+        :param http2:
+            Whether to send the requests over HTTP/2 with httpx, see ``HttpxSession``. Requires httpx.
+
+        :type report_latency: ``bool``
+        :param report_latency:
+            Whether to report the latency histograms of the endpoints called with the execution metrics.
+            The latency is recorded in any case, and a summary of it is logged in debug mode.
+
+        :type circuit_breaker: ``CircuitBreaker`` or ``None``
+        :param circuit_breaker:
+            If given, the requests to a server fail fast after consecutive connection or timeout errors,
+            instead of waiting for the timeout, see ``CircuitBreaker``. Can be None.
+
         :return: No data returned
         :rtype: ``None``
         """
@@ -8843,13 +10189,24 @@ if 'requests' in sys.modules:
             headers=None,
             auth=None,
             timeout=REQUESTS_TIMEOUT,
+            response_cache=None,
+            rate_limiter=None,
+            http2=False,
+            report_latency=False,
+            circuit_breaker=None,
         ):
             self._base_url = base_url
             self._verify = verify
             self._ok_codes = ok_codes
             self._headers = headers
             self._auth = auth
-            self._session = requests.Session()
+            self._session = HttpxSession(verify=verify) if http2 else requests.Session()
+            # the retry adapters are mounted once per retry configuration, so their connection pools are reused
+            self._retry_adapters = {}  # type: Dict[tuple, Any]
+            self._response_cache = response_cache
+            self._rate_limiter = rate_limiter
+            self.report_latency = report_latency
+            self._circuit_breaker = circuit_breaker
 
             # the following condition was added to overcome the security hardening happened in Python 3.10.
             # https://github.com/python/cpython/pull/25778
@@ -8873,6 +10230,31 @@ if 'requests' in sys.modules:
 
             self.execution_metrics = ExecutionMetrics()
 
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc_value, traceback):
+            self.save_state()
+            return False
+
+        def save_state(self):
+            """ Persists the state of the response cache, rate limiter and circuit breaker of the client, for those
+            that are persisted and changed since they were loaded or last saved. Should be called once the client
+            is done sending requests, or use the client as a context manager.
+
+            >>> with Client(base_url, response_cache=ResponseCache(integration_context_key='cache')) as client:
+            >>>     return_results(get_items_command(client, args))
+
+            :return: No data returned
+            :rtype: ``None``
+            """
+            if self._response_cache is not None:
+                self._response_cache.save()
+            if self._rate_limiter is not None:
+                self._rate_limiter.save()
+            if self._circuit_breaker is not None:
+                self._circuit_breaker.save()
+
         def __del__(self):
             self._return_execution_metrics_results()
             try:
@@ -8925,6 +10307,12 @@ if 'requests' in sys.modules:
                 if status falls in ``status_forcelist`` range and retries have
                 been exhausted.
             """
+            retry_config = (retries, tuple(status_list_to_retry or ()), backoff_factor, raise_on_redirect, raise_on_status)
+            https_adapter = self._retry_adapters.get(retry_config)
+            if https_adapter is not None:
+                if self._session.adapters.get('https://') is not https_adapter:
+                    self._session.mount('https://', https_adapter)
+                return
             try:
                 method_whitelist = "allowed_methods" if hasattr(
                     Retry.DEFAULT, "allowed_methods") else "method_whitelist"  # type: ignore[attr-defined]
@@ -8942,7 +10330,9 @@ if 'requests' in sys.modules:
                     raise_on_redirect=raise_on_redirect,
                     **whitelist_kawargs  # type: ignore[arg-type]
                 )
-                http_adapter = HTTPAdapter(max_retries=retry)
+                # keeping the connection pool size of the current adapter, see _set_connection_pool_size
+                pool_size = getattr(self._session.adapters.get('https://'), '_pool_maxsize', requests.adapters.DEFAULT_POOLSIZE)
+                http_adapter = HTTPAdapter(max_retries=retry, pool_maxsize=pool_size)
 
                 # the following condition was added to overcome the security hardening happened in Python 3.10.
                 # https://github.com/python/cpython/pull/25778
@@ -8951,10 +10341,12 @@ if 'requests' in sys.modules:
                 if self._verify:
                     https_adapter = http_adapter
                 elif IS_PY3 and PY_VER_MINOR >= 10:
-                    https_adapter = SSLAdapter(max_retries=retry, verify=self._verify)  # type: ignore[arg-type]
+                    https_adapter = SSLAdapter(max_retries=retry, verify=self._verify,  # type: ignore[arg-type]
+                                               pool_maxsize=pool_size)
                 else:
                     https_adapter = http_adapter
 
+                self._retry_adapters[retry_config] = https_adapter
                 self._session.mount('https://', https_adapter)
 
             except NameError:
@@ -8964,7 +10356,8 @@ if 'requests' in sys.modules:
                           params=None, data=None, files=None, timeout=None, resp_type='json', ok_codes=None,
                           return_empty_response=False, retries=0, status_list_to_retry=None,
                           backoff_factor=5, raise_on_redirect=False, raise_on_status=False,
-                          error_handler=None, empty_valid_codes=None, params_parser=None, with_metrics=False, **kwargs):
+                          error_handler=None, empty_valid_codes=None, params_parser=None, with_metrics=False,
+                          use_cache=None, rate_limit_bucket=None, **kwargs):
             """A wrapper for requests lib to send our requests and handle requests and responses better.
 
             :type method: ``str``
@@ -9008,8 +10401,10 @@ if 'requests' in sys.modules:
             :type resp_type: ``str``
             :param resp_type:
                 Determines which data format to return from the HTTP request. The default
-                is 'json'. Other options are 'text', 'content', 'xml' or 'response'. Use 'response'
-                 to return the full response object.
+                is 'json'. Other options are 'text', 'content', 'xml', 'response' or 'stream'. Use 'response'
+                 to return the full response object. Use 'stream' to return the response object without downloading
+                 its content, to be read in chunks, for example with ``iter_json_items`` or ``fileResult``.
+                 Close the response once it was read.
 
             :type ok_codes: ``tuple``
             :param ok_codes:
@@ -9065,6 +10460,15 @@ if 'requests' in sys.modules:
             :type with_metrics ``bool``
             :param with_metrics: Whether or not to calculate execution metrics from the response
 
+            :type use_cache ``bool``
+            :param use_cache: Whether to use the response cache of the client, if it has one. By default only the
+                responses of GET requests are cached. Successful responses are cached by method, URL, params and body,
+                and expired responses with an ETag are revalidated with If-None-Match.
+
+            :type rate_limit_bucket ``str``
+            :param rate_limit_bucket: The bucket of the rate limiter of the client to limit the request by.
+                The default is the host of the request.
+
             :return: Depends on the resp_type parameter
             :rtype: ``dict`` or ``str`` or ``bytes`` or ``xml.etree.ElementTree.Element`` or ``requests.Response``
             """
@@ -9077,52 +10481,240 @@ if 'requests' in sys.modules:
                     self._implement_retry(retries, status_list_to_retry, backoff_factor, raise_on_redirect, raise_on_status)
                 if not timeout:
                     timeout = self.timeout
+                if resp_type.lower() == 'stream':
+                    kwargs['stream'] = True
                 if IS_PY3 and params_parser:  # The `quote_via` parameter is supported only in python3.
                     params = urllib.parse.urlencode(params, quote_via=params_parser)
 
+                cache_key, cached_entry, fresh_entry, headers = self._lookup_response_cache(
+                    method, address, params, data, json_data, headers, auth, use_cache, kwargs.get('stream'))
+                if fresh_entry is not None:
+                    return self._handle_success(self._response_from_cache(fresh_entry), resp_type, empty_valid_codes,
+                                                return_empty_response, False)
+
+                # checking the circuit first, so the requests it rejects do not consume the rate limit
+                circuit = self._check_circuit_breaker(address)
+                if self._rate_limiter is not None:
+                    rate_limit_bucket = self._get_rate_limit_bucket(address, rate_limit_bucket)
+                    self._rate_limiter.acquire(rate_limit_bucket)
+
                 # Execute
-                res = self._session.request(
-                    method,
-                    address,
-                    verify=self._verify,
-                    params=params,
-                    data=data,
-                    json=json_data,
-                    files=files,
-                    headers=headers,
-                    auth=auth,
-                    timeout=timeout,
-                    **kwargs
-                )
-                if not self._is_status_code_valid(res, ok_codes):
+                start_time = time.time()
+                try:
+                    res = self._session.request(
+                        method,
+                        address,
+                        verify=self._verify,
+                        params=params,
+                        data=data,
+                        json=json_data,
+                        files=files,
+                        headers=headers,
+                        auth=auth,
+                        timeout=timeout,
+                        **kwargs
+                    )
+                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exception:
+                    # an SSL error means the server is up
+                    if circuit and not isinstance(exception, requests.exceptions.SSLError):
+                        self._circuit_breaker.record_failure(circuit)  # type: ignore[union-attr]
+                    raise
+                res, revalidated = self._record_response(method, address, res, time.time() - start_time, circuit,
+                                                         rate_limit_bucket, cache_key, cached_entry)
+                is_status_code_valid = self._is_status_code_valid(res, ok_codes)
+                if not is_status_code_valid:
                     self._handle_error(error_handler, res, with_metrics)
+                elif cache_key and not revalidated:
+                    self._cache_response(cache_key, res)
 
                 return self._handle_success(res, resp_type, empty_valid_codes, return_empty_response, with_metrics)
 
             except requests.exceptions.ConnectTimeout as exception:
-                if with_metrics:
-                    self.execution_metrics.timeout_error += 1
+                self._raise_request_error(ErrorTypes.TIMEOUT_ERROR, exception, with_metrics)
+            except requests.exceptions.SSLError as exception:
+                self._raise_request_error(ErrorTypes.SSL_ERROR, exception, with_metrics)
+            except requests.exceptions.ProxyError as exception:
+                self._raise_request_error(ErrorTypes.PROXY_ERROR, exception, with_metrics)
+            except requests.exceptions.ConnectionError as exception:
+                self._raise_request_error(ErrorTypes.CONNECTION_ERROR, exception, with_metrics)
+            except requests.exceptions.RetryError as exception:
+                self._raise_request_error(ErrorTypes.RETRY_ERROR, exception, with_metrics, retries)
+
+        def bulk_request(self, requests_kwargs, max_workers=10, max_requests_per_host=None):
+            """Sends many requests concurrently on a pool of threads sharing the session and connection pool
+            of the client. Each request is sent with ``_http_request``, so it is handled exactly the same,
+            and the execution metrics of all of them are counted.
+
+            >>> results = client.bulk_request([{'method': 'GET', 'url_suffix': '/alerts/' + alert_id}
+            >>>                                for alert_id in alert_ids])
+
+            :type requests_kwargs: ``Iterable[dict]``
+            :param requests_kwargs: The keyword arguments of ``_http_request`` for each request.
+
+            :type max_workers: ``int``
+            :param max_workers: The maximal number of requests sent at once.
+
+            :type max_requests_per_host: ``int``
+            :param max_requests_per_host: If given, the maximal number of requests sent at once to the same host.
+
+            :return: The result of each request, in the order of the requests. When a request fails, the exception
+                it raised is returned in place of its result.
+            :rtype: ``list``
+            """
+            requests_kwargs = list(requests_kwargs)
+            host_semaphores = {}  # type: Dict[str, Any]
+            host_semaphores_lock = Lock()
+
+            def send_request(request_kwargs):
+                if not max_requests_per_host:
+                    return self._http_request(**request_kwargs)
+                host = requests.compat.urlparse(request_kwargs.get('full_url') or self._base_url).netloc
+                with host_semaphores_lock:
+                    host_semaphore = host_semaphores.setdefault(host, BoundedSemaphore(max_requests_per_host))
+                with host_semaphore:
+                    return self._http_request(**request_kwargs)
+
+            results = []  # type: List[Any]
+            if max_workers <= 1 or len(requests_kwargs) <= 1 or not IS_PY3:
+                for request_kwargs in requests_kwargs:
+                    try:
+                        results.append(send_request(request_kwargs))
+                    except Exception as error:
+                        results.append(error)
+                return results
+
+            try:
+                support_multithreading()
+            except AttributeError:
+                demisto.debug('Could not add a lock on the server calls, the demisto object does not support it.')
+            self._set_connection_pool_size(max_workers)
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+            try:
+                futures = [executor.submit(send_request, request_kwargs) for request_kwargs in requests_kwargs]
+                for future in futures:
+                    try:
+                        results.append(future.result())
+                    except Exception as error:
+                        results.append(error)
+            finally:
+                executor.shutdown(wait=True)
+            return results
+
+        def paginate(self, method='GET', url_suffix='', pagination=None, limit=None, prefetch=False, **kwargs):
+            """Iterates over the items of all the pages of a paginated API, requesting the pages as the items
+            are consumed, so the results are never collected into one list.
+
+            >>> for alert in client.paginate('GET', '/alerts', CursorPagination('meta.next', items_path='data'),
+            >>>                              limit=1000, params={'status': 'open'}):
+            >>>     ...
+
+            :type method: ``str``
+            :param method: The HTTP method, for example: GET, POST, and so on.
+
+            :type url_suffix: ``str``
+            :param url_suffix: The API endpoint.
+
+            :type pagination: ``Pagination``
+            :param pagination: The pagination strategy: OffsetPagination, PageNumberPagination, CursorPagination,
+                NextUrlPagination, LinkHeaderPagination or a custom one. The default is LinkHeaderPagination.
+
+            :type limit: ``int``
+            :param limit: The maximal number of items to return. No more pages are requested once it is reached.
+
+            :type prefetch: ``bool``
+            :param prefetch: Whether to request the next page on a background thread while the items of the
+                current page are consumed.
+
+            :type kwargs: ``dict``
+            :param kwargs: Other arguments of the requests, see ``_http_request``.
+
+            :return: The items of the pages, in order.
+            :rtype: ``collections.Iterable``
+            """
+            pagination = pagination or LinkHeaderPagination()
+
+            def iter_pages():
+                request_kwargs = pagination.first_request(dict(kwargs, method=method, url_suffix=url_suffix))
+                pages_items_count = 0
+                # checking the limit here as well, so a prefetching thread does not request a page that is not needed
+                while request_kwargs and (limit is None or pages_items_count < limit):
+                    res = self._http_request(resp_type='response', **request_kwargs)
+                    body = self.cast_response(res, 'json') if res.content else None
+                    items = pagination.get_items(body)
+                    pages_items_count += len(items)
+                    yield items
+                    request_kwargs = pagination.next_request(request_kwargs, res, body, items)
+
+            pages = iter_pages()
+            if prefetch and IS_PY3:
+                # the next page is fetched while the items of the current one are processed
+                pages = _prefetch_in_background(pages, 2)
+            items_count = 0
+            try:
+                if limit is not None and limit <= 0:
+                    return
+                for items in pages:
+                    for item in items:
+                        yield item
+                        items_count += 1
+                        # stopping before the next page is requested
+                        if limit is not None and items_count >= limit:
+                            return
+            finally:
+                pages.close()
+
+        def _set_connection_pool_size(self, pool_size):
+            """ Makes sure the session keeps at least pool_size connections to each host, so concurrent requests
+            reuse their connections instead of discarding them.
+
+            :type pool_size: ``int``
+            :param pool_size: The number of connections to keep to each host.
+            """
+            for adapter in chain(self._session.adapters.values(), self._retry_adapters.values()):
+                if isinstance(adapter, HTTPAdapter) and adapter._pool_maxsize < pool_size:
+                    adapter.init_poolmanager(adapter._pool_connections, pool_size, block=adapter._pool_block)
+
+        def _raise_request_error(self, error_type, exception, should_update_metrics, retries=0):
+            """ Raises a DemistoException explaining an error that occurred before a response was received,
+            and updates the metrics with it. Shared by the clients, so the same errors are raised whatever the
+            HTTP library that raised the original exception.
+
+            :type error_type: ``str``
+            :param error_type: The type of the error, one of the connection related ErrorTypes.
+
+            :type exception: ``Exception``
+            :param exception: The exception raised by the HTTP library.
+
+            :type should_update_metrics ``bool``
+            :param should_update_metrics: Whether or not to update execution metrics according to the error
+
+            :type retries: ``int``
+            :param retries: The number of retries the request was made with.
+            """
+            if error_type == ErrorTypes.TIMEOUT_ERROR:
+                if should_update_metrics:
+                    self._increment_metric('timeout_error')
                 err_msg = 'Connection Timeout Error - potential reasons might be that the Server URL parameter' \
                           ' is incorrect or that the Server is not accessible from your host.'
                 raise DemistoException(err_msg, exception)
-            except requests.exceptions.SSLError as exception:
-                if with_metrics:
-                    self.execution_metrics.ssl_error += 1
+            if error_type == ErrorTypes.SSL_ERROR:
+                if should_update_metrics:
+                    self._increment_metric('ssl_error')
                 # in case the "Trust any certificate" is already checked
                 if not self._verify:
-                    raise
+                    raise exception
                 err_msg = 'SSL Certificate Verification Failed - try selecting \'Trust any certificate\' checkbox in' \
                           ' the integration configuration.'
                 raise DemistoException(err_msg, exception)
-            except requests.exceptions.ProxyError as exception:
-                if with_metrics:
-                    self.execution_metrics.proxy_error += 1
+            if error_type == ErrorTypes.PROXY_ERROR:
+                if should_update_metrics:
+                    self._increment_metric('proxy_error')
                 err_msg = 'Proxy Error - if the \'Use system proxy\' checkbox in the integration configuration is' \
                           ' selected, try clearing the checkbox.'
                 raise DemistoException(err_msg, exception)
-            except requests.exceptions.ConnectionError as exception:
-                if with_metrics:
-                    self.execution_metrics.connection_error += 1
+            if error_type == ErrorTypes.CONNECTION_ERROR:
+                if should_update_metrics:
+                    self._increment_metric('connection_error')
                 # Get originating Exception in Exception chain
                 error_class = str(exception.__class__)
                 err_type = '<' + error_class[error_class.find('\'') + 1: error_class.rfind('\'')] + '>'
@@ -9130,21 +10722,23 @@ if 'requests' in sys.modules:
                 err_msg = 'Verify that the server URL parameter' \
                     ' is correct and that you have access to the server from your host.' \
                     '\nError Type: {}'.format(err_type)
-                if exception.errno and exception.strerror:
-                    err_msg += '\nError Number: [{}]\nMessage: {}\n'.format(exception.errno, exception.strerror)
+                errno = getattr(exception, 'errno', None)
+                strerror = getattr(exception, 'strerror', None)
+                if errno and strerror:
+                    err_msg += '\nError Number: [{}]\nMessage: {}\n'.format(errno, strerror)
                 else:
                     err_msg += '\n{}'.format(str(exception))
                 raise DemistoException(err_msg, exception)
-
-            except requests.exceptions.RetryError as exception:
-                if with_metrics:
-                    self.execution_metrics.retry_error += 1
+            if error_type == ErrorTypes.RETRY_ERROR:
+                if should_update_metrics:
+                    self._increment_metric('retry_error')
                 try:
                     reason = 'Reason: {}'.format(exception.args[0].reason.args[0])
                 except Exception:  # noqa: disable=broad-except
                     reason = ''
                 err_msg = 'Max Retries Error- Request attempts with {} retries failed. \n{}'.format(retries, reason)
                 raise DemistoException(err_msg, exception)
+            raise exception
 
         def _handle_error(self, error_handler, res, should_update_metrics):
             """ Handles error response by calling error handler or default handler.
@@ -9203,6 +10797,115 @@ if 'requests' in sys.modules:
 
             return self.cast_response(res, resp_type)
 
+        def _lookup_response_cache(self, method, address, params, data, json_data, headers, auth, use_cache, stream):
+            """ Looks up the response of a request in the response cache of the client, if it has one and the request
+            should be cached. Shared by the clients, so the cache is used the same whatever the HTTP library.
+
+            :return: The cache key of the request (None if it is not cached), the cached response to revalidate,
+                the cached response to return without sending the request, and the headers to send the request with.
+            :rtype: ``tuple``
+            """
+            if self._response_cache is None or stream or not (use_cache or (use_cache is None and method.upper() == 'GET')):
+                return None, None, None, headers
+            cache_key = ResponseCache.make_key(
+                method, address, params, data, json_data, headers=dict(self._session.headers, **(headers or {})),
+                auth=auth or getattr(self._session, 'auth', None))
+            cached = self._response_cache.get(cache_key)
+            if cached and cached[1]:
+                self._increment_metric('cache_hits')
+                return cache_key, None, cached[0], headers
+            if cached:
+                return cache_key, cached[0], None, dict(headers or {}, **{'If-None-Match': cached[0]['etag']})
+            self._increment_metric('cache_misses')
+            return cache_key, None, None, headers
+
+        def _get_rate_limit_bucket(self, address, rate_limit_bucket=None):
+            """ Gets the rate limiter bucket of a request, which is its host unless a bucket name is given.
+
+            :rtype: ``str``
+            """
+            return rate_limit_bucket or requests.compat.urlparse(address).netloc
+
+        def _check_circuit_breaker(self, address):
+            """ Raises a DemistoException if the circuit of the server of a request is open, see ``CircuitBreaker``.
+
+            :return: The name of the circuit of the request, or None if the client has no circuit breaker.
+            :rtype: ``str``
+            """
+            if self._circuit_breaker is None:
+                return None
+            circuit = '{0.scheme}://{0.netloc}'.format(requests.compat.urlparse(address))
+            self._circuit_breaker.before_request(circuit)
+            return circuit
+
+        def _record_response(self, method, address, res, total_time, circuit, rate_limit_bucket, cache_key,
+                             cached_entry):
+            """ Records a received response in the circuit breaker, the latency metrics, the rate limiter and the
+            response cache of the client. Shared by the clients, so a response is recorded the same whatever the
+            HTTP library.
+
+            :return: The response, which is the cached one if it was revalidated, and whether it was revalidated.
+            :rtype: ``tuple``
+            """
+            if circuit:
+                self._circuit_breaker.record_success(circuit)  # type: ignore[union-attr]
+            self._record_latency(method, address, res, total_time)
+            if self._rate_limiter is not None:
+                bucket = self._rate_limiter.get_bucket(rate_limit_bucket)
+                if res.status_code == 429:
+                    bucket.throttle(parse_retry_after(res.headers.get('Retry-After'),
+                                                      self._rate_limiter.max_wait or XSIAM_MAX_BACKOFF_TIME))
+                else:
+                    bucket.recover()
+            revalidated = cached_entry is not None and res.status_code == 304
+            if revalidated:
+                self._increment_metric('cache_hits')
+                self._response_cache.refresh(cache_key)  # type: ignore[union-attr]
+                res = self._response_from_cache(cached_entry)
+            elif cached_entry is not None:
+                self._increment_metric('cache_misses')
+            return res, revalidated
+
+        def _cache_response(self, cache_key, res):
+            """ Caches a successful response, unless the server asked not to store it.
+
+            :type cache_key: ``str``
+            :param cache_key: The cache key of the request, see ``ResponseCache.make_key``.
+
+            :type res: ``requests.Response``
+            :param res: The response to cache.
+            """
+            if 'no-store' in res.headers.get('Cache-Control', ''):
+                return
+            self._response_cache.set(cache_key, {  # type: ignore[union-attr]
+                'status_code': res.status_code,
+                'reason': res.reason,
+                'headers': dict(res.headers),
+                'content': res.content,
+                'encoding': res.encoding,
+                'url': res.url,
+                'etag': res.headers.get('ETag'),
+            })
+
+        @staticmethod
+        def _response_from_cache(entry):
+            """ Builds a response from a cached one.
+
+            :type entry: ``dict``
+            :param entry: The cached response, see ``ResponseCache.set``.
+
+            :return: The response.
+            :rtype: ``requests.Response``
+            """
+            res = requests.Response()
+            res.status_code = entry['status_code']
+            res.reason = entry['reason']
+            res.headers = requests.structures.CaseInsensitiveDict(entry['headers'])
+            res._content = entry['content']
+            res.encoding = entry['encoding']
+            res.url = entry['url']
+            return res
+
         def cast_response(self, res, resp_type, raise_on_error=True):
             resp_type = resp_type.lower()
             try:
@@ -9214,7 +10917,7 @@ if 'requests' in sys.modules:
                     return res.content
                 if resp_type == 'xml':
                     ET.fromstring(res.text)
-                if resp_type == 'response':
+                if resp_type in ('response', 'stream'):
                     return res
                 return res
             except ValueError as exception:
@@ -9222,6 +10925,62 @@ if 'requests' in sys.modules:
                     raise DemistoException('Failed to parse {} object from response: {}'  # type: ignore[str-bytes-safe]
                                            .format(resp_type, res.content), exception, res)
 
+        def _increment_metric(self, metric_name):
+            """ Increments an execution metric. Safe to call from multiple threads.
+
+            :type metric_name: ``str``
+            :param metric_name: The name of the ExecutionMetrics attribute to increment, for example: 'success'.
+            """
+            with self.execution_metrics._counters_lock:
+                setattr(self.execution_metrics, metric_name, getattr(self.execution_metrics, metric_name) + 1)
+
+        def _get_latency_endpoint(self, method, address):
+            """ Gets the endpoint to record the latency of a request under. The IDs in the path, such as numbers,
+            UUIDs and long hexadecimal strings, are replaced with {id}, so all the requests to the same API are
+            recorded together.
+            Note: this method can be overriden by subclass to group the requests differently.
+
+            :type method: ``str``
+            :param method: The HTTP method of the request.
+
+            :type address: ``str``
+            :param address: The full URL of the request.
+
+            :return: The endpoint, for example: 'GET /alerts/{id}'.
+            :rtype: ``str``
+            """
+            path = requests.compat.urlparse(address).path or '/'
+            return '{} {}'.format(method.upper(), LATENCY_ENDPOINT_ID_REGEX.sub('/{id}', path))
+
+        def _record_latency(self, method, address, res, total_time):
+            """ Records the timing and size of a response in the latency histograms of the execution metrics.
+
+            :type method: ``str``
+            :param method: The HTTP method of the request.
+
+            :type address: ``str``
+            :param address: The full URL of the request.
+
+            :type res: ``requests.Response``
+            :param res: The response of the request.
+
+            :type total_time: ``float``
+            :param total_time: The seconds from sending the request until the response was received.
+            """
+            try:
+                if res.raw is not None and not getattr(res, '_content_consumed', True):
+                    # the content of a streamed response is not downloaded yet
+                    content_length = res.headers.get('Content-Length')
+                    response_size = int(content_length) if content_length and content_length.isdigit() else None
+                else:
+                    response_size = len(res.content or b'')
+                elapsed = getattr(res, 'elapsed', None)
+                self.execution_metrics.record_latency(self._get_latency_endpoint(method, address),
+                                                      elapsed.total_seconds() if elapsed else None, total_time,
+                                                      response_size)
+            except Exception as e:  # noqa
+                demisto.debug('Failed to record the latency of {} {}: {}'.format(method, address, e))
+
         def _update_metrics(self, res, success):
             """ Updates execution metrics based on response and success flag.
 
@@ -9233,17 +10992,17 @@ if 'requests' in sys.modules:
             """
             if success:
                 if not self.is_polling_in_progress(res):
-                    self.execution_metrics.success += 1
+                    self._increment_metric('success')
             else:
                 error_type = self.determine_error_type(res)
                 if error_type == ErrorTypes.QUOTA_ERROR:
-                    self.execution_metrics.quota_error += 1
+                    self._increment_metric('quota_error')
                 elif error_type == ErrorTypes.AUTH_ERROR:
-                    self.execution_metrics.auth_error += 1
+                    self._increment_metric('auth_error')
                 elif error_type == ErrorTypes.SERVICE_ERROR:
-                    self.execution_metrics.service_error += 1
+                    self._increment_metric('service_error')
                 elif error_type == ErrorTypes.GENERAL_ERROR:
-                    self.execution_metrics.general_error += 1
+                    self._increment_metric('general_error')
 
         def determine_error_type(self, response):
             """ Determines the type of error based on response status code and content.
@@ -9318,12 +11077,330 @@ if 'requests' in sys.modules:
             Might raise an AttributeError exception if execution_metrics is not initialized.
             """
             try:
+                if self.execution_metrics.latency and is_debug_mode():
+                    demisto.debug('API latency per endpoint:\n{}'.format(self.execution_metrics.get_latency_summary()))
                 if self.execution_metrics.metrics:
+                    if self.report_latency and self.execution_metrics.latency:
+                        self.execution_metrics.metrics.latency_metrics = self.execution_metrics.get_latency_metrics()
                     return_results(cast(CommandResults, self.execution_metrics.metrics))
             except AttributeError:
                 pass
 
 
+    class AsyncBaseClient(BaseClient):
+        """Client for integrations that send many independent requests, such as enriching a large number of
+        indicators. ``arequest`` sends a request without blocking and returns an asyncio future, so many requests
+        are in flight at once, and ``arequest_many`` sends a batch of requests with a bounded concurrency.
+        The responses and errors are handled exactly like in ``BaseClient._http_request``, including the execution
+        metrics, and the synchronous ``_http_request`` is still available.
+
+        The requests are sent with httpx when it is installed. Otherwise, each request is sent with the requests
+        session of the client on a pool of max_concurrency threads. Requires Python 3.
+
+        >>> client = AsyncBaseClient(base_url, verify=verify, proxy=proxy, max_concurrency=20)
+        >>> results = client.request_many([{'method': 'GET', 'url_suffix': '/ip/' + ip} for ip in ips])
+
+        :type max_concurrency: ``int``
+        :param max_concurrency: The default maximal number of requests in flight at once.
+
+        For the other arguments, see ``BaseClient``.
+
+        :return: No data returned
+        :rtype: ``None``
+        """
+
+        def __init__(
+            self,
+            base_url,
+            verify=True,
+            proxy=False,
+            ok_codes=tuple(),
+            headers=None,
+            auth=None,
+            timeout=BaseClient.REQUESTS_TIMEOUT,
+            max_concurrency=10,
+            response_cache=None,
+            rate_limiter=None,
+            http2=False,
+            report_latency=False,
+            circuit_breaker=None,
+        ):
+            if not IS_PY3:
+                raise DemistoException('AsyncBaseClient is supported only in Python 3.')
+            super(AsyncBaseClient, self).__init__(base_url, verify=verify, proxy=proxy, ok_codes=ok_codes,
+                                                  headers=headers, auth=auth, timeout=timeout,
+                                                  response_cache=response_cache, rate_limiter=rate_limiter, http2=http2,
+                                                  report_latency=report_latency, circuit_breaker=circuit_breaker)
+            self.http2 = http2
+            import asyncio
+            self._asyncio = asyncio
+            try:
+                import httpx  # type: ignore
+            except ImportError:
+                httpx = None
+            self._httpx = httpx
+            self.max_concurrency = max_concurrency
+            self._async_session = None  # type: Any
+            self._async_session_loop = None  # type: Any
+            self._executor = None  # type: Any
+
+        def __del__(self):
+            if getattr(self, '_executor', None) is not None:
+                self._executor.shutdown(wait=False)
+            super(AsyncBaseClient, self).__del__()
+
+        def _get_event_loop(self):
+            try:
+                return self._asyncio.get_running_loop()
+            except RuntimeError:
+                return self._asyncio.get_event_loop()
+
+        def _get_async_session(self, loop):
+            # an httpx session is bound to the event loop it was first used in
+            if self._async_session is None or self._async_session_loop is not loop:
+                limits = self._httpx.Limits(max_connections=self.max_concurrency)
+                try:
+                    self._async_session = self._httpx.AsyncClient(verify=self._verify, limits=limits, http2=self.http2)
+                except ImportError:
+                    demisto.debug('The h2 package is not installed, using HTTP/1.1.')
+                    self._async_session = self._httpx.AsyncClient(verify=self._verify, limits=limits)
+                self._async_session_loop = loop
+            return self._async_session
+
+        def _get_executor(self):
+            if self._executor is None:
+                try:
+                    support_multithreading()
+                except AttributeError:
+                    demisto.debug('Could not add a lock on the server calls, the demisto object does not support it.')
+                self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
+            return self._executor
+
+        def _send_async_request(self, loop, method, address, headers, auth, params, data, json_data, files, timeout,
+                                **kwargs):
+            """ Sends a request with httpx, without waiting for its response.
+
+            :return: The httpx task sending the request.
+            :rtype: ``asyncio.Task``
+            """
+            if isinstance(timeout, tuple):
+                timeout = self._httpx.Timeout(timeout[1], connect=timeout[0])
+            if isinstance(data, (bytes, str)):
+                kwargs['content'] = data
+                data = None
+            return loop.create_task(self._get_async_session(loop).request(
+                method,
+                address,
+                params=params,
+                data=data,
+                json=json_data,
+                files=files,
+                headers=headers,
+                auth=_requests_auth_to_httpx(self._httpx, auth),
+                timeout=timeout,
+                **kwargs
+            ))
+
+        def arequest(self, method, url_suffix='', full_url=None, headers=None, auth=None, json_data=None,
+                     params=None, data=None, files=None, timeout=None, resp_type='json', ok_codes=None,
+                     return_empty_response=False, error_handler=None, empty_valid_codes=None, params_parser=None,
+                     with_metrics=False, use_cache=None, rate_limit_bucket=None, **kwargs):
+            """Sends a request without blocking. Must be called from a thread with an event loop.
+            The arguments are the same as in ``_http_request``, except for the retry arguments which are
+            not supported. The response cache, rate limiter and circuit breaker of the client are used the same.
+
+            :return: A future resolved with the same value ``_http_request`` returns for the request,
+                or with the same exception it raises.
+            :rtype: ``asyncio.Future``
+            """
+            loop = self._get_event_loop()
+            if self._httpx is None:
+                return loop.run_in_executor(self._get_executor(), lambda: self._http_request(
+                    method, url_suffix=url_suffix, full_url=full_url, headers=headers, auth=auth, json_data=json_data,
+                    params=params, data=data, files=files, timeout=timeout, resp_type=resp_type, ok_codes=ok_codes,
+                    return_empty_response=return_empty_response, error_handler=error_handler,
+                    empty_valid_codes=empty_valid_codes, params_parser=params_parser, with_metrics=with_metrics,
+                    use_cache=use_cache, rate_limit_bucket=rate_limit_bucket, **kwargs))
+
+            result = loop.create_future()
+            address = full_url if full_url else urljoin(self._base_url, url_suffix)
+            if params_parser:
+                params = urllib.parse.urlencode(params, quote_via=params_parser)
+            auth = auth or self._auth or self._session.auth
+            cache_key, cached_entry, fresh_entry, headers = self._lookup_response_cache(
+                method, address, params, data, json_data, headers or self._headers, auth, use_cache, kwargs.get('stream'))
+            # the headers set on the session of the client, except the defaults of requests
+            default_headers = requests.utils.default_headers()
+            request_headers = requests.structures.CaseInsensitiveDict(
+                [(name, value) for name, value in self._session.headers.items() if default_headers.get(name) != value])
+            request_headers.update(headers or {})
+            headers = dict(request_headers)
+            if fresh_entry is not None:
+                result.set_result(self._handle_success(self._response_from_cache(fresh_entry), resp_type,
+                                                       empty_valid_codes, return_empty_response, False))
+                return result
+            state = {}  # type: Dict[str, Any]
+            try:
+                # checking the circuit first, so the requests it rejects do not consume the rate limit
+                state['circuit'] = self._check_circuit_breaker(address)
+            except Exception as error:
+                result.set_exception(error)
+                return result
+            if self._rate_limiter is not None:
+                rate_limit_bucket = self._get_rate_limit_bucket(address, rate_limit_bucket)
+
+            def send_request(rate_limit_future=None):
+                if result.done():
+                    return
+                if rate_limit_future is not None:
+                    if rate_limit_future.cancelled():
+                        result.cancel()
+                        return
+                    if rate_limit_future.exception() is not None:
+                        result.set_exception(rate_limit_future.exception())
+                        return
+                state['start_time'] = time.time()
+                request_task = self._send_async_request(loop, method, address, headers, auth, params, data, json_data,
+                                                        files, timeout or self.timeout, **kwargs)
+                request_task.add_done_callback(handle_response)
+
+            def handle_response(task):
+                if result.cancelled():
+                    return
+                if task.cancelled():
+                    result.cancel()
+                    return
+                try:
+                    exception = task.exception()
+                    if isinstance(exception, self._httpx.HTTPError):
+                        error_type = _get_httpx_error_type(self._httpx, exception)
+                        requests_exception = _httpx_to_requests_exception(self._httpx, error_type, exception)
+                        if error_type is None and isinstance(exception, self._httpx.TransportError):
+                            is_timeout = isinstance(exception, self._httpx.TimeoutException)
+                            error_type = ErrorTypes.TIMEOUT_ERROR if is_timeout else ErrorTypes.CONNECTION_ERROR
+                        # an SSL error means the server is up
+                        if state['circuit'] and isinstance(exception, self._httpx.TransportError) and \
+                                error_type != ErrorTypes.SSL_ERROR:
+                            self._circuit_breaker.record_failure(state['circuit'])  # type: ignore[union-attr]
+                        self._raise_request_error(error_type, requests_exception, with_metrics)
+                    if exception is not None:
+                        raise exception
+                    res, revalidated = self._record_response(method, address, _httpx_to_requests_response(task.result()),
+                                                             time.time() - state['start_time'], state['circuit'],
+                                                             rate_limit_bucket, cache_key, cached_entry)
+                    if not self._is_status_code_valid(res, ok_codes):
+                        self._handle_error(error_handler, res, with_metrics)
+                    elif cache_key and not revalidated:
+                        self._cache_response(cache_key, res)
+                    result.set_result(self._handle_success(res, resp_type, empty_valid_codes, return_empty_response,
+                                                           with_metrics))
+                except Exception as error:
+                    result.set_exception(error)
+
+            if self._rate_limiter is not None and self._rate_limiter.get_bucket(rate_limit_bucket).try_acquire():
+                # waiting for the rate limit on a thread, so the other requests are not blocked meanwhile
+                loop.run_in_executor(self._get_executor(), self._rate_limiter.acquire,
+                                     rate_limit_bucket).add_done_callback(send_request)
+            else:
+                send_request()
+            return result
+
+        def arequest_many(self, requests_kwargs, max_concurrency=None, return_exceptions=False):
+            """Sends many requests without blocking, with at most max_concurrency of them in flight at once.
+            Must be called from a thread with an event loop.
+
+            :type requests_kwargs: ``Iterable[dict]``
+            :param requests_kwargs: The keyword arguments of ``arequest`` for each request.
+
+            :type max_concurrency: ``int``
+            :param max_concurrency: The maximal number of requests in flight at once. The default is the client's.
+
+            :type return_exceptions: ``bool``
+            :param return_exceptions: Whether to return the exception raised for a request in place of its result,
+                instead of failing on the first error.
+
+            :return: A future resolved with the results of the requests, in the order of the requests.
+            :rtype: ``asyncio.Future``
+            """
+            loop = self._get_event_loop()
+            requests_kwargs = list(requests_kwargs)
+            max_concurrency = max_concurrency or self.max_concurrency
+            result = loop.create_future()
+            results = [None] * len(requests_kwargs)  # type: List[Any]
+            pending_requests = deque(enumerate(requests_kwargs))
+            state = {'in_flight': 0, 'done': 0}
+
+            def send_next_requests():
+                while pending_requests and state['in_flight'] < max_concurrency and not result.done():
+                    index, request_kwargs = pending_requests.popleft()
+                    state['in_flight'] += 1
+                    try:
+                        request_future = self.arequest(**request_kwargs)
+                    except Exception as error:
+                        request_future = loop.create_future()
+                        request_future.set_exception(error)
+                    request_future.add_done_callback(lambda future, index=index: handle_result(index, future))
+
+            def handle_result(index, future):
+                state['in_flight'] -= 1
+                state['done'] += 1
+                if result.done():
+                    return
+                if future.cancelled():
+                    result.cancel()
+                    return
+                exception = future.exception()
+                if exception is not None and not return_exceptions:
+                    result.set_exception(exception)
+                    return
+                results[index] = exception if exception is not None else future.result()
+                if state['done'] == len(results):
+                    result.set_result(results)
+                else:
+                    send_next_requests()
+
+            if not requests_kwargs:
+                result.set_result(results)
+            send_next_requests()
+            return result
+
+        def request_many(self, requests_kwargs, max_concurrency=None, return_exceptions=False):
+            """Sends many requests concurrently and waits for all of them, on a new event loop.
+            For use in commands that are not running in an event loop. See ``arequest_many``.
+
+            :return: The results of the requests, in the order of the requests.
+            :rtype: ``list``
+            """
+            # the requests run on a private loop, so the event loop of the thread is left untouched
+            loop = self._asyncio.new_event_loop()
+            result = loop.create_future()
+
+            def copy_result(requests_future):
+                if requests_future.cancelled():
+                    result.cancel()
+                elif requests_future.exception() is not None:
+                    result.set_exception(requests_future.exception())
+                else:
+                    result.set_result(requests_future.result())
+
+            def send_requests():
+                # called by the running loop, so arequest_many uses it
+                try:
+                    self.arequest_many(requests_kwargs, max_concurrency, return_exceptions).add_done_callback(copy_result)
+                except Exception as error:
+                    result.set_exception(error)
+
+            try:
+                loop.call_soon(send_requests)
+                return loop.run_until_complete(result)
+            finally:
+                if self._async_session is not None and self._async_session_loop is loop:
+                    loop.run_until_complete(self._async_session.aclose())
+                    self._async_session = None
+                    self._async_session_loop = None
+                loop.close()
+
+
 def generic_http_request(method,
                          server_url,
                          timeout=60,
@@ -9698,18 +11775,243 @@ def update_integration_context(context, object_keys=None, sync=True):
     if not object_keys:
         object_keys = {}
 
-    for key, _ in context.items():
-        latest_object = json.loads(integration_context.get(key, '[]'))
-        updated_object = context[key]
+    for key, updated_object in context.items():
         if key in object_keys:
+            # only merged keys need their latest value, the rest are overwritten as is
+            latest_object = deserialize_json(integration_context.get(key, '[]'))
             merged_list = merge_lists(latest_object, updated_object, object_keys[key])
-            integration_context[key] = json.dumps(merged_list)
+            integration_context[key] = serialize_json(merged_list)
         else:
-            integration_context[key] = json.dumps(updated_object)
+            integration_context[key] = serialize_json(updated_object)
 
     return integration_context, version
 
 
+class IntegrationContextDelta(object):
+    """
+    Records changes to keys of the integration context, and commits them to the latest integration context.
+    Only the changed keys are deserialized and serialized again, the other keys are written back as they are stored,
+    and the integration context is not written if no key was changed: a key whose new value equals its stored value,
+    including a value stored in another JSON format or in the legacy non-JSON forms, is not considered changed. When the integration context was changed by someone
+    else before it was written (a version conflict), the changes are applied again to the keys whose value changed
+    in the meantime, and the other keys keep the values computed in the previous attempt.
+
+    >>> delta = IntegrationContextDelta()
+    >>> delta.set('token', token).append('alerts', new_alerts, id_key='id')
+    >>> delta.remove('alerts', closed_alert_ids, id_key='id')
+    >>> delta.commit()
+
+    :return: None
+    :rtype: ``None``
+    """
+
+    _DELETED = object()
+    _UNCHANGED = object()
+
+    def __init__(self):
+        self._changes = OrderedDict()  # type: OrderedDict
+        # the latest value and the changed value of each key in the previous attempt to commit
+        self._applied = {}  # type: Dict[str, tuple]
+
+    def __len__(self):
+        return len(self._changes)
+
+    def set(self, key, value):
+        """
+        Sets the value of a key, replacing the previous changes of the key.
+
+        :type key: ``str``
+        :param key: The integration context key.
+
+        :type value: ``Any``
+        :param value: The value to set, serialized to JSON.
+
+        :return: The delta, to chain more changes.
+        :rtype: ``IntegrationContextDelta``
+        """
+        self._changes[key] = [('set', value)]
+        return self
+
+    def delete(self, key):
+        """
+        Deletes a key, replacing the previous changes of the key.
+
+        :type key: ``str``
+        :param key: The integration context key.
+
+        :return: The delta, to chain more changes.
+        :rtype: ``IntegrationContextDelta``
+        """
+        self._changes[key] = [('delete',)]
+        return self
+
+    def append(self, key, items, id_key=None):
+        """
+        Appends items to the list of a key. An empty list is assumed if the key is not set.
+
+        :type key: ``str``
+        :param key: The integration context key.
+
+        :type items: ``list``
+        :param items: The items to append.
+
+        :type id_key: ``str``
+        :param id_key: If given, an item replaces the item with the same value of id_key in the list, if there is one.
+
+        :return: The delta, to chain more changes.
+        :rtype: ``IntegrationContextDelta``
+        """
+        self._changes.setdefault(key, []).append(('append', list(items), id_key))
+        return self
+
+    def remove(self, key, item_ids, id_key):
+        """
+        Removes items from the list of a key by their ID.
+
+        :type key: ``str``
+        :param key: The integration context key.
+
+        :type item_ids: ``list``
+        :param item_ids: The IDs of the items to remove.
+
+        :type id_key: ``str``
+        :param id_key: The key of the ID in the items.
+
+        :return: The delta, to chain more changes.
+        :rtype: ``IntegrationContextDelta``
+        """
+        self._changes.setdefault(key, []).append(('remove', set(item_ids), id_key))
+        return self
+
+    def _apply_changes(self, key, latest_value):
+        value = None  # type: Any
+        value_loaded = False
+        for change in self._changes[key]:
+            if change[0] == 'set':
+                value, value_loaded = change[1], True
+            elif change[0] == 'delete':
+                value, value_loaded = self._DELETED, True
+            else:
+                if not value_loaded:
+                    value = deserialize_json(latest_value) if isinstance(latest_value, (STRING_OBJ_TYPES, bytes)) \
+                        else latest_value
+                    value_loaded = True
+                if value is None or value is self._DELETED:
+                    value = []
+                if not isinstance(value, list):
+                    raise DemistoException('Cannot {} items of the integration context key {}, its value is not a list.'
+                                           .format(change[0], key))
+                if change[0] == 'append':
+                    _, items, id_key = change
+                    if id_key is None:
+                        value = value + items
+                    else:
+                        positions = {item.get(id_key): index for index, item in enumerate(value)}
+                        value = list(value)
+                        for item in items:
+                            position = positions.get(item[id_key])
+                            if position is None:
+                                positions[item[id_key]] = len(value)
+                                value.append(item)
+                            else:
+                                value[position] = item
+                else:
+                    _, item_ids, id_key = change
+                    value = [item for item in value if item.get(id_key) not in item_ids]
+        return value
+
+    @staticmethod
+    def _is_stored_value(stored_value, value, serialized_value):
+        # the stored value may be JSON in another format, or in the legacy forms: a string which is not JSON, or an object
+        if stored_value == serialized_value:
+            return True
+        if isinstance(stored_value, STRING_OBJ_TYPES) and isinstance(value, STRING_OBJ_TYPES) and stored_value == value:
+            return True
+        try:
+            if isinstance(stored_value, (STRING_OBJ_TYPES, bytes)):
+                stored_value = deserialize_json(stored_value)
+            return serialize_json(stored_value) == serialized_value
+        except (TypeError, ValueError):
+            return False
+
+    def apply(self, integration_context):
+        """
+        Applies the changes to an integration context, without writing it.
+
+        :type integration_context: ``dict``
+        :param integration_context: The integration context, which is not modified.
+
+        :return: The changed integration context, and the keys whose value was changed.
+        :rtype: ``tuple``
+        """
+        # the keys which were not changed keep their stored value as is
+        new_integration_context = dict(integration_context)
+        changed_keys = []
+        for key in self._changes:
+            is_stored = key in integration_context
+            latest_value = integration_context.get(key)
+            applied = self._applied.get(key)
+            if applied is not None and applied[:2] == (is_stored, latest_value):
+                new_value = applied[2]
+            else:
+                new_value = self._apply_changes(key, latest_value)
+                if new_value is not self._DELETED:
+                    serialized_value = serialize_json(new_value)
+                    if is_stored and self._is_stored_value(latest_value, new_value, serialized_value):
+                        new_value = self._UNCHANGED
+                    else:
+                        new_value = serialized_value
+                self._applied[key] = (is_stored, latest_value, new_value)
+            if new_value is self._DELETED:
+                if is_stored:
+                    del new_integration_context[key]
+                    changed_keys.append(key)
+            elif new_value is not self._UNCHANGED:
+                new_integration_context[key] = new_value
+                changed_keys.append(key)
+        return new_integration_context, changed_keys
+
+    def commit(self, sync=True, max_retry_times=CONTEXT_UPDATE_RETRY_TIMES):
+        """
+        Writes the changes to the latest integration context, with multiple attempts on version conflicts,
+        and clears them.
+
+        :type sync: ``bool``
+        :param sync: Whether to save the context directly to the DB.
+
+        :type max_retry_times: ``int``
+        :param max_retry_times: The maximum number of attempts to try.
+
+        :return: The keys whose value was changed.
+        :rtype: ``list``
+        """
+        attempt = 0
+        while True:
+            if attempt == max_retry_times:
+                raise Exception('Failed updating integration context. Max retry attempts exceeded.')
+
+            integration_context, version = get_integration_context_with_version(sync)
+            new_integration_context, changed_keys = self.apply(integration_context)
+            if not changed_keys:
+                demisto.debug('The integration context is up to date, not updating it.')
+                break
+
+            attempt += 1
+            try:
+                set_integration_context(new_integration_context, sync, version)
+                demisto.debug('Successfully updated the integration context keys {} with version {}.'.format(
+                    changed_keys, version))
+                break
+            except ValueError as ve:
+                demisto.debug('Failed updating integration context with version {}: {} Attempts left - {}'
+                              ''.format(version, str(ve), max_retry_times - attempt))
+                time.sleep(randint(1, 100) / 1000.0)  # pylint: disable=E9003
+
+        self._changes.clear()
+        self._applied.clear()
+        return changed_keys
+
+
 class DemistoException(Exception):
     def __init__(self, message, exception=None, res=None, error_type=None, *args):
         self.res = res
@@ -10379,6 +12681,9 @@ def support_multithreading():   # pragma: no cover
     :rtype: ``None``
     """
     global demisto
+    if getattr(demisto, 'lock', None) is not None:
+        # already supported, wrapping the calls again would acquire the same lock twice
+        return
     prev_do = demisto._Demisto__do  # type: ignore[attr-defined]
     demisto.lock = Lock()  # type: ignore[attr-defined]
 
@@ -11100,11 +13405,11 @@ def get_fetch_run_time_range(last_run, first_fetch, look_back=0, timezone=0, dat
     last_run_time = last_run and 'time' in last_run and last_run['time']
     now = get_current_time(timezone)
     if not last_run_time:
-        last_run_time = dateparser.parse(first_fetch, settings={'TIMEZONE': 'UTC', 'RETURN_AS_TIMEZONE_AWARE': True})
+        last_run_time = parse_date(first_fetch, settings={'TIMEZONE': 'UTC', 'RETURN_AS_TIMEZONE_AWARE': True})
         if last_run_time:
             last_run_time += timedelta(hours=timezone)
     else:
-        last_run_time = dateparser.parse(last_run_time, settings={'TIMEZONE': 'UTC', 'RETURN_AS_TIMEZONE_AWARE': True})
+        last_run_time = parse_date(last_run_time, settings={'TIMEZONE': 'UTC', 'RETURN_AS_TIMEZONE_AWARE': True})
 
     if look_back and look_back > 0:
         if now - last_run_time < timedelta(minutes=look_back):
@@ -11156,53 +13461,247 @@ def calculate_new_offset(old_offset, num_incidents, total_incidents):
     return old_offset + num_incidents
 
 
-def filter_incidents_by_duplicates_and_limit(incidents_res, last_run, fetch_limit, id_field):
+class FoundIncidentIds(object):
     """
-    Removes duplicate incidents from response and returns the incidents till limit.
-    The function should be called after getting the get-incidents API response,
-    and by passing the id_field it will filter out the incidents that were already fetched
-    by checking the incident IDs that are saved from the previous fetch in the last run object
+    The IDs of the incidents fetched in the previous runs of a fetch with look back, used to filter out the
+    incidents that were already fetched. The IDs are kept in buckets by the time they were added, so expired IDs
+    are removed a whole bucket at a time. They are saved in the LastRun object as a dict of
+    ``{incident_id: addition_time}``, or, when opted in, serialized to a compressed string to keep the LastRun
+    object small (see the compact_found_incident_ids argument of ``update_last_run_object``). Both are loaded.
 
-    :type incidents_res: ``list``
-    :param incidents_res: The incidents from the API response
+    :type buckets: ``list``
+    :param buckets: The buckets as serialized by ``dumps``, oldest first: the time of the first and of the last
+        addition to the bucket (epoch seconds), and the list of IDs added.
 
-    :type last_run: ``dict``
-    :param last_run: The LastRun object
+    :type bucket_size: ``int``
+    :param bucket_size: IDs added within this number of seconds of the first addition to the newest bucket are added
+        to it. An ID is removed with its bucket, so it is kept until the last addition to its bucket expires.
 
-    :type fetch_limit: ``int``
-    :param fetch_limit: The incidents limit to return
+    :return: None
+    :rtype: ``None``
+    """
 
-    :type id_field: ``str``
-    :param id_field: The incident id field
+    SERIALIZATION_PREFIX = 'zb64:'
 
-    :return: List of incidents after filtering duplicates when len(incidents) <= limit
-    :rtype: ``list``
-    """
-    demisto.debug('lb: Filtering incidents by duplicates and limit')
-    found_incidents = last_run.get('found_incident_ids', {})
+    def __init__(self, buckets=None, bucket_size=60):
+        self.bucket_size = bucket_size
+        # the first addition time of each bucket, to the last addition time and the IDs of the bucket
+        self._buckets = OrderedDict()  # type: OrderedDict
+        self._index = {}  # type: Dict[Any, list]
+        for start_time, end_time, incident_ids in buckets or []:
+            self._buckets[start_time] = [end_time, list(incident_ids)]
+            for incident_id in incident_ids:
+                self._index[incident_id] = self._buckets[start_time][1]
 
-    incidents = []
+    @classmethod
+    def load(cls, found_incident_ids, bucket_size=60):
+        """
+        Loads the found incident IDs saved in a LastRun object.
 
-    demisto.debug('lb: Number of incidents before filtering: {}, their ids: {}'.format(len(incidents_res),
-                                                                                       [incident_res[id_field] for incident_res in incidents_res]))
-    for incident in incidents_res:
-        if incident[id_field] not in found_incidents:
-            incidents.append(incident)
+        :type found_incident_ids: ``str`` or ``dict`` or ``None``
+        :param found_incident_ids: A dict of ``{incident_id: addition_time}``, or the value serialized by ``dumps``.
 
-    demisto.debug('lb: Number of incidents after filtering: {}, their ids: {}'.format(len(incidents),
-                                                                                      [incident[id_field] for incident in incidents]))
-    return incidents[:fetch_limit]
+        :type bucket_size: ``int``
+        :param bucket_size: See ``FoundIncidentIds``.
 
+        :return: The found incident IDs.
+        :rtype: ``FoundIncidentIds``
+        """
+        if isinstance(found_incident_ids, cls):
+            return found_incident_ids
+        if not found_incident_ids:
+            return cls(bucket_size=bucket_size)
+        if isinstance(found_incident_ids, dict):
+            buckets = {}  # type: Dict[int, list]
+            for incident_id, addition_time in found_incident_ids.items():
+                buckets.setdefault(addition_time, []).append(incident_id)
+            return cls([(addition_time, addition_time, buckets[addition_time]) for addition_time in sorted(buckets)],
+                       bucket_size)
+        if isinstance(found_incident_ids, STRING_TYPES) and found_incident_ids.startswith(cls.SERIALIZATION_PREFIX):
+            serialized = base64.b64decode(found_incident_ids[len(cls.SERIALIZATION_PREFIX):])
+            return cls(json.loads(zlib.decompress(serialized).decode('utf-8')), bucket_size)
+        raise ValueError('Unsupported found incident IDs of type {}'.format(type(found_incident_ids)))
+
+    def __contains__(self, incident_id):
+        return incident_id in self._index
+
+    def __len__(self):
+        return len(self._index)
+
+    def add(self, incident_ids, addition_time):
+        """
+        Adds the IDs of fetched incidents. An ID that was already added is moved to the newest bucket.
 
-def get_latest_incident_created_time(incidents, created_time_field, date_format='%Y-%m-%dT%H:%M:%S',
-                                     increase_last_run_time=False):
-    """
-    Gets the latest incident created time
+        :type incident_ids: ``list``
+        :param incident_ids: The incident IDs.
 
-    :type incidents: ``list``
-    :param incidents: List of incidents
+        :type addition_time: ``int``
+        :param addition_time: The epoch time the incidents were fetched in.
 
-    :type created_time_field: ``str``
+        :return: None
+        :rtype: ``None``
+        """
+        if not incident_ids:
+            return
+        newest_start_time = next(reversed(self._buckets)) if self._buckets else None
+        if newest_start_time is not None and addition_time - newest_start_time < self.bucket_size:
+            newest_bucket = self._buckets[newest_start_time]
+            newest_bucket[0] = max(newest_bucket[0], addition_time)
+            bucket = newest_bucket[1]
+        else:
+            bucket = []
+            self._buckets[addition_time] = [addition_time, bucket]
+        for incident_id in incident_ids:
+            previous_bucket = self._index.get(incident_id)
+            if previous_bucket is bucket:
+                continue
+            if previous_bucket is not None:
+                previous_bucket.remove(incident_id)
+            bucket.append(incident_id)
+            self._index[incident_id] = bucket
+
+    def remove_expired(self, current_time, max_age):
+        """
+        Removes the buckets of the IDs added more than max_age seconds ago.
+
+        :type current_time: ``int``
+        :param current_time: The current epoch time.
+
+        :type max_age: ``int``
+        :param max_age: The number of seconds to keep the IDs for.
+
+        :return: The number of IDs removed.
+        :rtype: ``int``
+        """
+        removed_count = 0
+        expired_start_times = []
+        # a new bucket is started only after the last addition to the newest bucket, so the buckets expire in order
+        for start_time, (end_time, bucket) in self._buckets.items():
+            if current_time - end_time <= max_age:
+                break
+            expired_start_times.append(start_time)
+            for incident_id in bucket:
+                del self._index[incident_id]
+            removed_count += len(bucket)
+        for start_time in expired_start_times:
+            del self._buckets[start_time]
+        return removed_count
+
+    def to_dict(self):
+        """
+        Returns the IDs as saved in the LastRun object by default.
+
+        :return: A dict of ``{incident_id: addition_time}``.
+        :rtype: ``dict``
+        """
+        return {incident_id: end_time for end_time, bucket in self._buckets.values() for incident_id in bucket}
+
+    def dumps(self):
+        """
+        Serializes the IDs to a compressed string, to save in the LastRun object.
+
+        :return: The serialized IDs.
+        :rtype: ``str``
+        """
+        serialized = json.dumps([[start_time, end_time, bucket] for start_time, (end_time, bucket) in self._buckets.items()
+                                 if bucket], separators=(',', ':'))
+        return self.SERIALIZATION_PREFIX + base64.b64encode(zlib.compress(serialized.encode('utf-8'))).decode('ascii')
+
+
+def filter_incidents_by_duplicates_and_limit(incidents_res, last_run, fetch_limit, id_field):
+    """
+    Removes duplicate incidents from response and returns the incidents till limit.
+    The function should be called after getting the get-incidents API response,
+    and by passing the id_field it will filter out the incidents that were already fetched
+    by checking the incident IDs that are saved from the previous fetch in the last run object
+
+    :type incidents_res: ``list``
+    :param incidents_res: The incidents from the API response
+
+    :type last_run: ``dict``
+    :param last_run: The LastRun object
+
+    :type fetch_limit: ``int``
+    :param fetch_limit: The incidents limit to return
+
+    :type id_field: ``str``
+    :param id_field: The incident id field
+
+    :return: List of incidents after filtering duplicates when len(incidents) <= limit
+    :rtype: ``list``
+    """
+    demisto.debug('lb: Filtering incidents by duplicates and limit')
+    demisto.debug('lb: Number of incidents before filtering: {}'.format(len(incidents_res)))
+    lazy_debug('lb: The ids of the incidents before filtering: {}',
+               lambda: [incident_res[id_field] for incident_res in incidents_res])
+
+    incidents = list(iter_incidents_by_duplicates_and_limit(incidents_res, last_run, fetch_limit, id_field))
+
+    demisto.debug('lb: Number of incidents after filtering: {}'.format(len(incidents)))
+    lazy_debug('lb: The ids of the incidents after filtering: {}', lambda: [incident[id_field] for incident in incidents])
+    return incidents
+
+
+def iter_incidents_by_duplicates_and_limit(incidents_res, last_run, fetch_limit, id_field):
+    """
+    Iterates over the incidents that were not fetched yet, like ``filter_incidents_by_duplicates_and_limit``,
+    and stops as soon as fetch_limit incidents were found, without consuming the rest of the incidents.
+    The incidents can be given lazily, as an iterator of incidents or of pages of incidents, so when they are
+    requested with ``BaseClient.paginate``, no more pages are requested than needed to reach the limit.
+    A generator of incidents or pages is closed when the iteration stops.
+
+    >>> incidents = list(iter_incidents_by_duplicates_and_limit(
+    >>>     client.paginate('GET', '/alerts', OffsetPagination(items_path='data'), params={'from': start_time}),
+    >>>     last_run, fetch_limit, 'id'))
+
+    :type incidents_res: ``Iterable[dict]`` or ``Iterable[list]``
+    :param incidents_res: The incidents, or the pages of incidents, from the API response
+
+    :type last_run: ``dict``
+    :param last_run: The LastRun object
+
+    :type fetch_limit: ``int``
+    :param fetch_limit: The incidents limit to return
+
+    :type id_field: ``str``
+    :param id_field: The incident id field
+
+    :return: The incidents that were not fetched yet, up to fetch_limit of them
+    :rtype: ``Iterator[dict]``
+    """
+    found_incidents = last_run.get('found_incident_ids') or {}
+    if not isinstance(found_incidents, dict):
+        found_incidents = FoundIncidentIds.load(found_incidents)
+    scanned_count = new_count = 0
+    try:
+        if fetch_limit <= 0:
+            return
+        for incident_or_page in incidents_res:
+            page = incident_or_page if isinstance(incident_or_page, (list, tuple)) else (incident_or_page,)
+            for incident in page:
+                scanned_count += 1
+                if incident[id_field] in found_incidents:
+                    continue
+                yield incident
+                new_count += 1
+                # stopping before the next incident or page is requested
+                if new_count >= fetch_limit:
+                    return
+    finally:
+        demisto.debug('lb: Scanned {} incidents, found {} new incidents'.format(scanned_count, new_count))
+        if hasattr(incidents_res, 'close'):
+            incidents_res.close()
+
+
+def get_latest_incident_created_time(incidents, created_time_field, date_format='%Y-%m-%dT%H:%M:%S',
+                                     increase_last_run_time=False):
+    """
+    Gets the latest incident created time
+
+    :type incidents: ``list``
+    :param incidents: List of incidents
+
+    :type created_time_field: ``str``
     :param created_time_field: The incident created time field
 
     :type date_format: ``str``
@@ -11215,10 +13714,10 @@ def get_latest_incident_created_time(incidents, created_time_field, date_format=
     :rtype: ``str``
     """
     demisto.debug('lb: Getting latest incident created time')
-    latest_incident_time = datetime.strptime(incidents[0][created_time_field], date_format)
+    latest_incident_time = parse_date_with_format(incidents[0][created_time_field], date_format)
 
     for incident in incidents:
-        incident_time = datetime.strptime(incident[created_time_field], date_format)
+        incident_time = parse_date_with_format(incident[created_time_field], date_format)
         if incident_time > latest_incident_time:
             latest_incident_time = incident_time
 
@@ -11254,19 +13753,17 @@ def remove_old_incidents_ids(found_incidents_ids, current_time, look_back):
 
         if current_time - addition_time <= deletion_threshold_in_seconds:
             new_found_incidents_ids[inc_id] = addition_time
-            demisto.debug('lb: Adding incident id: {}, its addition time: {}, deletion_threshold_in_seconds: {}'.format(
-                inc_id, addition_time, deletion_threshold_in_seconds))
-        else:
-            demisto.debug('lb: Removing incident id: {}, its addition time: {}, deletion_threshold_in_seconds: {}'.format(
-                inc_id, addition_time, deletion_threshold_in_seconds))
-    demisto.debug('lb: Number of new found ids: {}, their ids: {}'.format(
-        len(new_found_incidents_ids), new_found_incidents_ids.keys()))
+    demisto.debug('lb: Number of new found ids: {}, removed {} ids added more than {} seconds ago'.format(
+        len(new_found_incidents_ids), len(found_incidents_ids) - len(new_found_incidents_ids),
+        deletion_threshold_in_seconds))
+    lazy_debug('lb: The new found ids: {}', new_found_incidents_ids.keys)
     return new_found_incidents_ids
 
 
-def get_found_incident_ids(last_run, incidents, look_back, id_field, remove_incident_ids):
+def get_found_incident_ids(last_run, incidents, look_back, id_field, remove_incident_ids, compact=False):
     """
     Gets the found incident ids from the last run object and adds the new fetched incident IDs.
+    The IDs older than twice the look back are removed, see ``FoundIncidentIds``.
 
     :type last_run: ``dict``
     :param last_run: The LastRun object
@@ -11280,20 +13777,31 @@ def get_found_incident_ids(last_run, incidents, look_back, id_field, remove_inci
     :type id_field: ``str``
     :param id_field: The incident id field
 
+    :type remove_incident_ids: ``bool``
+    :param remove_incident_ids: Whether to remove the old incident IDs
+
+    :type compact: ``bool``
+    :param compact: Whether to return the IDs serialized by ``FoundIncidentIds.dumps``, or as a dict of
+        ``{incident_id: addition_time}``.
+
     :return: The new incident ids.
-    :rtype: ``dict``
+    :rtype: ``dict`` or ``str``
     """
 
     demisto.debug('lb: Get found incident ids')
-    found_incidents = last_run.get('found_incident_ids', {})
+    look_back_in_seconds = look_back * 60
+    # buckets of a tenth of the look back, so the IDs are kept for at most 10% longer than needed
+    found_incidents = FoundIncidentIds.load(last_run.get('found_incident_ids'),
+                                            bucket_size=max(look_back_in_seconds // 10, 1))
     current_time = int(time.time())
 
-    for incident in incidents:
-        found_incidents[incident[id_field]] = current_time
+    found_incidents.add([incident[id_field] for incident in incidents], current_time)
     if remove_incident_ids:
-        found_incidents = remove_old_incidents_ids(found_incidents, current_time, look_back)
+        removed_count = found_incidents.remove_expired(current_time, look_back_in_seconds * 2)
+        demisto.debug('lb: Removed {} old incident ids, current time is {}, number of found ids: {}'.format(
+            removed_count, current_time, len(found_incidents)))
 
-    return found_incidents
+    return found_incidents.dumps() if compact else found_incidents.to_dict()
 
 
 def create_updated_last_run_object(last_run, incidents, fetch_limit, look_back, start_fetch_time, end_fetch_time,
@@ -11338,7 +13846,10 @@ def create_updated_last_run_object(last_run, incidents, fetch_limit, look_back,
     demisto.debug("lb: Create updated last run object, len(incidents) is {},"
                   "look_back is {}, fetch_limit is {}, new_offset is {}".format(len(incidents), look_back, fetch_limit, new_offset))
     remove_incident_ids = True
-    new_limit = len(last_run.get('found_incident_ids', [])) + len(incidents) + fetch_limit
+    found_incident_ids = last_run.get('found_incident_ids') or {}
+    if not isinstance(found_incident_ids, dict):
+        found_incident_ids = FoundIncidentIds.load(found_incident_ids)
+    new_limit = len(found_incident_ids) + len(incidents) + fetch_limit
     if new_offset:
         # if we need to update the offset, we need to keep the old time and just update the offset
         new_last_run = {
@@ -11370,7 +13881,8 @@ def create_updated_last_run_object(last_run, incidents, fetch_limit, look_back,
 
 
 def update_last_run_object(last_run, incidents, fetch_limit, start_fetch_time, end_fetch_time, look_back,
-                           created_time_field, id_field, date_format='%Y-%m-%dT%H:%M:%S', increase_last_run_time=False, new_offset=None):
+                           created_time_field, id_field, date_format='%Y-%m-%dT%H:%M:%S', increase_last_run_time=False, new_offset=None,
+                           compact_found_incident_ids=False):
     """
     Updates the LastRun object with the next fetch time and limit and with the new fetched incident IDs.
 
@@ -11407,6 +13919,10 @@ def update_last_run_object(last_run, incidents, fetch_limit, start_fetch_time, e
     :type new_offset: ``int | None``
     :param new_offset: The new offset to set in the last run
 
+    :type compact_found_incident_ids: ``bool``
+    :param compact_found_incident_ids: Whether to save the found incident IDs as a compressed string instead of
+        a dict of ``{incident_id: addition_time}``. Only integrations that do not read the IDs themselves should
+        opt in, as the string can only be read with ``FoundIncidentIds.load``.
 
     :return: The updated LastRun object
     :rtype: ``Dict``
@@ -11414,7 +13930,10 @@ def update_last_run_object(last_run, incidents, fetch_limit, start_fetch_time, e
     if not look_back:
         look_back = 0
 
-    updated_last_run, remove_incident_ids = create_updated_last_run_object(last_run,
+    # loading the found incident IDs once for both of the helpers
+    found_incidents = FoundIncidentIds.load(last_run.get('found_incident_ids'), bucket_size=max(look_back * 60 // 10, 1))
+    current_last_run = dict(last_run, found_incident_ids=found_incidents)
+    updated_last_run, remove_incident_ids = create_updated_last_run_object(current_last_run,
                                                                            incidents,
                                                                            fetch_limit,
                                                                            look_back,
@@ -11426,9 +13945,8 @@ def update_last_run_object(last_run, incidents, fetch_limit, start_fetch_time, e
                                                                            new_offset
                                                                            )
 
-    found_incidents = get_found_incident_ids(last_run, incidents, look_back, id_field, remove_incident_ids)
-
-    updated_last_run['found_incident_ids'] = found_incidents
+    updated_last_run['found_incident_ids'] = get_found_incident_ids(current_last_run, incidents, look_back, id_field,
+                                                                    remove_incident_ids, compact=compact_found_incident_ids)
     last_run.update(updated_last_run)
 
     return last_run
@@ -11566,6 +14084,477 @@ class YMLMetadataCollector:
         return command_wrapper
 
 
+class TokenBucketRateLimiter(object):
+    """
+    A thread-safe token bucket rate limiter. Tokens are added to the bucket at a constant rate up to its capacity,
+    and each request consumes one, so requests are sent at the rate on average and in bursts of at most the capacity.
+    When the server throttles the requests, the rate is halved (down to min_rate) and restored gradually
+    as requests succeed again.
+
+    :type rate: ``float``
+    :param rate: The number of tokens added to the bucket per second.
+
+    :type capacity: ``float``
+    :param capacity: The maximal number of tokens in the bucket. The default is the rate.
+
+    :type min_rate: ``float``
+    :param min_rate: The minimal rate to slow down to when throttled. The default is a tenth of the rate.
+
+    :return: None
+    :rtype: ``None``
+    """
+
+    def __init__(self, rate, capacity=None, min_rate=None):
+        self.max_rate = float(rate)
+        self.rate = float(rate)
+        self.min_rate = float(min_rate or rate / 10.0)
+        self.capacity = float(capacity or rate)
+        self._tokens = self.capacity
+        self._last_refill = time.time()
+        self._paused_until = 0.0
+        self._lock = Lock()
+
+    def _refill(self, now):
+        if now > self._last_refill:
+            self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+            self._last_refill = now
+
+    def try_acquire(self, tokens=1):
+        """
+        Consumes tokens from the bucket if they are available.
+
+        :type tokens: ``int``
+        :param tokens: The number of tokens to consume.
+
+        :return: 0 if the tokens were consumed, otherwise the number of seconds until they are available.
+        :rtype: ``float``
+        """
+        with self._lock:
+            now = time.time()
+            if now < self._paused_until:
+                return self._paused_until - now
+            self._refill(now)
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens=1, max_wait=None):
+        """
+        Consumes tokens from the bucket, waiting until they are available.
+
+        :type tokens: ``int``
+        :param tokens: The number of tokens to consume.
+
+        :type max_wait: ``float``
+        :param max_wait: The maximal number of seconds to wait. A DemistoException is raised, without consuming
+            the tokens, if they would not be available by then. The default is to wait as long as needed.
+
+        :return: The number of seconds waited.
+        :rtype: ``float``
+        """
+        wait_time = self.try_acquire(tokens)
+        if not wait_time:
+            return 0.0
+        start_time = time.time()
+        while wait_time > 0:
+            waited = time.time() - start_time
+            if max_wait is not None and waited + wait_time > max_wait:
+                raise DemistoException('The rate limit was reached, the tokens are not available within {:.1f} seconds '
+                                       'after waiting {:.1f} seconds.'.format(max_wait, waited),
+                                       error_type=ErrorTypes.QUOTA_ERROR)
+            time.sleep(wait_time)  # pylint: disable=sleep-exists
+            wait_time = self.try_acquire(tokens)
+        return time.time() - start_time
+
+    def throttle(self, retry_after=None):
+        """
+        Slows down the limiter after the server rejected a request due to its rate limit.
+
+        :type retry_after: ``float``
+        :param retry_after: The number of seconds the server asked to wait, no tokens are given until it passes.
+
+        :return: None
+        :rtype: ``None``
+        """
+        with self._lock:
+            now = time.time()
+            self.rate = max(self.min_rate, self.rate / 2)
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+            self._tokens = 0
+            self._last_refill = max(now, self._paused_until)
+
+    def recover(self):
+        """
+        Gradually restores the rate after a request was accepted by the server.
+
+        :return: None
+        :rtype: ``None``
+        """
+        if self.rate < self.max_rate:
+            with self._lock:
+                self.rate = min(self.max_rate, self.rate + self.max_rate / 10.0)
+
+    def get_state(self):
+        """
+        :return: The state of the limiter, to be restored with ``set_state``.
+        :rtype: ``dict``
+        """
+        with self._lock:
+            return {'tokens': self._tokens, 'rate': self.rate, 'last_refill': self._last_refill,
+                    'paused_until': self._paused_until}
+
+    def set_state(self, state):
+        """
+        Restores the state of the limiter, for example from a previous run. The tokens are refilled for the time
+        that passed since.
+
+        :type state: ``dict``
+        :param state: The state returned by ``get_state``.
+
+        :return: None
+        :rtype: ``None``
+        """
+        with self._lock:
+            self._tokens = min(self.capacity, state.get('tokens', self.capacity))
+            self.rate = min(self.max_rate, state.get('rate', self.rate))
+            self._last_refill = state.get('last_refill', self._last_refill)
+            self._paused_until = state.get('paused_until', 0.0)
+
+
+XSIAM_RATE_LIMITER = TokenBucketRateLimiter(XSIAM_MAX_REQUESTS_PER_SECOND)
+
+
+class ClientRateLimiter(object):
+    """
+    Limits the requests of ``BaseClient`` before they are sent, with a token bucket per host or per bucket name,
+    so the quotas of the APIs are not wasted on rejected requests. When a request is rejected anyway (429),
+    the rate of its bucket is lowered, see ``TokenBucketRateLimiter``.
+    The limiter is thread-safe and can be shared by several clients. Its state can be persisted across runs
+    in the integration context, it is loaded on first use and written back by ``save`` (called by
+    ``BaseClient.save_state``).
+
+    >>> # 4 requests per minute, and 500 per day for the 'search' bucket
+    >>> limiter = ClientRateLimiter(rate=4 / 60.0, bucket_rates={'search': (500 / 86400.0, 500)},
+    >>>                             integration_context_key='rate_limits')
+    >>> client = BaseClient(base_url, rate_limiter=limiter)
+    >>> client._http_request('GET', '/search', rate_limit_bucket='search')
+
+    :type rate: ``float``
+    :param rate: The number of requests allowed per second in each bucket.
+
+    :type capacity: ``float``
+    :param capacity: The maximal number of requests sent at once in each bucket. The default is the rate, or 1.
+
+    :type bucket_rates: ``dict``
+    :param bucket_rates: The rate and capacity of specific buckets, by the bucket name or host.
+
+    :type block: ``bool``
+    :param block: Whether to wait until a request is allowed, or to raise a DemistoException.
+
+    :type max_wait: ``float``
+    :param max_wait: The maximal number of seconds to wait for a request to be allowed before raising
+        a DemistoException. The default is to wait as long as needed.
+
+    :type integration_context_key: ``str``
+    :param integration_context_key: If given, the state of the buckets is persisted in the integration context
+        under this key.
+
+    :return: None
+    :rtype: ``None``
+    """
+
+    def __init__(self, rate, capacity=None, bucket_rates=None, block=True, max_wait=None, integration_context_key=None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1)
+        self.bucket_rates = bucket_rates or {}
+        self.block = block
+        self.max_wait = max_wait
+        self.integration_context_key = integration_context_key
+        self._buckets = {}  # type: Dict[str, TokenBucketRateLimiter]
+        self._saved_states = None  # type: Optional[dict]
+        self._lock = Lock()
+
+    def get_bucket(self, name):
+        """
+        Gets the token bucket of a host or of a bucket name, creating it on first use.
+
+        :type name: ``str``
+        :param name: The host or bucket name.
+
+        :return: The token bucket.
+        :rtype: ``TokenBucketRateLimiter``
+        """
+        with self._lock:
+            bucket = self._buckets.get(name)
+            if bucket is None:
+                rate, capacity = self.bucket_rates.get(name, (self.rate, self.capacity))
+                bucket = TokenBucketRateLimiter(rate, capacity or max(rate, 1))
+                if self.integration_context_key:
+                    if self._saved_states is None:
+                        self._saved_states = self._load_states()
+                    if name in self._saved_states:
+                        bucket.set_state(self._saved_states[name])
+                self._buckets[name] = bucket
+            return bucket
+
+    def _load_states(self):
+        try:
+            states = get_integration_context().get(self.integration_context_key) or {}
+            return deserialize_json(states) if isinstance(states, STRING_OBJ_TYPES) else states
+        except Exception as error:  # noqa: disable=broad-except
+            demisto.debug('Failed loading the rate limiter state, starting with full buckets: {}'.format(error))
+            return {}
+
+    def acquire(self, name):
+        """
+        Waits until a request of a bucket is allowed, or raises a DemistoException if the limiter does not block
+        or the wait would be longer than max_wait.
+
+        :type name: ``str``
+        :param name: The host or bucket name.
+
+        :return: The number of seconds waited.
+        :rtype: ``float``
+        """
+        bucket = self.get_bucket(name)
+        wait_time = bucket.try_acquire()
+        if not wait_time:
+            return 0.0
+        if not self.block or (self.max_wait is not None and wait_time > self.max_wait):
+            raise DemistoException('The rate limit of {} was reached, the next request is allowed in {:.1f} seconds.'.format(
+                name, wait_time), error_type=ErrorTypes.QUOTA_ERROR)
+        demisto.debug('The rate limit of {} was reached, waiting {:.1f} seconds.'.format(name, wait_time))
+        try:
+            return bucket.acquire(max_wait=self.max_wait)
+        except DemistoException:
+            raise DemistoException('The rate limit of {} was reached, no request was allowed within {:.1f} seconds.'.format(
+                name, self.max_wait), error_type=ErrorTypes.QUOTA_ERROR)
+
+    def save(self):
+        """
+        Writes the state of the buckets to the integration context, if it is persisted and was changed.
+
+        :return: None
+        :rtype: ``None``
+        """
+        if not self.integration_context_key or not self._buckets:
+            return
+        with self._lock:
+            states = dict(self._saved_states or {})
+            states.update({name: bucket.get_state() for name, bucket in self._buckets.items()})
+            if states == self._saved_states:
+                return
+            self._saved_states = states
+        set_to_integration_context_with_retries({self.integration_context_key: states})
+
+
+class CircuitBreaker(object):
+    """
+    Stops ``BaseClient`` from sending requests to a server that is down, so the requests fail fast instead of
+    each waiting for the timeout. There is a circuit per server (the scheme and host of the requests):
+    it opens after failure_threshold consecutive connection or timeout errors, and while it is open the requests
+    are rejected with a DemistoException. After the cooldown, a single request is sent as a probe (half-open):
+    if it receives a response the circuit is closed, otherwise it is opened for another cooldown.
+    The circuit breaker is thread-safe and can be shared by several clients. Its state can be persisted across
+    runs in the integration context, it is loaded on first use and written back by ``save`` (called by
+    ``BaseClient.save_state``).
+
+    >>> client = BaseClient(base_url, circuit_breaker=CircuitBreaker(failure_threshold=3, cooldown=300,
+    >>>                                                              integration_context_key='circuit_breaker'))
+
+    :type failure_threshold: ``int``
+    :param failure_threshold: The number of consecutive connection or timeout errors that opens a circuit.
+
+    :type cooldown: ``float``
+    :param cooldown: The number of seconds a circuit stays open before a probe request is allowed.
+
+    :type integration_context_key: ``str``
+    :param integration_context_key: If given, the state of the circuits is persisted in the integration context
+        under this key.
+
+    :return: None
+    :rtype: ``None``
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, cooldown=60, integration_context_key=None):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.integration_context_key = integration_context_key
+        self._circuits = {}  # type: Dict[str, dict]
+        self._saved_states = None  # type: Optional[dict]
+        self._lock = Lock()
+
+    def _get_circuit(self, name):
+        circuit = self._circuits.get(name)
+        if circuit is None:
+            circuit = {'state': self.CLOSED, 'failures': 0, 'opened_at': 0.0}
+            if self.integration_context_key:
+                if self._saved_states is None:
+                    self._saved_states = self._load_states()
+                circuit.update(self._saved_states.get(name) or {})
+            circuit['probe_started_at'] = None
+            self._circuits[name] = circuit
+        return circuit
+
+    def _load_states(self):
+        try:
+            states = get_integration_context().get(self.integration_context_key) or {}
+            return deserialize_json(states) if isinstance(states, STRING_OBJ_TYPES) else states
+        except Exception as error:  # noqa: disable=broad-except
+            demisto.debug('Failed loading the circuit breaker state, starting with closed circuits: {}'.format(error))
+            return {}
+
+    def get_state(self, name):
+        """
+        Gets the state of a circuit.
+
+        :type name: ``str``
+        :param name: The server of the circuit, for example: 'https://example.com'.
+
+        :return: One of CircuitBreaker.CLOSED, CircuitBreaker.OPEN or CircuitBreaker.HALF_OPEN.
+        :rtype: ``str``
+        """
+        with self._lock:
+            return self._get_circuit(name)['state']
+
+    def before_request(self, name):
+        """
+        Checks whether a request may be sent to a server, and raises a DemistoException if its circuit is open.
+        A request sent after the cooldown is the probe of the circuit, and the other requests are rejected until
+        it is answered or until another cooldown passes.
+
+        :type name: ``str``
+        :param name: The server of the circuit, for example: 'https://example.com'.
+
+        :return: None
+        :rtype: ``None``
+        """
+        with self._lock:
+            circuit = self._get_circuit(name)
+            if circuit['state'] == self.CLOSED:
+                return
+            now = time.time()
+            probe_started_at = circuit['probe_started_at']
+            retry_at = max(circuit['opened_at'], probe_started_at or 0) + self.cooldown
+            if now >= retry_at:
+                demisto.debug('The circuit of {} is half-open, sending a probe request.'.format(name))
+                circuit['state'] = self.HALF_OPEN
+                circuit['probe_started_at'] = now
+                return
+        raise DemistoException('The circuit breaker of {} is open after {} consecutive connection errors, the next '
+                               'request is allowed in {:.0f} seconds.'.format(name, circuit['failures'], retry_at - now),
+                               error_type=ErrorTypes.CONNECTION_ERROR)
+
+    def record_success(self, name):
+        """
+        Records that a response was received from a server, closing its circuit.
+
+        :type name: ``str``
+        :param name: The server of the circuit, for example: 'https://example.com'.
+
+        :return: None
+        :rtype: ``None``
+        """
+        with self._lock:
+            circuit = self._get_circuit(name)
+            if circuit['state'] != self.CLOSED:
+                demisto.debug('The circuit of {} is closed.'.format(name))
+            circuit.update(state=self.CLOSED, failures=0, probe_started_at=None)
+
+    def record_failure(self, name):
+        """
+        Records a connection or timeout error of a server, opening its circuit after failure_threshold
+        consecutive errors, or when the probe request of a half-open circuit failed.
+
+        :type name: ``str``
+        :param name: The server of the circuit, for example: 'https://example.com'.
+
+        :return: None
+        :rtype: ``None``
+        """
+        with self._lock:
+            circuit = self._get_circuit(name)
+            circuit['failures'] += 1
+            if circuit['state'] == self.HALF_OPEN or circuit['failures'] >= self.failure_threshold:
+                if circuit['state'] == self.CLOSED:
+                    demisto.debug('The circuit of {} is open after {} consecutive connection errors.'.format(
+                        name, circuit['failures']))
+                circuit.update(state=self.OPEN, opened_at=time.time(), probe_started_at=None)
+
+    def save(self):
+        """
+        Writes the state of the circuits to the integration context, if it is persisted and was changed.
+
+        :return: None
+        :rtype: ``None``
+        """
+        if not self.integration_context_key or not self._circuits:
+            return
+        with self._lock:
+            states = dict(self._saved_states or {})
+            for name, circuit in self._circuits.items():
+                if name not in states and circuit['state'] == self.CLOSED and not circuit['failures']:
+                    continue
+                states[name] = {'state': self.OPEN if circuit['state'] == self.HALF_OPEN else circuit['state'],
+                                'failures': circuit['failures'], 'opened_at': circuit['opened_at']}
+            if states == self._saved_states:
+                return
+            self._saved_states = states
+        set_to_integration_context_with_retries({self.integration_context_key: states})
+
+
+def parse_retry_after(retry_after, max_retry_after=XSIAM_MAX_BACKOFF_TIME):
+    """
+    Parses the value of a Retry-After response header.
+
+    :type retry_after: ``str``
+    :param retry_after: The header value, either a number of seconds or an HTTP date.
+
+    :type max_retry_after: ``float``
+    :param max_retry_after: The maximal number of seconds to return, so a server cannot stall the command
+        past its timeout. None for no limit.
+
+    :return: The number of seconds to wait, or None if the value is missing or invalid.
+    :rtype: ``float`` or ``None``
+    """
+    if not retry_after:
+        return None
+    try:
+        seconds = max(float(retry_after), 0.0)
+    except ValueError:
+        from email.utils import mktime_tz, parsedate_tz
+        parsed_date = parsedate_tz(retry_after)
+        if not parsed_date:
+            return None
+        seconds = max(mktime_tz(parsed_date) - time.time(), 0.0)
+    return seconds if max_retry_after is None else min(seconds, max_retry_after)
+
+
+def get_backoff_time(attempt_num, backoff_factor=1, max_backoff_time=XSIAM_MAX_BACKOFF_TIME):
+    """
+    Calculates an exponential backoff time with full jitter, so concurrent senders do not retry in lockstep.
+
+    :type attempt_num: ``int``
+    :param attempt_num: The number of the attempt that failed, starting from 1.
+
+    :type backoff_factor: ``float``
+    :param backoff_factor: The base backoff time in seconds.
+
+    :type max_backoff_time: ``float``
+    :param max_backoff_time: The maximal backoff time in seconds.
+
+    :return: A random number of seconds between 0 and backoff_factor * 2 ** attempt_num, capped at max_backoff_time.
+    :rtype: ``float``
+    """
+    return uniform(0, min(max_backoff_time, backoff_factor * (2 ** attempt_num)))
+
+
 def xsiam_api_call_with_retries(
     client,
     xsiam_url,
@@ -11575,7 +14564,10 @@ def xsiam_api_call_with_retries(
     events_error_handler=None,
     error_msg='',
     is_json_response=False,
-    data_type=EVENTS
+    data_type=EVENTS,
+    rate_limiter=None,
+    execution_metrics=None,
+    chunk_stats=None
 ):    # pragma: no cover
     """
     Send the fetched events or assests into the XDR data-collector private api.
@@ -11604,6 +14596,17 @@ def xsiam_api_call_with_retries(
     :type data_type: ``str``
     :param data_type: events or assets
 
+    :type rate_limiter: ``TokenBucketRateLimiter``
+    :param rate_limiter: If given, the rate limiter to wait on before each attempt, which holds back all its senders
+        when XSIAM rejects a request due to its rate limit. For example XSIAM_RATE_LIMITER, shared by the process.
+
+    :type execution_metrics: ``ExecutionMetrics``
+    :param execution_metrics: The metrics to record the retries and throttled time in. The default is the client's.
+
+    :type chunk_stats: ``dict``
+    :param chunk_stats: If given, filled with the number of 'retries', 'throttled_count' (429 responses) and
+        'throttled_time' (seconds) of this call.
+
     :return: Response object or DemistoException
     :rtype: ``requests.Response`` or ``DemistoException``
     """
@@ -11611,26 +14614,48 @@ def xsiam_api_call_with_retries(
     status_code = None
     attempt_num = 1
     response = None
+    attempts = 0
+    throttled_count = 0
+    throttled_time = 0.0
 
-    while status_code != 200 and attempt_num < num_of_attempts + 1:
-        demisto.debug('Sending {data_type} into xsiam, attempt number {attempt_num}'.format(
-            data_type=data_type, attempt_num=attempt_num))
-        # in the last try we should raise an exception if any error occurred, including 429
-        ok_codes = (200, 429) if attempt_num < num_of_attempts else None
-        response = client._http_request(
-            method='POST',
-            full_url=urljoin(xsiam_url, '/logs/v1/xsiam'),
-            data=zipped_data,
-            headers=headers,
-            error_handler=events_error_handler,
-            ok_codes=ok_codes,
-            resp_type='response'
-        )
-        status_code = response.status_code
-        demisto.debug('received status code: {status_code}'.format(status_code=status_code))
-        if status_code == 429:
-            time.sleep(1)
-        attempt_num += 1
+    try:
+        while status_code != 200 and attempt_num < num_of_attempts + 1:
+            if rate_limiter is not None:
+                throttled_time += rate_limiter.acquire()
+            attempts += 1
+            demisto.debug('Sending {data_type} into xsiam, attempt number {attempt_num}'.format(
+                data_type=data_type, attempt_num=attempt_num))
+            # in the last try we should raise an exception if any error occurred, including 429
+            ok_codes = (200, 429) if attempt_num < num_of_attempts else None
+            response = client._http_request(
+                method='POST',
+                full_url=urljoin(xsiam_url, '/logs/v1/xsiam'),
+                data=zipped_data,
+                headers=headers,
+                error_handler=events_error_handler,
+                ok_codes=ok_codes,
+                resp_type='response'
+            )
+            status_code = response.status_code
+            demisto.debug('received status code: {status_code}'.format(status_code=status_code))
+            if status_code == 429:
+                throttled_count += 1
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if rate_limiter is not None:
+                    # the limiter holds back all the senders until the time the server asked for has passed
+                    rate_limiter.throttle(retry_after)
+                if retry_after is None or rate_limiter is None:
+                    backoff_time = get_backoff_time(attempt_num) if retry_after is None else retry_after
+                    time.sleep(backoff_time)  # pylint: disable=sleep-exists
+                    throttled_time += backoff_time
+            elif rate_limiter is not None:
+                rate_limiter.recover()
+            attempt_num += 1
+    finally:
+        retries = max(attempts - 1, 0)
+        (execution_metrics or client.execution_metrics).record_retries(retries, throttled_time)
+        if chunk_stats is not None:
+            chunk_stats.update({'retries': retries, 'throttled_count': throttled_count, 'throttled_time': throttled_time})
     if is_json_response and response:
         response = response.json()
         if response.get('error', '').lower() != 'false':
@@ -11638,35 +14663,999 @@ def xsiam_api_call_with_retries(
     return response
 
 
-def split_data_to_chunks(data, target_chunk_size):
+def is_transient_xsiam_error(error):
     """
-    Splits a string of data into chunks of an approximately specified size.
-    The actual size can be lower.
+    Checks whether sending a chunk into XSIAM failed due to a transient error, so it may succeed if sent again later:
+    a connection error, a rate limit (429) or a server error (5xx). Other errors, e.g. a 400 for a bad payload or
+    401/403 for bad credentials, fail again whenever the chunk is sent.
 
-    :type data: ``list`` or a ``string``
-    :param data: A list of data or a string delimited with \n  to split to chunks.
-    :type target_chunk_size: ``int``
-    :param target_chunk_size: The maximum size of each chunk. The maximal size allowed is 9MB.
+    :type error: ``Exception``
+    :param error: The error raised while sending the chunk.
+
+    :return: Whether the error is transient.
+    :rtype: ``bool``
+    """
+    res = getattr(error, 'res', None)
+    if res is not None and getattr(res, 'status_code', None) is not None:
+        return res.status_code == 429 or res.status_code >= 500
+    if getattr(error, 'error_type', None) in (ErrorTypes.CONNECTION_ERROR, ErrorTypes.QUOTA_ERROR,
+                                              ErrorTypes.TIMEOUT_ERROR, ErrorTypes.PROXY_ERROR):
+        return True
+    # errors raised before a response was received wrap the exception of the HTTP library
+    return isinstance(getattr(error, 'exception', None), Exception)
+
+
+class XSIAMSpillQueue(object):
+    """
+    A disk-backed queue of compressed chunks that could not be sent into XSIAM due to a transient error, so they are
+    delivered on a later run instead of being lost. Each chunk is kept in its own file, together with the request
+    headers it was sent with (except for the authorization header, which is taken from the current request on replay).
+    When the total size of the queue exceeds max_size, the oldest chunks are evicted.
+    Chunks rejected by XSIAM are moved aside into a dead letter directory instead, so they never block the queue.
+
+    :type directory: ``str``
+    :param directory: The directory to keep the spilled chunks in. Created if it does not exist.
+
+    :type max_size: ``int``
+    :param max_size: The maximal total size in bytes of the spilled chunks, and separately of the dead letter chunks.
+
+    :return: None
+    :rtype: ``None``
+    """
+
+    FILE_SUFFIX = '.chunk'
+    DEAD_LETTER_DIRECTORY = 'dead_letter'
+
+    def __init__(self, directory, max_size=XSIAM_SPILL_QUEUE_MAX_SIZE):
+        self.directory = directory
+        self.dead_letter_directory = os.path.join(directory, self.DEAD_LETTER_DIRECTORY)
+        self.max_size = max_size
+        self._sequence = 0
+        self._lock = Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def _chunk_files(self, directory=None):
+        """
+        :return: The paths of the spilled chunks, oldest first.
+        :rtype: ``list``
+        """
+        directory = directory or self.directory
+        if not os.path.isdir(directory):
+            return []
+        file_names = sorted(name for name in os.listdir(directory) if name.endswith(self.FILE_SUFFIX))
+        return [os.path.join(directory, name) for name in file_names]
+
+    def size(self):
+        """
+        :return: The total size in bytes of the spilled chunks.
+        :rtype: ``int``
+        """
+        return sum(os.path.getsize(path) for path in self._chunk_files())
+
+    def __len__(self):
+        return len(self._chunk_files())
+
+    def dead_letter_chunks(self):
+        """
+        :return: The paths of the chunks rejected by XSIAM, oldest first.
+        :rtype: ``list``
+        """
+        return self._chunk_files(self.dead_letter_directory)
+
+    def _write(self, directory, content):
+        """
+        Writes a chunk file into the directory, evicting the oldest chunks in it if it exceeds the maximal size.
+
+        :return: The path of the written chunk.
+        :rtype: ``str``
+        """
+        with self._lock:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+            self._sequence += 1
+            file_name = '{:020d}_{:06d}{}'.format(int(time.time() * 1000000), self._sequence, self.FILE_SUFFIX)
+            path = os.path.join(directory, file_name)
+            # writing to a temporary file first so a partially written chunk is never replayed
+            with open(path + '.tmp', 'wb') as chunk_file:
+                chunk_file.write(content)
+            os.rename(path + '.tmp', path)
+
+            chunk_files = self._chunk_files(directory)
+            total_size = sum(os.path.getsize(chunk_path) for chunk_path in chunk_files)
+            for chunk_path in chunk_files:
+                if total_size <= self.max_size:
+                    break
+                total_size -= os.path.getsize(chunk_path)
+                os.remove(chunk_path)
+                demisto.error('The spill queue exceeded its maximal size, evicted the oldest chunk {}'.format(chunk_path))
+        return path
+
+    def _build_content(self, zipped_data, headers, items_count):
+        metadata = {
+            'headers': {key: value for key, value in headers.items() if key != 'authorization'},
+            'items_count': items_count
+        }
+        content = json.dumps(metadata).encode('utf-8') + b'\n' + zipped_data
+        if len(content) > self.max_size:
+            demisto.error('Dropping a chunk of {} items, its size exceeds the spill queue maximal size.'.format(items_count))
+            return None
+        return content
+
+    def put(self, zipped_data, headers, items_count):
+        """
+        Appends a compressed chunk to the queue, evicting the oldest chunks if the queue exceeds its maximal size.
+
+        :type zipped_data: ``bytes``
+        :param zipped_data: The gzipped chunk.
+
+        :type headers: ``dict``
+        :param headers: The headers of the request the chunk failed to be sent with.
+
+        :type items_count: ``int``
+        :param items_count: The number of events or assets in the chunk.
+
+        :return: None
+        :rtype: ``None``
+        """
+        content = self._build_content(zipped_data, headers, items_count)
+        if content is not None:
+            path = self._write(self.directory, content)
+            demisto.debug('Spilled a chunk of {} items into {}'.format(items_count, path))
+
+    def put_dead_letter(self, zipped_data, headers, items_count, error):
+        """
+        Moves aside a compressed chunk that XSIAM rejected, so it can be inspected but is never replayed.
+
+        :type zipped_data: ``bytes``
+        :param zipped_data: The gzipped chunk.
+
+        :type headers: ``dict``
+        :param headers: The headers of the request the chunk was rejected with.
+
+        :type items_count: ``int``
+        :param items_count: The number of events or assets in the chunk.
+
+        :type error: ``Exception``
+        :param error: The error XSIAM rejected the chunk with.
+
+        :return: None
+        :rtype: ``None``
+        """
+        content = self._build_content(zipped_data, headers, items_count)
+        if content is not None:
+            path = self._write(self.dead_letter_directory, content)
+            demisto.error('XSIAM rejected a chunk of {} items, moved it to {}: {}'.format(items_count, path, error))
+
+    def replay(self, send_chunk, snapshot_id=None):
+        """
+        Sends the spilled chunks oldest first, removing each one once it was sent.
+        A chunk that XSIAM rejects is moved to the dead letter directory and the replay goes on with the next one.
+        Stops at the first chunk that fails due to a transient error, keeping it and the following chunks in the queue.
+
+        :type send_chunk: ``callable``
+        :param send_chunk: A function receiving the gzipped chunk and its headers and sending it.
+            Should raise an exception if the chunk was not sent.
+
+        :type snapshot_id: ``str``
+        :param snapshot_id: The snapshot-id header of the asset snapshot being sent. Spilled asset chunks of other
+            snapshots are dropped, as the new snapshot replaces them.
+
+        :return: The results of the replayed chunks, each holding the number of items ('items_count'), the result of
+            send_chunk ('response') and 'replayed' set to True, and whether all the chunks were replayed.
+            Rejected chunks have 'spilled' and 'dead_letter' set to True instead of a response.
+        :rtype: ``tuple``
+        """
+        results = []
+        for chunk_path in self._chunk_files():
+            with open(chunk_path, 'rb') as chunk_file:
+                metadata, zipped_data = chunk_file.read().split(b'\n', 1)
+            metadata = json.loads(metadata.decode('utf-8'))
+            chunk_snapshot_id = metadata['headers'].get('snapshot-id')
+            if snapshot_id and chunk_snapshot_id and chunk_snapshot_id != snapshot_id:
+                demisto.error('Dropping the spilled chunk {} of the stale asset snapshot {}, replaced by {}'.format(
+                    chunk_path, chunk_snapshot_id, snapshot_id))
+                os.remove(chunk_path)
+                continue
+            try:
+                response = send_chunk(zipped_data, metadata['headers'])
+            except Exception as error:
+                if is_transient_xsiam_error(error):
+                    demisto.debug('Failed replaying the spilled chunk {}, keeping it in the queue: {}'.format(chunk_path, error))
+                    return results, False
+                self.put_dead_letter(zipped_data, metadata['headers'], metadata['items_count'], error)
+                os.remove(chunk_path)
+                results.append({'items_count': metadata['items_count'], 'replayed': True, 'spilled': True,
+                                'dead_letter': True})
+                continue
+            os.remove(chunk_path)
+            results.append({'items_count': metadata['items_count'], 'response': response, 'replayed': True})
+        return results, True
+
+
+_XSIAM_CLIENTS = {}  # type: Dict[Any, Any]
+_XSIAM_CLIENTS_LOCK = Lock()
+
+
+def get_xsiam_client(xsiam_url, proxy=False, pool_size=XSIAM_CONNECTION_POOL_SIZE):
+    """
+    Gets a client for sending data into XSIAM, cached per XSIAM url, so its session, connections and TLS handshakes
+    are reused across calls instead of being created for every send. The proxy setting is applied on every call,
+    the same as when creating a client, as it is kept in the environment of the process rather than in the session.
+    The execution metrics of the client are reset on every call, so they only cover the current send.
+
+    :type xsiam_url: ``str``
+    :param xsiam_url: The URL of XSIAM.
+
+    :type proxy: ``bool``
+    :param proxy: Whether to use the system proxy.
+
+    :type pool_size: ``int``
+    :param pool_size: The minimal number of connections the client keeps open. Should not be lower than the
+        number of chunks sent concurrently.
+
+    :return: The cached client.
+    :rtype: ``BaseClient``
+    """
+    with _XSIAM_CLIENTS_LOCK:
+        client = _XSIAM_CLIENTS.get(xsiam_url)
+        if client is None:
+            client = BaseClient(base_url=xsiam_url, proxy=proxy)
+            _XSIAM_CLIENTS[xsiam_url] = client
+        else:
+            if proxy:
+                ensure_proxy_has_http_prefix()
+            else:
+                skip_proxy()
+            client.execution_metrics = ExecutionMetrics()
+        # resizing the mounted adapters keeps their retry configuration
+        client._set_connection_pool_size(pool_size)
+    return client
+
+
+def close_xsiam_clients():
+    """
+    Closes the sessions of the cached XSIAM clients. Called automatically when the process exits.
+
+    :return: None
+    :rtype: ``None``
+    """
+    with _XSIAM_CLIENTS_LOCK:
+        for client in _XSIAM_CLIENTS.values():
+            try:
+                client._session.close()
+            except Exception:  # noqa: disable=broad-except
+                pass
+        _XSIAM_CLIENTS.clear()
+
+
+atexit.register(close_xsiam_clients)
+
+
+class XSIAMIngestionStats(object):
+    """
+    The telemetry of sending data into XSIAM: the sizes and times of each chunk, and their totals.
+    Comparing the serialize and compress times with the upload time tells whether a collector is CPU-bound
+    or network-bound. Returned by ``send_data_to_xsiam`` and ``send_data_to_xsiam_stream``.
+
+    :type data_type: ``str``
+    :param data_type: events or assets
+
+    :return: None
+    :rtype: ``None``
+    """
+
+    def __init__(self, data_type=EVENTS):
+        self.data_type = data_type
+        self.chunks = []  # type: List[Dict[str, Any]]
+        # the time spent serializing the data before it was split into chunks
+        self.serialize_time = 0.0
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def __bool__(self):
+        # stats are truthy even when no chunks were sent, use chunks_count to check that
+        return True
+
+    __nonzero__ = __bool__
+
+    def __iter__(self):
+        return iter(self.chunks)
+
+    def _total(self, field, include_spilled=True):
+        return sum(chunk.get(field, 0) for chunk in self.chunks if include_spilled or not chunk.get('spilled'))
+
+    @property
+    def chunks_count(self):
+        return len(self.chunks)
+
+    @property
+    def sent_chunks_count(self):
+        return len([chunk for chunk in self.chunks if not chunk.get('spilled')])
+
+    @property
+    def spilled_chunks_count(self):
+        return self.chunks_count - self.sent_chunks_count
+
+    @property
+    def dead_letter_chunks_count(self):
+        return len([chunk for chunk in self.chunks if chunk.get('dead_letter')])
+
+    @property
+    def items_count(self):
+        """
+        :return: The number of items that were sent, not including the spilled ones.
+        :rtype: ``int``
+        """
+        return self._total('items_count', include_spilled=False)
+
+    @property
+    def raw_size(self):
+        return self._total('raw_size')
+
+    @property
+    def zipped_size(self):
+        return self._total('zipped_size')
+
+    @property
+    def compression_ratio(self):
+        return float(self.raw_size) / self.zipped_size if self.zipped_size else 0.0
+
+    @property
+    def total_serialize_time(self):
+        return self.serialize_time + self._total('serialize_time')
+
+    @property
+    def compress_time(self):
+        return self._total('compress_time')
+
+    @property
+    def upload_time(self):
+        return self._total('upload_time')
+
+    @property
+    def retries(self):
+        return self._total('retries')
+
+    @property
+    def throttled_count(self):
+        return self._total('throttled_count')
+
+    @property
+    def throttled_time(self):
+        return self._total('throttled_time')
+
+    def to_dict(self):
+        """
+        :return: The totals of the sent chunks.
+        :rtype: ``dict``
+        """
+        return {
+            'data_type': self.data_type,
+            'chunks_count': self.chunks_count,
+            'spilled_chunks_count': self.spilled_chunks_count,
+            'dead_letter_chunks_count': self.dead_letter_chunks_count,
+            'items_count': self.items_count,
+            'raw_size': self.raw_size,
+            'zipped_size': self.zipped_size,
+            'serialize_time': round(self.total_serialize_time, 3),
+            'compress_time': round(self.compress_time, 3),
+            'upload_time': round(self.upload_time, 3),
+            'retries': self.retries,
+            'throttled_count': self.throttled_count,
+            'throttled_time': round(self.throttled_time, 3),
+        }
+
+    def update_execution_metrics(self, execution_metrics):
+        """
+        Reports the API calls made to send the chunks as execution metrics: the chunks that were sent as successful
+        calls, the 429 responses as quota errors and the chunks that failed and were spilled as general errors.
+
+        :type execution_metrics: ``ExecutionMetrics``
+        :param execution_metrics: The metrics to update.
+
+        :return: None
+        :rtype: ``None``
+        """
+        if self.sent_chunks_count:
+            execution_metrics.success += self.sent_chunks_count
+        if self.throttled_count:
+            execution_metrics.quota_error += self.throttled_count
+        if self.spilled_chunks_count:
+            execution_metrics.general_error += self.spilled_chunks_count
+
+    def __str__(self):
+        return ', '.join('{}={}'.format(key, value) for key, value in self.to_dict().items())
+
+
+def send_data_chunks_to_xsiam(client, data_chunks, xsiam_url, headers, num_of_attempts, events_error_handler=None,
+                              error_msg='', data_type=EVENTS, max_workers=1, max_pending_chunks=None,
+                              execution_metrics=None, spill_queue=None, compression_level=XSIAM_COMPRESSION_LEVEL,
+                              rate_limiter=None):
+    """
+    Compresses and sends chunks of data into the XDR data-collector private api.
+    When max_workers is greater than 1, the chunks are sent through a pipeline: the next chunks are compressed on
+    worker threads while up to max_workers POST requests are in flight, all sharing the session of the given client.
+
+    :type client: ``BaseClient``
+    :param client: base client containing the XSIAM url.
+
+    :type data_chunks: ``Iterable``
+    :param data_chunks: The chunks to send. Each chunk is either a list of serialized items
+        (as yielded by ``split_data_to_chunks``) or a tuple of an already gzipped chunk, the number of items
+        it contains and optionally the stats of building it (as yielded by ``zip_data_to_chunks``).
+
+    :type xsiam_url: ``str``
+    :param xsiam_url: The URL of XSIAM to send the api request.
+
+    :type headers: ``dict``
+    :param headers: headers for the request
+
+    :type num_of_attempts: ``int``
+    :param num_of_attempts: The num of attempts to do in case there is an api limit (429 error codes).
+
+    :type events_error_handler: ``callable``
+    :param events_error_handler: error handler function
+
+    :type error_msg: ``str``
+    :param error_msg: The error message prefix in case of an error.
+
+    :type data_type: ``str``
+    :param data_type: events or assets
+
+    :type max_workers: ``int``
+    :param max_workers: The maximal number of chunks compressed and sent concurrently.
+
+    :type max_pending_chunks: ``int``
+    :param max_pending_chunks: The maximal number of chunks held in memory waiting to be compressed or sent.
+        The default is twice max_workers.
+
+    :type execution_metrics: ``ExecutionMetrics``
+    :param execution_metrics: The metrics to record the retries and throttled time of each chunk in.
+        The default is the client's.
+
+    :type spill_queue: ``XSIAMSpillQueue``
+    :param spill_queue: If given, the chunks spilled on previous runs are replayed first, and chunks that fail to be
+        sent due to a transient error are spilled into it instead of raising an error. Once a chunk is spilled, the
+        following chunks are spilled without trying to send them. Chunks rejected by XSIAM are moved into its dead
+        letter directory.
+
+    :type compression_level: ``int`` or ``str`` or ``AdaptiveCompressionLevel``
+    :param compression_level: The gzip compression level of the chunks that are not compressed yet, from 0 to 9.
+        Use 'auto' (or an AdaptiveCompressionLevel) to adjust the level by comparing compress and upload times.
+
+    :type rate_limiter: ``TokenBucketRateLimiter``
+    :param rate_limiter: If given, the rate limiter to wait on before sending each chunk, see
+        ``xsiam_api_call_with_retries``. The requests are not rate limited by default.
+
+    :return: The result of each chunk, in the order of the chunks. Each result is a dict holding the number of items
+        in the chunk ('items_count'), the XSIAM API response ('response'), the number of 'retries',
+        the number of 429 responses ('throttled_count') and the seconds waited due to rate limits ('throttled_time'),
+        the sizes in bytes before and after compression ('raw_size', 'zipped_size') and the seconds spent on
+        serializing, compressing and uploading the chunk ('serialize_time', 'compress_time', 'upload_time').
+        Chunks that were spilled have 'spilled' set to True, rejected chunks also have 'dead_letter' set to True, and
+        replayed chunks come first with 'replayed' set to True.
+    :rtype: ``list``
+    """
+    spill_event = Event()
+
+    def compress_chunk(data_chunk):
+        if isinstance(data_chunk, tuple):
+            if len(data_chunk) == 2:
+                zipped_data, items_count = data_chunk
+                return zipped_data, items_count, {'zipped_size': len(zipped_data)}
+            return data_chunk
+        level, adaptive_compression = _resolve_compression_level(compression_level)
+        compressor = GzipLinesCompressor(level)
+        for data_part in data_chunk:
+            # the parts may be already serialized by serialize_json_to_bytes
+            compressor.add(data_part if isinstance(data_part, bytes) else data_part.encode('utf-8'))
+        zipped_data = compressor.close()
+        if adaptive_compression:
+            adaptive_compression.record_compression(compressor.compress_time)
+        return zipped_data, len(data_chunk), compressor.stats()
+
+    def send_chunk(compressed_chunk):
+        zipped_data, items_count, chunk_stats = compressed_chunk
+        chunk_result = dict(chunk_stats, items_count=items_count)
+        start_time = time.time()
+        if spill_event.is_set():
+            spill_queue.put(zipped_data, headers, items_count)
+            chunk_result['spilled'] = True
+            return chunk_result
+        try:
+            chunk_result['response'] = xsiam_api_call_with_retries(client=client, events_error_handler=events_error_handler,
+                                                                   error_msg=error_msg, headers=headers,
+                                                                   num_of_attempts=num_of_attempts, xsiam_url=xsiam_url,
+                                                                   zipped_data=zipped_data, is_json_response=True,
+                                                                   data_type=data_type, execution_metrics=execution_metrics,
+                                                                   rate_limiter=rate_limiter, chunk_stats=chunk_result)
+            chunk_result['upload_time'] = time.time() - start_time - chunk_result['throttled_time']
+            _, adaptive_compression = _resolve_compression_level(compression_level)
+            if adaptive_compression:
+                adaptive_compression.record_upload(chunk_result['upload_time'])
+        except DemistoException as error:
+            if spill_queue is None:
+                raise
+            chunk_result['spilled'] = True
+            if not is_transient_xsiam_error(error):
+                # sending the chunk again would fail the same way, so it must not block the following chunks
+                spill_queue.put_dead_letter(zipped_data, headers, items_count, error)
+                chunk_result['dead_letter'] = True
+                return chunk_result
+            demisto.debug('Failed sending a chunk of {} {}, spilling it: {}'.format(items_count, data_type, error))
+            spill_event.set()
+            spill_queue.put(zipped_data, headers, items_count)
+        return chunk_result
+
+    def send_spilled_chunk(zipped_data, spilled_headers):
+        spilled_headers = dict(spilled_headers, authorization=headers.get('authorization'))
+        return xsiam_api_call_with_retries(client=client, events_error_handler=events_error_handler,
+                                           error_msg=error_msg, headers=spilled_headers,
+                                           num_of_attempts=num_of_attempts, xsiam_url=xsiam_url,
+                                           zipped_data=zipped_data, is_json_response=True,
+                                           data_type=data_type, execution_metrics=execution_metrics,
+                                           rate_limiter=rate_limiter)
+
+    replayed_results = []  # type: List[Dict[str, Any]]
+    if spill_queue is not None and len(spill_queue):
+        replayed_results, replayed_all = spill_queue.replay(send_spilled_chunk, snapshot_id=headers.get('snapshot-id'))
+        demisto.debug('Replayed {} spilled chunks, all replayed: {}'.format(len(replayed_results), replayed_all))
+        if not replayed_all:
+            # XSIAM is still unavailable, keeping the new chunks after the ones that are already spilled
+            spill_event.set()
+
+    if max_workers <= 1 or not IS_PY3:
+        results = replayed_results
+        for data_chunk in data_chunks:
+            results.append(send_chunk(compress_chunk(data_chunk)))
+            # releasing the chunk before the next one is requested, as it may be built meanwhile
+            del data_chunk
+        return results
+
+    try:
+        support_multithreading()
+    except AttributeError:
+        demisto.debug('Could not add a lock on the server calls, the demisto object does not support it.')
+
+    max_pending_chunks = max_pending_chunks or 2 * max_workers
+    compress_executor = ThreadPoolExecutor(max_workers=max_workers)
+    upload_executor = ThreadPoolExecutor(max_workers=max_workers)
+    pending_uploads = deque()  # type: ignore[var-annotated]
+    results = replayed_results
+    try:
+        for data_chunk in data_chunks:
+            compress_future = compress_executor.submit(compress_chunk, data_chunk)
+            pending_uploads.append(upload_executor.submit(lambda future: send_chunk(future.result()), compress_future))
+            # waiting for the oldest chunk keeps the results in order and bounds the chunks held in memory
+            if len(pending_uploads) >= max_pending_chunks:
+                results.append(pending_uploads.popleft().result())
+        while pending_uploads:
+            results.append(pending_uploads.popleft().result())
+    finally:
+        for upload_future in pending_uploads:
+            upload_future.cancel()
+        upload_executor.shutdown(wait=True)
+        compress_executor.shutdown(wait=True)
+    return results
+
+
+def _iter_lines(text):
+    """
+    Lazily iterates over the lines of a string delimited with \n, without building a list of all of them.
+
+    :type text: ``str``
+    :param text: The string to iterate over.
+
+    :return: The lines of the string, same as ``text.split('\n')``.
+    :rtype: ``collections.Iterable[str]``
+    """
+    start = 0
+    while True:
+        end = text.find('\n', start)
+        if end == -1:
+            yield text[start:]
+            return
+        yield text[start:end]
+        start = end + 1
+
+
+def _get_encoded_size(data_part):
+    """
+    Gets the size in bytes of a string once encoded to UTF-8, without encoding it when it is plain ASCII.
+
+    :type data_part: ``str`` or ``bytes``
+    :param data_part: The string to measure.
+
+    :return: The size in bytes.
+    :rtype: ``int``
+    """
+    if isinstance(data_part, bytes):
+        return len(data_part)
+    if IS_PY3 and PY_VER_MINOR >= 7 and data_part.isascii():
+        return len(data_part)
+    return len(data_part.encode('utf-8'))
+
+
+def split_data_to_chunks(data, target_chunk_size):
+    """
+    Splits a list of data or a string of data delimited with \n into chunks of an approximately specified size.
+    The size of a chunk is the number of UTF-8 encoded bytes sent for it, including the new line separators,
+    so a chunk exceeds the target size only when it holds a single item which is larger than it.
+
+    :type data: ``list`` or a ``string``
+    :param data: A list of data or a string delimited with \n  to split to chunks.
+    :type target_chunk_size: ``int``
+    :param target_chunk_size: The maximum size in bytes of each chunk. The maximal size allowed is 4MB.
+
+    :return: An iterable of lists where each list contains events with approx size of chunk size.
+    :rtype: ``collections.Iterable[list]``
+    """
+    target_chunk_size = min(target_chunk_size, XSIAM_EVENT_CHUNK_SIZE_LIMIT)
+    chunk = []  # type: ignore[var-annotated]
+    chunk_size = 0
+    if isinstance(data, STRING_OBJ_TYPES):
+        data = _iter_lines(data)
+    for data_part in data:
+        data_part_size = _get_encoded_size(data_part)
+        if chunk:
+            # the new line separating the part from the previous one
+            data_part_size += 1
+            if chunk_size + data_part_size > target_chunk_size:
+                demisto.debug("reached max chunk size, sending chunk with size: {size}".format(size=chunk_size))
+                yield chunk
+                chunk = []
+                chunk_size = 0
+                data_part_size -= 1
+        chunk.append(data_part)
+        chunk_size += data_part_size
+    if chunk:
+        demisto.debug("sending the remaining chunk with size: {size}".format(size=chunk_size))
+        yield chunk
+
+
+class GzipLinesCompressor(object):
+    """
+    Gzips newline-delimited lines as they are added, so a chunk is compressed while it is built instead of
+    after joining all of its lines. The lines are passed to the compressor in batches, which is much faster than
+    compressing them one by one and only holds a small batch in memory besides the compressed data.
+
+    :type compression_level: ``int``
+    :param compression_level: The gzip compression level, from 0 (no compression) to 9 (best compression).
+
+    :return: None
+    :rtype: ``None``
+    """
+
+    BATCH_SIZE = 2 ** 16
+
+    def __init__(self, compression_level=XSIAM_COMPRESSION_LEVEL):
+        # wbits of 16 + MAX_WBITS writes a gzip container, same as gzip.compress
+        self._compressor = zlib.compressobj(compression_level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        self._zipped_parts = []  # type: List[bytes]
+        self._batch = []  # type: List[bytes]
+        self._batch_size = 0
+        self.items_count = 0
+        self.size = 0
+        self.zipped_size = 0
+        self.pending_size = 0
+        self.compress_time = 0.0
+        self.serialize_time = 0.0
+
+    def add(self, encoded_line):
+        """
+        Adds a line to the compressed data.
+
+        :type encoded_line: ``bytes``
+        :param encoded_line: The UTF-8 encoded line, without a new line at its end.
+
+        :return: None
+        :rtype: ``None``
+        """
+        if self.items_count:
+            self._batch.append(b'\n')
+            self._batch_size += 1
+        self._batch.append(encoded_line)
+        self._batch_size += len(encoded_line)
+        self.items_count += 1
+        if self._batch_size >= self.BATCH_SIZE:
+            self._compress_batch()
+
+    def _compress_batch(self):
+        start_time = time.time()
+        zipped_part = self._compressor.compress(b''.join(self._batch))
+        self.compress_time += time.time() - start_time
+        self.size += self._batch_size
+        if zipped_part:
+            self._zipped_parts.append(zipped_part)
+            self.zipped_size += len(zipped_part)
+            # the compressor holds back at most about the last batch
+            self.pending_size = self._batch_size
+        else:
+            self.pending_size += self._batch_size
+        self._batch = []
+        self._batch_size = 0
+
+    def estimated_size(self, compressed=False):
+        """
+        Estimates the size of the data added so far.
+
+        :type compressed: ``bool``
+        :param compressed: Whether to estimate the compressed size, counting the data the compressor did not output
+            yet as uncompressed, or to get the exact uncompressed size.
+
+        :return: The size in bytes.
+        :rtype: ``int``
+        """
+        if compressed:
+            return self.zipped_size + self.pending_size + self._batch_size
+        return self.size + self._batch_size
+
+    def close(self):
+        """
+        Compresses the remaining lines and ends the gzip stream.
+
+        :return: The gzipped data.
+        :rtype: ``bytes``
+        """
+        if self._batch:
+            self._compress_batch()
+        start_time = time.time()
+        zipped_part = self._compressor.flush()
+        self.compress_time += time.time() - start_time
+        self._zipped_parts.append(zipped_part)
+        self.zipped_size += len(zipped_part)
+        self.pending_size = 0
+        return b''.join(self._zipped_parts)
+
+    def stats(self):
+        """
+        :return: The sizes of the compressed data and the time spent, as recorded in ``XSIAMIngestionStats``.
+        :rtype: ``dict``
+        """
+        return {
+            'raw_size': self.size,
+            'zipped_size': self.zipped_size,
+            'serialize_time': self.serialize_time,
+            'compress_time': self.compress_time,
+        }
+
+
+class AdaptiveCompressionLevel(object):
+    """
+    Picks the gzip compression level of XSIAM chunks adaptively, by comparing the time it takes to compress a chunk
+    with the time it takes to upload one. When compressing is slower than uploading, the CPU is the bottleneck
+    and the level is lowered; when compressing is much faster, a higher level is used to send fewer bytes.
+    The times are smoothed over the recent chunks. Safe to use from multiple threads.
+
+    :type level: ``int``
+    :param level: The initial compression level.
+
+    :type min_level: ``int``
+    :param min_level: The lowest compression level to use.
+
+    :type max_level: ``int``
+    :param max_level: The highest compression level to use.
+
+    :type smoothing: ``float``
+    :param smoothing: The weight of the latest time in the smoothed average, between 0 and 1.
+
+    :return: None
+    :rtype: ``None``
+    """
+
+    def __init__(self, level=6, min_level=1, max_level=9, smoothing=0.3):
+        self.level = level
+        self.min_level = min_level
+        self.max_level = max_level
+        self.smoothing = smoothing
+        self._compress_time = None  # type: Optional[float]
+        self._upload_time = None  # type: Optional[float]
+        self._lock = Lock()
+
+    def _smooth(self, average, value):
+        return value if average is None else average + self.smoothing * (value - average)
+
+    def record_compression(self, compress_time):
+        """
+        Records the time it took to compress a chunk.
+
+        :type compress_time: ``float``
+        :param compress_time: The compression time in seconds.
+
+        :return: None
+        :rtype: ``None``
+        """
+        with self._lock:
+            self._compress_time = self._smooth(self._compress_time, compress_time)
+
+    def record_upload(self, upload_time):
+        """
+        Records the time it took to upload a chunk and adjusts the compression level.
+
+        :type upload_time: ``float``
+        :param upload_time: The upload time in seconds, not including waiting on rate limits.
+
+        :return: None
+        :rtype: ``None``
+        """
+        with self._lock:
+            self._upload_time = self._smooth(self._upload_time, upload_time)
+            if self._compress_time is None:
+                return
+            if self._compress_time > self._upload_time and self.level > self.min_level:
+                self.level -= 1
+                demisto.debug('Compressing is slower than uploading, lowered the compression level to {}'.format(self.level))
+            elif self._compress_time * 4 < self._upload_time and self.level < self.max_level:
+                self.level += 1
+                demisto.debug('Uploading is slower than compressing, raised the compression level to {}'.format(self.level))
+
+
+XSIAM_ADAPTIVE_COMPRESSION = AdaptiveCompressionLevel()
+
+
+def _resolve_compression_level(compression_level):
+    """
+    Resolves the compression_level argument of the XSIAM senders.
+
+    :type compression_level: ``int`` or ``str`` or ``AdaptiveCompressionLevel``
+    :param compression_level: A gzip compression level, 'auto' for the shared XSIAM_ADAPTIVE_COMPRESSION,
+        or an AdaptiveCompressionLevel.
+
+    :return: The compression level to use now, and the AdaptiveCompressionLevel to report the times to if any.
+    :rtype: ``tuple``
+    """
+    if compression_level == 'auto':
+        compression_level = XSIAM_ADAPTIVE_COMPRESSION
+    if isinstance(compression_level, AdaptiveCompressionLevel):
+        return compression_level.level, compression_level
+    return int(compression_level), None
+
+
+def zip_data_to_chunks(data, target_chunk_size, measure_compressed_size=False, compression_level=XSIAM_COMPRESSION_LEVEL,
+                       with_stats=False):
+    """
+    Serializes and gzips the data incrementally into chunks of an approximately specified size.
+    Unlike ``split_data_to_chunks``, the data is never joined into a single string, so only the chunk
+    that is currently being built is held in memory.
+
+    :type data: ``Iterable[Union[str, dict]]`` or ``str``
+    :param data: A list, iterator or generator of strings or dicts where each one represents an event or asset,
+        or a string of raw events delimited with \n.
+
+    :type target_chunk_size: ``int``
+    :param target_chunk_size: The maximal size in bytes of each chunk. The maximal size allowed is 4MB.
+
+    :type measure_compressed_size: ``bool``
+    :param measure_compressed_size: Whether the target size applies to the gzipped chunk that is sent instead of
+        the uncompressed data, so each request is filled up to the target size.
+
+    :type compression_level: ``int`` or ``str`` or ``AdaptiveCompressionLevel``
+    :param compression_level: The gzip compression level, 'auto' or an AdaptiveCompressionLevel.
+
+    :type with_stats: ``bool``
+    :param with_stats: Whether to add the stats of building each chunk to the tuples, see ``GzipLinesCompressor.stats``.
 
-    :return: An iterable of lists where each list contains events with approx size of chunk size.
-    :rtype: ``collections.Iterable[list]``
+    :return: An iterable of tuples of the gzipped chunk and the number of items it contains.
+    :rtype: ``collections.Iterable[tuple]``
     """
     target_chunk_size = min(target_chunk_size, XSIAM_EVENT_CHUNK_SIZE_LIMIT)
-    chunk = []  # type: ignore[var-annotated]
-    chunk_size = 0
-    if isinstance(data, str):
-        data = data.split('\n')
+    if isinstance(data, STRING_OBJ_TYPES):
+        data = _iter_lines(data)
+    compressor = None
+    adaptive_compression = None
+    serialize_time = 0.0
+
+    def close_chunk():
+        zipped_data = compressor.close()
+        if adaptive_compression:
+            adaptive_compression.record_compression(compressor.compress_time)
+        if with_stats:
+            return zipped_data, compressor.items_count, compressor.stats()
+        return zipped_data, compressor.items_count
+
     for data_part in data:
-        if chunk_size >= target_chunk_size:
-            demisto.debug("reached max chunk size, sending chunk with size: {size}".format(size=chunk_size))
-            yield chunk
-            chunk = []
-            chunk_size = 0
-        chunk.append(data_part)
-        chunk_size += sys.getsizeof(data_part)
-    if chunk_size != 0:
-        demisto.debug("sending the remaining chunk with size: {size}".format(size=chunk_size))
-        yield chunk
+        if with_stats:
+            start_time = time.time()
+        if isinstance(data_part, dict):
+            encoded_part = serialize_json_to_bytes(data_part)
+        elif isinstance(data_part, bytes):
+            encoded_part = data_part
+        else:
+            encoded_part = data_part.encode('utf-8')
+        if with_stats:
+            serialize_time += time.time() - start_time
+        if compressor is not None and \
+                compressor.estimated_size(measure_compressed_size) + len(encoded_part) + 1 > target_chunk_size:
+            yield close_chunk()
+            compressor = None
+
+        if compressor is None:
+            level, adaptive_compression = _resolve_compression_level(compression_level)
+            compressor = GzipLinesCompressor(level)
+        compressor.serialize_time += serialize_time
+        serialize_time = 0.0
+        compressor.add(encoded_part)
+
+    if compressor is not None:
+        yield close_chunk()
+
+
+def _prefetch_in_background(iterable, max_items_in_memory):
+    """
+    Consumes an iterable on a background thread, so producing the next items overlaps with the processing of the
+    current one, with the calls to the server locked (see ``support_multithreading``).
+    At most max_items_in_memory items are alive at any time, counting the item being produced,
+    the items waiting to be consumed and the item the consumer holds: the producer only starts producing an item
+    once the consumer is done with enough of the previous ones.
+
+    :type iterable: ``Iterable``
+    :param iterable: The iterable to consume.
+
+    :type max_items_in_memory: ``int``
+    :param max_items_in_memory: The maximal number of items alive at any time.
+        When lower than 2, the iterable is consumed on the calling thread.
+
+    :return: The items of the iterable, in order.
+    :rtype: ``collections.Iterable``
+    """
+    if max_items_in_memory < 2:
+        for item in iterable:
+            yield item
+        return
+
+    items_queue = queue.Queue()  # type: ignore[var-annotated]
+    # a token for each item that may be alive, taken by the producer before producing an item
+    # and returned by the consumer once it is done with the item
+    free_slots = queue.Queue()  # type: ignore[var-annotated]
+    for _ in range(max_items_in_memory):
+        free_slots.put(None)
+    stop_event = Event()
+    end_of_items = object()
+
+    def take_slot():
+        while not stop_event.is_set():
+            try:
+                free_slots.get(timeout=0.1)
+                return True
+            except queue.Empty:
+                continue
+        return False
+
+    def produce():
+        try:
+            iterator = iter(iterable)
+            while take_slot():
+                try:
+                    produced_item = next(iterator)
+                except StopIteration:
+                    items_queue.put((end_of_items, None))
+                    return
+                items_queue.put((produced_item, None))
+        except Exception as error:
+            items_queue.put((end_of_items, error))
+
+    # the iterable may call the server, e.g. with demisto.debug, while the consumer does
+    try:
+        support_multithreading()
+    except AttributeError:
+        demisto.debug('Could not add a lock on the server calls, the demisto object does not support it.')
+    producer = Thread(target=produce)
+    producer.daemon = True
+    producer.start()
+    try:
+        while True:
+            item, error = items_queue.get()
+            if item is end_of_items:
+                if error:
+                    raise error
+                return
+            yield item
+            del item
+            free_slots.put(None)
+    finally:
+        stop_event.set()
 
 
 def send_events_to_xsiam(events, vendor, product, data_format=None, url_key='url', num_of_attempts=3,
@@ -11828,16 +15817,9 @@ def has_passed_time_threshold(timestamp_str, seconds_threshold):
         raise ValueError("Failed to parse timestamp: {timestamp_str}".format(timestamp_str=timestamp_str))
 
 
-def send_data_to_xsiam(data, vendor, product, data_format=None, url_key='url', num_of_attempts=3,
-                       chunk_size=XSIAM_EVENT_CHUNK_SIZE, data_type=EVENTS, should_update_health_module=True,
-                       add_proxy_to_request=False, snapshot_id='', items_count=None):
+def _get_xsiam_request_params(vendor, product, data_format, url_key, data_type, snapshot_id, items_count):
     """
-    Send the supported fetched data types into the XDR data-collector private api.
-
-    :type data: ``Union[str, list]``
-    :param data: The data to send to XSIAM server. Should be of the following:
-        1. List of strings or dicts where each string or dict represents an event or asset.
-        2. String containing raw events separated by a new line.
+    Builds the url, headers and error handler of a request sending data into the XDR data-collector private api.
 
     :type vendor: ``str``
     :param vendor: The vendor corresponding to the integration that originated the data.
@@ -11846,69 +15828,28 @@ def send_data_to_xsiam(data, vendor, product, data_format=None, url_key='url', n
     :param product: The product corresponding to the integration that originated the data.
 
     :type data_format: ``str``
-    :param data_format: Should only be filled in case the 'events' parameter contains a string of raw
-        events in the format of 'leef' or 'cef'. In other cases the data_format will be set automatically.
+    :param data_format: The format of the sent data, e.g. json, text, leef or cef.
 
     :type url_key: ``str``
-    :param url_key: The param dict key where the integration url is located at. the default is 'url'.
-
-    :type num_of_attempts: ``int``
-    :param num_of_attempts: The num of attempts to do in case there is an api limit (429 error codes)
-
-    :type chunk_size: ``int``
-    :param chunk_size: Advanced - The maximal size of each chunk size we send to API. Limit of 9 MB will be inforced.
+    :param url_key: The param dict key where the integration url is located at.
 
     :type data_type: ``str``
     :param data_type: Type of data to send to Xsiam, events or assets.
 
-    :type should_update_health_module: ``bool``
-    :param should_update_health_module: whether to trigger the health module showing how many events were sent to xsiam
-        This can be useful when using send_data_to_xsiam in batches for the same fetch.
-
-    :type add_proxy_to_request: ``bool``
-    :param add_proxy_to_request: whether to add proxy to the send evnets request.
-
     :type snapshot_id: ``str``
     :param snapshot_id: the snapshot id.
 
-    :type items_count: ``str``
+    :type items_count: ``int``
     :param items_count: the asset snapshot items count.
 
-    :return: None
-    :rtype: ``None``
+    :return: The XSIAM url, the request headers, the error message prefix and the error handler.
+    :rtype: ``tuple``
     """
-    data_size = 0
     params = demisto.params()
     url = params.get(url_key)
     calling_context = demisto.callingContext.get('context', {})
     instance_name = calling_context.get('IntegrationInstance', '')
     collector_name = calling_context.get('IntegrationBrand', '')
-    if not items_count:
-        items_count = len(data) if isinstance(data, list) else 1
-    if data_type not in DATA_TYPES:
-        demisto.debug("data type must be one of these values: {types}".format(types=DATA_TYPES))
-        return
-
-    if not data:
-        demisto.debug('send_data_to_xsiam function received no {data_type}, '
-                      'skipping the API call to send {data} to XSIAM'.format(data_type=data_type, data=data_type))
-        demisto.updateModuleHealth({'{data_type}Pulled'.format(data_type=data_type): data_size})
-        return
-
-    # only in case we have data to send to XSIAM we continue with this flow.
-    # Correspond to case 1: List of strings or dicts where each string or dict represents an one event or asset or snapshot.
-    if isinstance(data, list):
-        # In case we have list of dicts we set the data_format to json and parse each dict to a stringify each dict.
-        if isinstance(data[0], dict):
-            data = [json.dumps(item) for item in data]
-            data_format = 'json'
-        # Separating each event with a new line
-        data = '\n'.join(data)
-    elif not isinstance(data, str):
-        raise DemistoException('Unsupported type: {data} for the {data_type} parameter.'
-                               ' Should be a string or list.'.format(data=type(data), data_type=data_type))
-    if not data_format:
-        data_format = 'text'
 
     xsiam_api_token = demisto.getLicenseCustomField('Http_Connector.token')
     xsiam_domain = demisto.getLicenseCustomField('Http_Connector.url')
@@ -11961,21 +15902,489 @@ def send_data_to_xsiam(data, vendor, product, data_format=None, url_key='url', n
         ).format(xsiam_url=xsiam_url, headers=json.dumps(headers, indent=8), status_code=res.status_code, error=error)
 
         demisto.error(header_msg + api_call_info)
-        raise DemistoException(header_msg + error, DemistoException)
+        raise DemistoException(header_msg + error, DemistoException, res=res)
+
+    return xsiam_url, headers, header_msg, data_error_handler
+
+
+def send_data_to_xsiam(data, vendor, product, data_format=None, url_key='url', num_of_attempts=3,
+                       chunk_size=XSIAM_EVENT_CHUNK_SIZE, data_type=EVENTS, should_update_health_module=True,
+                       add_proxy_to_request=False, snapshot_id='', items_count=None, max_workers=1,
+                       execution_metrics=None, spill_queue=None,
+                       compression_level=XSIAM_COMPRESSION_LEVEL, rate_limiter=None):
+    """
+    Send the supported fetched data types into the XDR data-collector private api.
+
+    :type data: ``Union[str, list]``
+    :param data: The data to send to XSIAM server. Should be of the following:
+        1. List of strings or dicts where each string or dict represents an event or asset.
+        2. String containing raw events separated by a new line.
+
+    :type vendor: ``str``
+    :param vendor: The vendor corresponding to the integration that originated the data.
+
+    :type product: ``str``
+    :param product: The product corresponding to the integration that originated the data.
+
+    :type data_format: ``str``
+    :param data_format: Should only be filled in case the 'events' parameter contains a string of raw
+        events in the format of 'leef' or 'cef'. In other cases the data_format will be set automatically.
+
+    :type url_key: ``str``
+    :param url_key: The param dict key where the integration url is located at. the default is 'url'.
+
+    :type num_of_attempts: ``int``
+    :param num_of_attempts: The num of attempts to do in case there is an api limit (429 error codes)
+
+    :type chunk_size: ``int``
+    :param chunk_size: Advanced - The maximal size of each chunk size we send to API. Limit of 9 MB will be inforced.
+
+    :type data_type: ``str``
+    :param data_type: Type of data to send to Xsiam, events or assets.
+
+    :type should_update_health_module: ``bool``
+    :param should_update_health_module: whether to trigger the health module showing how many events were sent to xsiam
+        This can be useful when using send_data_to_xsiam in batches for the same fetch.
+
+    :type add_proxy_to_request: ``bool``
+    :param add_proxy_to_request: whether to add proxy to the send evnets request.
+
+    :type snapshot_id: ``str``
+    :param snapshot_id: the snapshot id.
+
+    :type items_count: ``str``
+    :param items_count: the asset snapshot items count.
+
+    :type max_workers: ``int``
+    :param max_workers: Advanced - The maximal number of chunks compressed and sent to the API concurrently.
+        The default of 1 sends the chunks one after the other.
+
+    :type execution_metrics: ``ExecutionMetrics``
+    :param execution_metrics: The metrics to record the retries and the time throttled by rate limits of each chunk in.
+
+    :type spill_queue: ``XSIAMSpillQueue``
+    :param spill_queue: A disk-backed queue to spill the chunks that could not be sent into, instead of failing.
+        The chunks spilled on previous runs are sent first.
+
+    :type compression_level: ``int`` or ``str``
+    :param compression_level: Advanced - The gzip compression level, from 1 (fastest) to 9 (smallest).
+        Use 'auto' to adjust the level according to whether compressing or uploading the chunks is slower.
+
+    :type rate_limiter: ``TokenBucketRateLimiter``
+    :param rate_limiter: Advanced - If given, the chunks are sent at the rate it allows, for example
+        XSIAM_RATE_LIMITER to share the rate limit with the other senders of the process.
+        The requests are not rate limited by default.
+
+    :return: The telemetry of the sent chunks.
+    :rtype: ``XSIAMIngestionStats``
+    """
+    ingestion_stats = XSIAMIngestionStats(data_type)
+    if not items_count:
+        items_count = len(data) if isinstance(data, list) else 1
+    if data_type not in DATA_TYPES:
+        demisto.debug("data type must be one of these values: {types}".format(types=DATA_TYPES))
+        return ingestion_stats
+
+    if not data:
+        if spill_queue is None or not len(spill_queue):
+            demisto.debug('send_data_to_xsiam function received no {data_type}, '
+                          'skipping the API call to send {data} to XSIAM'.format(data_type=data_type, data=data_type))
+            demisto.updateModuleHealth({'{data_type}Pulled'.format(data_type=data_type): 0})
+            return ingestion_stats
+        # there is no new data, but the spilled chunks should still be replayed
+        data = []
 
-    client = BaseClient(base_url=xsiam_url, proxy=add_proxy_to_request)
+    # only in case we have data to send to XSIAM we continue with this flow.
+    # Correspond to case 1: List of strings or dicts where each string or dict represents an one event or asset or snapshot.
+    if isinstance(data, list):
+        # In case we have list of dicts we set the data_format to json and parse each dict to a stringify each dict.
+        if data and isinstance(data[0], dict):
+            start_time = time.time()
+            data = [serialize_json_to_bytes(item) for item in data]
+            ingestion_stats.serialize_time = time.time() - start_time
+            data_format = 'json'
+        # The items are chunked as is and separated with a new line when each chunk is sent.
+    elif not isinstance(data, str):
+        raise DemistoException('Unsupported type: {data} for the {data_type} parameter.'
+                               ' Should be a string or list.'.format(data=type(data), data_type=data_type))
+    if not data_format:
+        data_format = 'text'
+
+    xsiam_url, headers, header_msg, data_error_handler = _get_xsiam_request_params(
+        vendor, product, data_format, url_key, data_type, snapshot_id, items_count
+    )
+
+    client = get_xsiam_client(xsiam_url, add_proxy_to_request, max(XSIAM_CONNECTION_POOL_SIZE, max_workers))
     data_chunks = split_data_to_chunks(data, chunk_size)
-    for data_chunk in data_chunks:
-        data_size += len(data_chunk)
-        data_chunk = '\n'.join(data_chunk)
-        zipped_data = gzip.compress(data_chunk.encode('utf-8'))  # type: ignore[AttributeError,attr-defined]
-        xsiam_api_call_with_retries(client=client, events_error_handler=data_error_handler,
-                                    error_msg=header_msg, headers=headers,
-                                    num_of_attempts=num_of_attempts, xsiam_url=xsiam_url,
-                                    zipped_data=zipped_data, is_json_response=True, data_type=data_type)
+    ingestion_stats.chunks = send_data_chunks_to_xsiam(client=client, data_chunks=data_chunks,
+                                                       events_error_handler=data_error_handler,
+                                                       error_msg=header_msg, headers=headers,
+                                                       num_of_attempts=num_of_attempts, xsiam_url=xsiam_url,
+                                                       data_type=data_type, max_workers=max_workers,
+                                                       execution_metrics=execution_metrics, spill_queue=spill_queue,
+                                                       compression_level=compression_level, rate_limiter=rate_limiter)
+    demisto.debug('Sent {data_type} into XSIAM: {stats}'.format(data_type=data_type, stats=ingestion_stats))
+
+    if should_update_health_module:
+        demisto.updateModuleHealth({'{data_type}Pulled'.format(data_type=data_type): ingestion_stats.items_count})
+    return ingestion_stats
+
+
+def send_data_to_xsiam_stream(data, vendor, product, data_format=None, url_key='url', num_of_attempts=3,
+                              chunk_size=XSIAM_EVENT_CHUNK_SIZE, data_type=EVENTS, should_update_health_module=True,
+                              add_proxy_to_request=False, snapshot_id='', items_count=None,
+                              max_chunks_in_memory=XSIAM_STREAM_MAX_CHUNKS_IN_MEMORY, max_workers=1,
+                              measure_compressed_size=False, execution_metrics=None, spill_queue=None,
+                              compression_level=XSIAM_COMPRESSION_LEVEL, rate_limiter=None):
+    """
+    Send the supported fetched data types into the XDR data-collector private api with bounded memory.
+    The data is consumed lazily, serialized and gzipped incrementally into chunks, and the next chunks are built
+    on a background thread while the current one is sent. At most max_chunks_in_memory compressed chunks are held
+    at any given time, so arbitrarily large backfills can be sent from a generator.
+
+    :type data: ``Union[str, Iterable]``
+    :param data: The data to send to XSIAM server. Should be of the following:
+        1. A list, iterator or generator of strings or dicts where each string or dict represents an event or asset.
+        2. String containing raw events separated by a new line.
+
+    :type vendor: ``str``
+    :param vendor: The vendor corresponding to the integration that originated the data.
+
+    :type product: ``str``
+    :param product: The product corresponding to the integration that originated the data.
+
+    :type data_format: ``str``
+    :param data_format: Should only be filled in case the 'data' parameter contains raw events
+        in the format of 'leef' or 'cef'. In other cases the data_format will be set automatically.
+
+    :type url_key: ``str``
+    :param url_key: The param dict key where the integration url is located at. the default is 'url'.
+
+    :type num_of_attempts: ``int``
+    :param num_of_attempts: The num of attempts to do in case there is an api limit (429 error codes)
+
+    :type chunk_size: ``int``
+    :param chunk_size: Advanced - The maximal size of each chunk size we send to API. Limit of 4 MB will be inforced.
+
+    :type data_type: ``str``
+    :param data_type: Type of data to send to Xsiam, events or assets.
+
+    :type should_update_health_module: ``bool``
+    :param should_update_health_module: whether to trigger the health module showing how many events were sent to xsiam
+
+    :type add_proxy_to_request: ``bool``
+    :param add_proxy_to_request: whether to add proxy to the send evnets request.
+
+    :type snapshot_id: ``str``
+    :param snapshot_id: the snapshot id.
+
+    :type items_count: ``int``
+    :param items_count: the asset snapshot items count. Required when sending assets, as the length of
+        the stream is not known in advance.
+
+    :type max_chunks_in_memory: ``int``
+    :param max_chunks_in_memory: The maximal number of compressed chunks held in memory at once.
+        When set to 1, chunks are built and sent one after the other on the calling thread.
+
+    :type max_workers: ``int``
+    :param max_workers: Advanced - The maximal number of chunks sent to the API concurrently.
+        Should not exceed max_chunks_in_memory.
+
+    :type measure_compressed_size: ``bool``
+    :param measure_compressed_size: Advanced - Whether chunk_size applies to the compressed chunks that are sent
+        instead of the uncompressed data, which results in fewer and fuller requests.
+
+    :type execution_metrics: ``ExecutionMetrics``
+    :param execution_metrics: The metrics to record the retries and the time throttled by rate limits of each chunk in.
+
+    :type spill_queue: ``XSIAMSpillQueue``
+    :param spill_queue: A disk-backed queue to spill the chunks that could not be sent into, instead of failing.
+        The chunks spilled on previous runs are sent first.
+
+    :type compression_level: ``int`` or ``str``
+    :param compression_level: Advanced - The gzip compression level, from 1 (fastest) to 9 (smallest).
+        Use 'auto' to adjust the level according to whether compressing or uploading the chunks is slower.
+
+    :type rate_limiter: ``TokenBucketRateLimiter``
+    :param rate_limiter: Advanced - If given, the chunks are sent at the rate it allows, for example
+        XSIAM_RATE_LIMITER to share the rate limit with the other senders of the process.
+        The requests are not rate limited by default.
+
+    :return: The telemetry of the sent chunks.
+    :rtype: ``XSIAMIngestionStats``
+    """
+    ingestion_stats = XSIAMIngestionStats(data_type)
+    if data_type not in DATA_TYPES:
+        demisto.debug("data type must be one of these values: {types}".format(types=DATA_TYPES))
+        return ingestion_stats
+
+    if isinstance(data, STRING_OBJ_TYPES):
+        data = _iter_lines(data)
+    data = iter(data)
+    try:
+        first_item = next(data)
+        data = chain([first_item], data)
+    except StopIteration:
+        if spill_queue is None or not len(spill_queue):
+            demisto.debug('send_data_to_xsiam_stream function received no {data_type}, '
+                          'skipping the API call to send {data} to XSIAM'.format(data_type=data_type, data=data_type))
+            demisto.updateModuleHealth({'{data_type}Pulled'.format(data_type=data_type): 0})
+            return ingestion_stats
+        # there is no new data, but the spilled chunks should still be replayed
+        first_item = None
+
+    if data_type == ASSETS and first_item is not None and not items_count:
+        raise DemistoException('items_count must be provided when streaming assets into XSIAM.')
+    if isinstance(first_item, dict):
+        data_format = 'json'
+    elif not data_format:
+        data_format = 'text'
+
+    xsiam_url, headers, header_msg, data_error_handler = _get_xsiam_request_params(
+        vendor, product, data_format, url_key, data_type, snapshot_id, items_count
+    )
+
+    client = get_xsiam_client(xsiam_url, add_proxy_to_request, max(XSIAM_CONNECTION_POOL_SIZE, max_workers))
+    zipped_chunks = zip_data_to_chunks(data, chunk_size, measure_compressed_size, compression_level, with_stats=True)
+    if max_workers <= 1:
+        # one chunk is being sent while the next ones are built
+        zipped_chunks = _prefetch_in_background(zipped_chunks, max_chunks_in_memory)
+    ingestion_stats.chunks = send_data_chunks_to_xsiam(client=client, data_chunks=zipped_chunks,
+                                                       events_error_handler=data_error_handler,
+                                                       error_msg=header_msg, headers=headers,
+                                                       num_of_attempts=num_of_attempts, xsiam_url=xsiam_url,
+                                                       data_type=data_type, max_workers=max_workers,
+                                                       max_pending_chunks=max(max_chunks_in_memory, 1),
+                                                       execution_metrics=execution_metrics, spill_queue=spill_queue,
+                                                       compression_level=compression_level, rate_limiter=rate_limiter)
+    demisto.debug('Sent {data_type} into XSIAM: {stats}'.format(data_type=data_type, stats=ingestion_stats))
 
     if should_update_health_module:
-        demisto.updateModuleHealth({'{data_type}Pulled'.format(data_type=data_type): data_size})
+        demisto.updateModuleHealth({'{data_type}Pulled'.format(data_type=data_type): ingestion_stats.items_count})
+    return ingestion_stats
+
+
+class AssetSnapshotWriter(object):
+    """
+    Sends one asset snapshot into XSIAM from assets that are added incrementally, so large inventories are never
+    materialized as a single list. The assets are chunked and compressed on a background thread, and all the chunks
+    share one snapshot id. Use it as a context manager, the snapshot is completed when the block exits without an error.
+
+    When total_items_count is given, the chunks are uploaded in the background as they are built. Otherwise the
+    total-items-count header is only known at close, so the compressed chunks are kept in a temporary file and
+    uploaded when the writer is closed, with the number of assets that were actually added.
+
+    >>> with AssetSnapshotWriter(vendor, product) as writer:
+    >>>     for page in client.list_assets_pages():
+    >>>         writer.add_assets(page)
+
+    :type vendor: ``str``
+    :param vendor: The vendor corresponding to the integration that originated the assets.
+
+    :type product: ``str``
+    :param product: The product corresponding to the integration that originated the assets.
+
+    :type url_key: ``str``
+    :param url_key: The param dict key where the integration url is located at. the default is 'url'.
+
+    :type num_of_attempts: ``int``
+    :param num_of_attempts: The num of attempts to do in case there is an api limit (429 error codes)
+
+    :type chunk_size: ``int``
+    :param chunk_size: Advanced - The maximal size of each chunk size we send to API. Limit of 4 MB will be inforced.
+
+    :type add_proxy_to_request: ``bool``
+    :param add_proxy_to_request: whether to add proxy to the send assets request.
+
+    :type snapshot_id: ``str``
+    :param snapshot_id: the snapshot id. The default is the current time in milliseconds.
+
+    :type total_items_count: ``int``
+    :param total_items_count: The number of assets in the snapshot, if known in advance.
+
+    :type max_workers: ``int``
+    :param max_workers: Advanced - The maximal number of chunks sent to the API concurrently.
+
+    :type compression_level: ``int`` or ``str``
+    :param compression_level: Advanced - The gzip compression level, from 1 to 9, or 'auto'.
+
+    :type should_update_health_module: ``bool``
+    :param should_update_health_module: whether to trigger the health module showing how many assets were sent to xsiam
+
+    :return: None
+    :rtype: ``None``
+    """
+
+    MAX_QUEUED_PAGES = 4
+
+    def __init__(self, vendor, product, url_key='url', num_of_attempts=3, chunk_size=XSIAM_EVENT_CHUNK_SIZE,
+                 add_proxy_to_request=False, snapshot_id='', total_items_count=None, max_workers=1,
+                 compression_level=XSIAM_COMPRESSION_LEVEL, should_update_health_module=True):
+        self.vendor = vendor
+        self.product = product
+        self.url_key = url_key
+        self.num_of_attempts = num_of_attempts
+        self.chunk_size = chunk_size
+        self.add_proxy_to_request = add_proxy_to_request
+        self.snapshot_id = snapshot_id or str(round(time.time() * 1000))
+        self.total_items_count = total_items_count
+        self.max_workers = max_workers
+        self.compression_level = compression_level
+        self.should_update_health_module = should_update_health_module
+        self.items_count = 0
+        self.stats = XSIAMIngestionStats(ASSETS)
+        self._queue = queue.Queue(maxsize=self.MAX_QUEUED_PAGES)  # type: ignore[var-annotated]
+        self._thread = None  # type: Optional[Thread]
+        self._error = None  # type: Optional[Exception]
+        self._spool_file = None  # type: Any
+        self._spooled_chunks = []  # type: List[tuple]
+        self._closed = False
+        self._aborted = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type:
+            self.abort()
+        else:
+            self.close()
+        return False
+
+    def add_assets(self, assets):
+        """
+        Adds assets to the snapshot.
+
+        :type assets: ``list`` or ``dict``
+        :param assets: The assets to add, or a single asset.
+
+        :return: None
+        :rtype: ``None``
+        """
+        if self._closed:
+            raise DemistoException('Cannot add assets to a closed asset snapshot.')
+        if isinstance(assets, dict):
+            assets = [assets]
+        if not assets:
+            return
+        if self._thread is None:
+            try:
+                support_multithreading()
+            except AttributeError:
+                demisto.debug('Could not add a lock on the server calls, the demisto object does not support it.')
+            self._thread = Thread(target=self._write_chunks)
+            self._thread.daemon = True
+            self._thread.start()
+        self.items_count += len(assets)
+        self._put(list(assets))
+
+    def close(self):
+        """
+        Completes the snapshot, sending the chunks that were not sent yet.
+        Raises a DemistoException if total_items_count was given and a different number of assets was added.
+
+        :return: The telemetry of the sent chunks.
+        :rtype: ``XSIAMIngestionStats``
+        """
+        if self._closed:
+            return self.stats
+        self._closed = True
+        try:
+            if self._thread is not None:
+                self._put(None)
+                self._thread.join()
+            if self._error is not None:
+                raise self._error
+            if self._spooled_chunks:
+                self.stats.chunks = self._send_chunks(self._iter_spooled_chunks(), self.items_count)
+        finally:
+            self._close_spool_file()
+        demisto.debug('Sent the asset snapshot {} into XSIAM: {}'.format(self.snapshot_id, self.stats))
+
+        if self.should_update_health_module:
+            demisto.updateModuleHealth({'{data_type}Pulled'.format(data_type=ASSETS): self.stats.items_count})
+        if self.total_items_count and self.total_items_count != self.items_count:
+            raise DemistoException('The asset snapshot {} was sent with total-items-count {} but {} assets were added, '
+                                   'XSIAM received an inconsistent snapshot.'.format(self.snapshot_id, self.total_items_count,
+                                                                                     self.items_count))
+        return self.stats
+
+    def abort(self):
+        """
+        Stops writing the snapshot without completing it. Chunks already sent in the background are not recalled.
+
+        :return: None
+        :rtype: ``None``
+        """
+        self._closed = True
+        self._aborted = True
+        if self._thread is not None:
+            try:
+                self._put(None)
+            except Exception:  # noqa: disable=broad-except
+                pass
+            self._thread.join()
+        self._close_spool_file()
+
+    def _put(self, assets):
+        while True:
+            if self._error is not None:
+                raise self._error
+            try:
+                self._queue.put(assets, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _iter_queued_assets(self):
+        while True:
+            assets = self._queue.get()
+            if self._aborted:
+                raise DemistoException('The asset snapshot {} was aborted.'.format(self.snapshot_id))
+            if assets is None:
+                return
+            for asset in assets:
+                yield asset
+
+    def _write_chunks(self):
+        try:
+            chunks = zip_data_to_chunks(self._iter_queued_assets(), self.chunk_size,
+                                        compression_level=self.compression_level, with_stats=True)
+            if self.total_items_count:
+                self.stats.chunks = self._send_chunks(chunks, self.total_items_count)
+            else:
+                import tempfile
+                self._spool_file = tempfile.TemporaryFile()
+                for zipped_data, items_count, chunk_stats in chunks:
+                    self._spool_file.write(zipped_data)
+                    self._spooled_chunks.append((len(zipped_data), items_count, chunk_stats))
+        except Exception as error:
+            self._error = error
+            # releasing add_assets in case it waits for room in the queue
+            while not self._queue.empty():
+                self._queue.get()
+
+    def _iter_spooled_chunks(self):
+        self._spool_file.seek(0)
+        for zipped_size, items_count, chunk_stats in self._spooled_chunks:
+            yield self._spool_file.read(zipped_size), items_count, chunk_stats
+
+    def _close_spool_file(self):
+        if self._spool_file is not None:
+            self._spool_file.close()
+            self._spool_file = None
+
+    def _send_chunks(self, chunks, items_count):
+        xsiam_url, headers, header_msg, data_error_handler = _get_xsiam_request_params(
+            self.vendor, self.product, 'json', self.url_key, ASSETS, self.snapshot_id, items_count
+        )
+        client = get_xsiam_client(xsiam_url, self.add_proxy_to_request, max(XSIAM_CONNECTION_POOL_SIZE, self.max_workers))
+        return send_data_chunks_to_xsiam(client=client, data_chunks=chunks,
+                                         events_error_handler=data_error_handler,
+                                         error_msg=header_msg, headers=headers,
+                                         num_of_attempts=self.num_of_attempts, xsiam_url=xsiam_url,
+                                         data_type=ASSETS, max_workers=self.max_workers,
+                                         compression_level=self.compression_level)
 
 
 def comma_separated_mapping_to_dict(raw_text):
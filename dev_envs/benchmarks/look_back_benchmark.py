@@ -0,0 +1,58 @@
+"""
+Benchmarks the look-back helpers of CommonServerPython on a last run object holding 100,000 incident IDs,
+as a command runs in production and with debug-mode=true, where the incident IDs are written to the debug log.
+
+Run from the repository root:
+    python dev_envs/benchmarks/look_back_benchmark.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import demistomock as demisto  # noqa: E402
+import CommonServerPython as csp  # noqa: E402
+
+INCIDENTS_COUNT = 100000
+FETCH_LIMIT = 200
+START_TIME = 1700000000
+REPEAT = 5
+
+
+def build_fixtures():
+    incidents = [{'id': 'INC-{}'.format(i)} for i in range(INCIDENTS_COUNT)]
+    # every other incident was already fetched, half of them in the previous look-back window
+    found_incident_ids = {'INC-{}'.format(i): START_TIME + (i % 2) * 100000 for i in range(0, INCIDENTS_COUNT, 2)}
+    return incidents, found_incident_ids
+
+
+def measure(function):
+    return min(timeit.repeat(function, number=1, repeat=REPEAT)) * 1000
+
+
+def run_benchmark(incidents, found_incident_ids):
+    last_run = {'found_incident_ids': found_incident_ids}
+    filter_time = measure(lambda: csp.filter_incidents_by_duplicates_and_limit(incidents, last_run, FETCH_LIMIT, 'id'))
+    remove_time = measure(lambda: csp.remove_old_incidents_ids(dict(found_incident_ids), START_TIME + 100000, 60))
+    return filter_time, remove_time
+
+
+def main():
+    incidents, found_incident_ids = build_fixtures()
+    debug_messages = []
+    # the messages are sent to the server, which filters them by the log level of the instance
+    demisto.debug = lambda msg, *args: debug_messages.append(msg)
+
+    for is_debug in (False, True):
+        demisto.is_debug = is_debug
+        del debug_messages[:]
+        filter_time, remove_time = run_benchmark(incidents, found_incident_ids)
+        print('debug-mode={:5} filter_incidents_by_duplicates_and_limit {:7.1f} ms, remove_old_incidents_ids {:7.1f} ms, '
+              '{} debug messages of {} characters per run'.format(str(is_debug).lower(), filter_time, remove_time,
+                                                                  len(debug_messages) // REPEAT,
+                                                                  sum(map(len, debug_messages)) // REPEAT))
+
+
+if __name__ == '__main__':
+    main()
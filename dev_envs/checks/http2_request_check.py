@@ -0,0 +1,78 @@
+"""
+Checks that the requests sent by BaseClient over HTTP/2 (http2=True) carry the same body and auth as with requests.
+The requests are handled by an httpx mock transport, so no server or network access is needed.
+
+Requires httpx and h2. Run from the repository root:
+    python dev_envs/checks/http2_request_check.py
+"""
+import base64
+import json
+import os
+import sys
+
+import httpx
+import requests
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+import CommonServerPython as csp  # noqa: E402
+
+BASE_URL = 'https://example.com/api/'
+
+
+class TokenAuth(requests.auth.AuthBase):
+    def __call__(self, request):
+        request.headers['X-Token'] = 'token'
+        return request
+
+
+def build_client(handler, auth=None):
+    client = csp.BaseClient(BASE_URL, http2=True, auth=auth)
+    client._session._client = httpx.Client(http2=True, transport=httpx.MockTransport(handler))
+    return client
+
+
+def echo(request):
+    body = json.dumps({'body': request.content.decode('utf-8'),
+                       'content_type': request.headers.get('Content-Type'),
+                       'authorization': request.headers.get('Authorization'),
+                       'token': request.headers.get('X-Token')}).encode('utf-8')
+    # streamed like the responses of a real transport
+    return httpx.Response(200, headers={'Content-Type': 'application/json'}, stream=httpx.ByteStream(body))
+
+
+def check_string_body():
+    body = json.dumps({'query': 'dataset = xdr_data'})
+    response = build_client(echo)._http_request('POST', 'query', data=body, headers={'Content-Type': 'application/json'})
+    assert response['body'] == body, response
+    assert response['content_type'] == 'application/json', response
+
+
+def check_bytes_body():
+    body = b'<query>xdr_data</query>'
+    response = build_client(echo)._http_request('POST', 'query', data=body)
+    assert response['body'] == body.decode('utf-8'), response
+
+
+def check_form_body():
+    response = build_client(echo)._http_request('POST', 'query', data={'name': 'value'})
+    assert response['body'] == 'name=value', response
+
+
+def check_auth():
+    expected = 'Basic ' + base64.b64encode(b'user:password').decode('ascii')
+    for auth in (('user', 'password'), requests.auth.HTTPBasicAuth('user', 'password')):
+        response = build_client(echo, auth=auth)._http_request('GET', 'query')
+        assert response['authorization'] == expected, response
+    response = build_client(echo, auth=TokenAuth())._http_request('GET', 'query')
+    assert response['token'] == 'token', response
+
+
+def main():
+    for check in (check_string_body, check_bytes_body, check_form_body, check_auth):
+        check()
+        print('{} passed'.format(check.__name__))
+
+
+if __name__ == '__main__':
+    main()